@@ -0,0 +1,63 @@
+from collections import Counter
+
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Sum, When
+from django.db.models.functions import Coalesce, TruncDate
+
+from analytics.models import ChallengePhaseStatistics, ChallengeStatistics, DailySubmissionCount, EvaluationTimeBucket
+from analytics.utils import get_evaluation_time_bucket
+from challenges.models import Challenge
+from jobs.models import Submission, SubmissionMetrics
+from participants.models import Participant
+
+
+def count_evaluated_submissions(status):
+    return Count(Case(When(status=status, metrics__isnull=False, then=1), output_field=IntegerField()))
+
+
+class Command(BaseCommand):
+
+    help = ("Recomputes the statistics of all the challenges from scratch, "
+            "e.g. after data was inserted without sending signals.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model in (ChallengeStatistics, ChallengePhaseStatistics, DailySubmissionCount, EvaluationTimeBucket):
+                model.objects.all().delete()
+
+            participant_counts = dict(Participant.objects.filter(team__challenge__isnull=False).values_list(
+                'team__challenge').annotate(Count('id')))
+            participant_team_counts = Challenge.participant_teams.through.objects.values_list(
+                'challenge').annotate(Count('id'))
+            ChallengeStatistics.objects.bulk_create(
+                ChallengeStatistics(challenge_id=challenge_id, participant_team_count=participant_team_count,
+                                    participant_count=participant_counts.get(challenge_id, 0))
+                for challenge_id, participant_team_count in participant_team_counts)
+
+            phase_statistics = Submission.objects.values('challenge_phase').annotate(
+                submission_count=Count('id'),
+                finished_submission_count=count_evaluated_submissions(Submission.FINISHED),
+                failed_submission_count=count_evaluated_submissions(Submission.FAILED),
+                active_team_count=Count('participant_team', distinct=True),
+                evaluation_count=Count('metrics'),
+                total_evaluation_time=Coalesce(Sum('metrics__wall_time'), 0))
+            ChallengePhaseStatistics.objects.bulk_create(
+                ChallengePhaseStatistics(challenge_phase_id=statistics.pop('challenge_phase'), **statistics)
+                for statistics in phase_statistics)
+
+            daily_submission_counts = Submission.objects.annotate(date=TruncDate('submitted_at')).values_list(
+                'challenge_phase', 'date').annotate(Count('id'))
+            DailySubmissionCount.objects.bulk_create(
+                DailySubmissionCount(challenge_phase_id=challenge_phase_id, date=date, submission_count=count)
+                for challenge_phase_id, date, count in daily_submission_counts)
+
+            bucket_counts = Counter(
+                (challenge_phase_id, get_evaluation_time_bucket(wall_time))
+                for challenge_phase_id, wall_time in SubmissionMetrics.objects.values_list(
+                    'submission__challenge_phase', 'wall_time').iterator())
+            EvaluationTimeBucket.objects.bulk_create(
+                EvaluationTimeBucket(challenge_phase_id=challenge_phase_id, bucket=bucket, count=count)
+                for (challenge_phase_id, bucket), count in bucket_counts.items())
+
+        self.stdout.write(self.style.SUCCESS('Statistics of {} challenge phases rebuilt'.format(len(phase_statistics))))
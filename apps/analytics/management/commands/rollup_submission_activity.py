@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from analytics.models import SubmissionActivity
+
+
+class Command(BaseCommand):
+
+    help = ("Downsamples the old submission activity to coarser periods and deletes the oldest one, "
+            "according to SUBMISSION_ACTIVITY_RETENTION_DAYS. Meant to run every hour.")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        retention = settings.SUBMISSION_ACTIVITY_RETENTION_DAYS
+        for resolution, coarser_resolution in ((SubmissionActivity.MINUTE, SubmissionActivity.HOUR),
+                                               (SubmissionActivity.HOUR, SubmissionActivity.DAY)):
+            count = SubmissionActivity.downsample(resolution, coarser_resolution,
+                                                  now - timedelta(days=retention[resolution]))
+            self.stdout.write('Downsampled activity to {0} {1}s'.format(count, coarser_resolution))
+
+        count, _ = SubmissionActivity.objects.filter(
+            resolution=SubmissionActivity.DAY,
+            period_start__lt=now - timedelta(days=retention[SubmissionActivity.DAY])).delete()
+        self.stdout.write(self.style.SUCCESS('Deleted {} days of activity'.format(count)))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 22:28
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('challenges', '0028_added_priority_field_to_challenge_phase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChallengePhaseStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('submission_count', models.PositiveIntegerField(default=0)),
+                ('finished_submission_count', models.PositiveIntegerField(default=0)),
+                ('failed_submission_count', models.PositiveIntegerField(default=0)),
+                ('active_team_count', models.PositiveIntegerField(default=0)),
+                ('evaluation_count', models.PositiveIntegerField(default=0)),
+                ('total_evaluation_time', models.FloatField(default=0)),
+                ('challenge_phase', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='challenges.ChallengePhase')),
+            ],
+            options={
+                'db_table': 'challenge_phase_statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='ChallengeStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('participant_team_count', models.PositiveIntegerField(default=0)),
+                ('participant_count', models.PositiveIntegerField(default=0)),
+                ('challenge', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='challenges.Challenge')),
+            ],
+            options={
+                'db_table': 'challenge_statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySubmissionCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('date', models.DateField()),
+                ('submission_count', models.PositiveIntegerField(default=0)),
+                ('challenge_phase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_submission_counts', to='challenges.ChallengePhase')),
+            ],
+            options={
+                'db_table': 'daily_submission_count',
+            },
+        ),
+        migrations.CreateModel(
+            name='EvaluationTimeBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('bucket', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('challenge_phase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='evaluation_time_buckets', to='challenges.ChallengePhase')),
+            ],
+            options={
+                'db_table': 'evaluation_time_bucket',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='evaluationtimebucket',
+            unique_together=set([('challenge_phase', 'bucket')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysubmissioncount',
+            unique_together=set([('challenge_phase', 'date')]),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 22:34
+from __future__ import unicode_literals
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0028_added_priority_field_to_challenge_phase'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('resolution', models.CharField(choices=[('minute', 'minute'), ('hour', 'hour'), ('day', 'day')], max_length=10)),
+                ('period_start', models.DateTimeField()),
+                ('submission_count', models.PositiveIntegerField(default=0)),
+                ('evaluation_count', models.PositiveIntegerField(default=0)),
+                ('failed_submission_count', models.PositiveIntegerField(default=0)),
+                ('total_queue_wait_time', models.FloatField(default=0)),
+                ('total_evaluation_time', models.FloatField(default=0)),
+                ('queue_wait_time_sketch', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('evaluation_time_sketch', django.contrib.postgres.fields.jsonb.JSONField(default=dict)),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_activity', to='challenges.Challenge')),
+                ('challenge_phase', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='submission_activity', to='challenges.ChallengePhase')),
+            ],
+            options={
+                'db_table': 'submission_activity',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='submissionactivity',
+            unique_together=set([('challenge_phase', 'resolution', 'period_start')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='submissionactivity',
+            index_together=set([('challenge', 'resolution', 'period_start')]),
+        ),
+    ]
@@ -1 +1,332 @@
-# Create your models here.
+from __future__ import unicode_literals
+
+from django.contrib.postgres.fields import JSONField
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from base.models import (TimeStampedModel, )
+from challenges.models import Challenge, ChallengePhase
+from jobs.models import Submission
+from participants.models import Participant
+
+from .utils import (add_to_sketch,
+                    estimate_evaluation_time_quantile,
+                    estimate_median_evaluation_time,
+                    get_evaluation_time_bucket,
+                    increment_counters,
+                    merge_sketches,
+                    truncate_datetime,)
+
+
+class ChallengeStatistics(TimeStampedModel):
+    """Model representing the participation in a challenge, kept up to date as teams join it"""
+
+    challenge = models.OneToOneField(Challenge, related_name='statistics')
+    participant_team_count = models.PositiveIntegerField(default=0)
+    participant_count = models.PositiveIntegerField(default=0)
+
+    def __unicode__(self):
+        return '{}'.format(self.challenge_id)
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'challenge_statistics'
+
+
+class ChallengePhaseStatistics(TimeStampedModel):
+    """Model representing the submissions to a challenge phase, kept up to date as they are made and evaluated"""
+
+    challenge_phase = models.OneToOneField(ChallengePhase, related_name='statistics')
+    submission_count = models.PositiveIntegerField(default=0)
+    finished_submission_count = models.PositiveIntegerField(default=0)
+    failed_submission_count = models.PositiveIntegerField(default=0)
+    # number of participant teams which made at least one submission
+    active_team_count = models.PositiveIntegerField(default=0)
+    evaluation_count = models.PositiveIntegerField(default=0)
+    # sum of the evaluation times (in seconds)
+    total_evaluation_time = models.FloatField(default=0)
+
+    def __unicode__(self):
+        return '{}'.format(self.challenge_phase_id)
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'challenge_phase_statistics'
+
+    @property
+    def success_ratio(self):
+        if not self.evaluation_count:
+            return None
+        return float(self.finished_submission_count) / self.evaluation_count
+
+    @property
+    def failure_ratio(self):
+        if not self.evaluation_count:
+            return None
+        return float(self.failed_submission_count) / self.evaluation_count
+
+    @property
+    def mean_evaluation_time(self):
+        if not self.evaluation_count:
+            return None
+        return self.total_evaluation_time / self.evaluation_count
+
+    @property
+    def median_evaluation_time(self):
+        """Returns the median evaluation time estimated from the evaluation time buckets of the phase"""
+        return estimate_median_evaluation_time(
+            (bucket.bucket, bucket.count) for bucket in self.challenge_phase.evaluation_time_buckets.all())
+
+    @classmethod
+    def record_evaluation(cls, submission, evaluation_time):
+        """Counts the outcome and the evaluation time (in seconds) of a submission evaluated by a worker"""
+        counters = {'evaluation_count': 1, 'total_evaluation_time': evaluation_time}
+        if submission.status == Submission.FINISHED:
+            counters['finished_submission_count'] = 1
+        elif submission.status == Submission.FAILED:
+            counters['failed_submission_count'] = 1
+        increment_counters(cls, {'challenge_phase_id': submission.challenge_phase_id}, **counters)
+        increment_counters(EvaluationTimeBucket, {
+            'challenge_phase_id': submission.challenge_phase_id,
+            'bucket': get_evaluation_time_bucket(evaluation_time)}, count=1)
+
+
+class DailySubmissionCount(TimeStampedModel):
+    """Model representing the number of submissions made to a challenge phase on a day"""
+
+    challenge_phase = models.ForeignKey(ChallengePhase, related_name='daily_submission_counts')
+    date = models.DateField()
+    submission_count = models.PositiveIntegerField(default=0)
+
+    def __unicode__(self):
+        return '{0} {1}'.format(self.challenge_phase_id, self.date)
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'daily_submission_count'
+        unique_together = ('challenge_phase', 'date')
+
+
+class EvaluationTimeBucket(TimeStampedModel):
+    """Model representing the number of evaluations of a challenge phase whose time falls in a bucket"""
+
+    challenge_phase = models.ForeignKey(ChallengePhase, related_name='evaluation_time_buckets')
+    # see `get_evaluation_time_bucket_bounds` for the evaluation times counted in a bucket
+    bucket = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    def __unicode__(self):
+        return '{0} {1}'.format(self.challenge_phase_id, self.bucket)
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'evaluation_time_bucket'
+        unique_together = ('challenge_phase', 'bucket')
+
+
+class SubmissionActivity(TimeStampedModel):
+    """
+    Model representing the submissions made to a challenge phase and evaluated during a minute, an hour
+    or a day. Minutes are downsampled to hours and hours to days as they get old.
+    """
+
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+
+    RESOLUTION_OPTIONS = (
+        (MINUTE, MINUTE),
+        (HOUR, HOUR),
+        (DAY, DAY),
+    )
+
+    # fields which are summed when activities are merged
+    COUNTERS = ('submission_count', 'evaluation_count', 'failed_submission_count', 'total_queue_wait_time',
+                'total_evaluation_time')
+    SKETCHES = ('queue_wait_time_sketch', 'evaluation_time_sketch')
+
+    challenge = models.ForeignKey(Challenge, related_name='submission_activity')
+    challenge_phase = models.ForeignKey(ChallengePhase, related_name='submission_activity')
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_OPTIONS)
+    period_start = models.DateTimeField()
+    submission_count = models.PositiveIntegerField(default=0)
+    evaluation_count = models.PositiveIntegerField(default=0)
+    failed_submission_count = models.PositiveIntegerField(default=0)
+    # sums of the times spent in queue and evaluating by the submissions evaluated (in seconds)
+    total_queue_wait_time = models.FloatField(default=0)
+    total_evaluation_time = models.FloatField(default=0)
+    # counts of the same times keyed by the bucket of `get_evaluation_time_bucket` they fall in
+    queue_wait_time_sketch = JSONField(default=dict)
+    evaluation_time_sketch = JSONField(default=dict)
+
+    def __unicode__(self):
+        return '{0} {1} {2}'.format(self.challenge_phase_id, self.resolution, self.period_start)
+
+    class Meta:
+        app_label = 'analytics'
+        db_table = 'submission_activity'
+        unique_together = ('challenge_phase', 'resolution', 'period_start')
+        index_together = [('challenge', 'resolution', 'period_start')]
+
+    @property
+    def mean_queue_wait_time(self):
+        if not self.evaluation_count:
+            return None
+        return self.total_queue_wait_time / self.evaluation_count
+
+    @property
+    def median_queue_wait_time(self):
+        return estimate_evaluation_time_quantile(self.queue_wait_time_sketch.items(), 0.5)
+
+    @property
+    def p95_queue_wait_time(self):
+        return estimate_evaluation_time_quantile(self.queue_wait_time_sketch.items(), 0.95)
+
+    @property
+    def mean_evaluation_time(self):
+        if not self.evaluation_count:
+            return None
+        return self.total_evaluation_time / self.evaluation_count
+
+    @property
+    def median_evaluation_time(self):
+        return estimate_evaluation_time_quantile(self.evaluation_time_sketch.items(), 0.5)
+
+    @property
+    def p95_evaluation_time(self):
+        return estimate_evaluation_time_quantile(self.evaluation_time_sketch.items(), 0.95)
+
+    @classmethod
+    def get_finer_resolutions(cls, resolution):
+        """Returns the resolutions whose periods fit in the periods of a resolution, including itself"""
+        resolutions = [option for option, _ in cls.RESOLUTION_OPTIONS]
+        return resolutions[:resolutions.index(resolution) + 1]
+
+    @classmethod
+    def add(cls, challenge_id, challenge_phase_id, resolution, period_start, sketches=None, **counters):
+        """Adds counters and sketches to the activity of a challenge phase during a period"""
+        lookup = {'challenge_id': challenge_id, 'challenge_phase_id': challenge_phase_id,
+                  'resolution': resolution, 'period_start': period_start}
+        with transaction.atomic():
+            increment_counters(cls, lookup, **counters)
+            if sketches:
+                # the row is locked, so that concurrent merges of the sketches are not lost
+                activity = cls.objects.select_for_update().get(**lookup)
+                for field, sketch in sketches.items():
+                    setattr(activity, field, merge_sketches(getattr(activity, field), sketch))
+                activity.save(update_fields=list(sketches))
+
+    @classmethod
+    def record_arrival(cls, submission):
+        """Counts a submission in the activity of its challenge phase during the current minute"""
+        cls.add(submission.challenge_phase.challenge_id, submission.challenge_phase_id, cls.MINUTE,
+                truncate_datetime(submission.submitted_at, cls.MINUTE), submission_count=1)
+
+    @classmethod
+    def record_evaluation(cls, submission, evaluation_time):
+        """Counts the evaluation of a submission in the activity of its challenge phase during the current minute"""
+        counters = {'evaluation_count': 1, 'failed_submission_count': int(submission.status == Submission.FAILED),
+                    'total_evaluation_time': evaluation_time}
+        sketches = {'evaluation_time_sketch': add_to_sketch({}, evaluation_time)}
+        if submission.started_at:
+            queue_wait_time = max(0, (submission.started_at - submission.submitted_at).total_seconds())
+            counters['total_queue_wait_time'] = queue_wait_time
+            sketches['queue_wait_time_sketch'] = add_to_sketch({}, queue_wait_time)
+        cls.add(submission.challenge_phase.challenge_id, submission.challenge_phase_id, cls.MINUTE,
+                truncate_datetime(timezone.now(), cls.MINUTE), sketches, **counters)
+
+    @classmethod
+    def merge(cls, activities, resolution):
+        """
+        Returns unsaved activities of `resolution` merging the activities of each challenge phase
+        in each of its periods, ordered by challenge phase and period
+        """
+        merged_activities = {}
+        for activity in activities:
+            key = (activity.challenge_phase_id, truncate_datetime(activity.period_start, resolution))
+            if key not in merged_activities:
+                merged_activities[key] = cls(challenge_id=activity.challenge_id,
+                                             challenge_phase_id=activity.challenge_phase_id,
+                                             resolution=resolution, period_start=key[1])
+            merged_activity = merged_activities[key]
+            for field in cls.COUNTERS:
+                setattr(merged_activity, field, getattr(merged_activity, field) + getattr(activity, field))
+            for field in cls.SKETCHES:
+                sketch = merge_sketches(getattr(merged_activity, field), getattr(activity, field))
+                setattr(merged_activity, field, sketch)
+        return [merged_activities[period] for period in sorted(merged_activities)]
+
+    @classmethod
+    def downsample(cls, resolution, coarser_resolution, before):
+        """
+        Replaces the activities of `resolution` during the periods of `coarser_resolution` ending
+        before a datetime by the activities of those periods, returns the number of them
+        """
+        before = truncate_datetime(before, coarser_resolution)
+        with transaction.atomic():
+            activities = cls.objects.select_for_update().filter(resolution=resolution, period_start__lt=before)
+            merged_activities = cls.merge(activities.iterator(), coarser_resolution)
+            for activity in merged_activities:
+                cls.add(activity.challenge_id, activity.challenge_phase_id, coarser_resolution,
+                        activity.period_start, dict((field, getattr(activity, field)) for field in cls.SKETCHES),
+                        **dict((field, getattr(activity, field)) for field in cls.COUNTERS))
+            activities.delete()
+        return len(merged_activities)
+
+
+@receiver(post_save, sender='jobs.Submission')
+def count_submission(sender, instance, created, **kwargs):
+    if not created:
+        return
+    # uses the index of the submissions on challenge phase and participant team
+    is_first_submission_of_team = not Submission.objects.filter(
+        challenge_phase_id=instance.challenge_phase_id,
+        participant_team_id=instance.participant_team_id).exclude(pk=instance.pk).exists()
+    increment_counters(ChallengePhaseStatistics, {'challenge_phase_id': instance.challenge_phase_id},
+                       submission_count=1, active_team_count=int(is_first_submission_of_team))
+    increment_counters(DailySubmissionCount, {
+        'challenge_phase_id': instance.challenge_phase_id,
+        'date': timezone.localtime(instance.submitted_at).date()}, submission_count=1)
+    SubmissionActivity.record_arrival(instance)
+
+
+@receiver(m2m_changed, sender=Challenge.participant_teams.through)
+def count_challenge_participant_teams(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        # teams are added to challenges through `participant_team.challenge_set`
+        participant_team_ids_per_challenge = [(challenge_id, [instance.pk]) for challenge_id in pk_set]
+    else:
+        participant_team_ids_per_challenge = [(instance.pk, pk_set)]
+    for challenge_id, participant_team_ids in participant_team_ids_per_challenge:
+        participant_count = Participant.objects.filter(team_id__in=participant_team_ids).count()
+        increment_counters(ChallengeStatistics, {'challenge_id': challenge_id},
+                           participant_team_count=sign * len(participant_team_ids),
+                           participant_count=sign * participant_count)
+
+
+def get_challenges_of_participant_team(participant_team_id):
+    return Challenge.participant_teams.through.objects.filter(
+        participantteam_id=participant_team_id).values('challenge_id')
+
+
+@receiver(post_save, sender='participants.Participant')
+def count_added_participant(sender, instance, created, **kwargs):
+    if created and instance.team_id:
+        # a single update whatever the number of challenges, whose statistics exist since the team joined them
+        ChallengeStatistics.objects.filter(
+            challenge_id__in=get_challenges_of_participant_team(instance.team_id)).update(
+            participant_count=F('participant_count') + 1)
+
+
+@receiver(post_delete, sender='participants.Participant')
+def count_removed_participant(sender, instance, **kwargs):
+    if instance.team_id:
+        ChallengeStatistics.objects.filter(
+            challenge_id__in=get_challenges_of_participant_team(instance.team_id), participant_count__gt=0).update(
+            participant_count=F('participant_count') - 1)
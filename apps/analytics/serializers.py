@@ -0,0 +1,53 @@
+from rest_framework import serializers
+
+from .models import ChallengePhaseStatistics, ChallengeStatistics, DailySubmissionCount, SubmissionActivity
+
+
+class ChallengePhaseStatisticsSerializer(serializers.ModelSerializer):
+
+    success_ratio = serializers.FloatField(read_only=True)
+    failure_ratio = serializers.FloatField(read_only=True)
+    mean_evaluation_time = serializers.FloatField(read_only=True)
+    median_evaluation_time = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ChallengePhaseStatistics
+        fields = ('challenge_phase', 'submission_count', 'finished_submission_count', 'failed_submission_count',
+                  'active_team_count', 'evaluation_count', 'success_ratio', 'failure_ratio',
+                  'mean_evaluation_time', 'median_evaluation_time',)
+
+
+class ChallengeStatisticsSerializer(serializers.ModelSerializer):
+
+    challenge_phases = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ChallengeStatistics
+        fields = ('challenge', 'participant_team_count', 'participant_count', 'challenge_phases',)
+
+    def get_challenge_phases(self, obj):
+        return ChallengePhaseStatisticsSerializer(self.context['challenge_phase_statistics'], many=True).data
+
+
+class DailySubmissionCountSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = DailySubmissionCount
+        fields = ('date', 'submission_count',)
+
+
+class SubmissionActivitySerializer(serializers.ModelSerializer):
+
+    mean_queue_wait_time = serializers.FloatField(read_only=True)
+    median_queue_wait_time = serializers.FloatField(read_only=True)
+    p95_queue_wait_time = serializers.FloatField(read_only=True)
+    mean_evaluation_time = serializers.FloatField(read_only=True)
+    median_evaluation_time = serializers.FloatField(read_only=True)
+    p95_evaluation_time = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SubmissionActivity
+        fields = ('challenge_phase', 'period_start', 'submission_count', 'evaluation_count',
+                  'failed_submission_count', 'mean_queue_wait_time', 'median_queue_wait_time',
+                  'p95_queue_wait_time', 'mean_evaluation_time', 'median_evaluation_time',
+                  'p95_evaluation_time',)
@@ -1,4 +1,14 @@
-from django.conf.urls import url  # noqa
+from django.conf.urls import url
+
+from . import views
 
 urlpatterns = [
+    url(r'challenge/(?P<challenge_pk>[0-9]+)/statistics$', views.challenge_statistics,
+        name='get_challenge_statistics'),
+    url(r'challenge/(?P<challenge_pk>[0-9]+)/challenge_phase/(?P<challenge_phase_pk>[0-9]+)/statistics$',
+        views.challenge_phase_statistics, name='get_challenge_phase_statistics'),
+    url(r'challenge/(?P<challenge_pk>[0-9]+)/challenge_phase/(?P<challenge_phase_pk>[0-9]+)/daily_submissions$',
+        views.daily_submission_counts, name='get_daily_submission_counts'),
+    url(r'challenge/(?P<challenge_pk>[0-9]+)/submission_activity$', views.submission_activity,
+        name='get_submission_activity'),
 ]
@@ -0,0 +1,89 @@
+import math
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.timezone import utc
+
+# evaluation times are counted in buckets whose bounds grow geometrically from `EVALUATION_TIME_BUCKET_BASE`
+# seconds by `EVALUATION_TIME_BUCKET_GROWTH`, so that a median is estimated within 12% from a few dozen rows
+EVALUATION_TIME_BUCKET_BASE = 0.01
+EVALUATION_TIME_BUCKET_GROWTH = 1.25
+
+
+def increment_counters(model, lookup, **increments):
+    """
+    Adds the increments to the counters of the row of `model` matching `lookup` in a single update,
+    so that concurrent increments are not lost. The row is created if it does not exist yet,
+    unless an increment is negative, and counters are never decremented below zero.
+    """
+    values = dict((field, F(field) + increment) for field, increment in increments.items())
+    decrements = dict(('{}__gte'.format(field), -increment) for field, increment in increments.items() if increment < 0)
+    if model.objects.filter(**lookup).filter(**decrements).update(**values) or decrements:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**dict(lookup, **increments))
+    except IntegrityError:
+        # the row was created by a concurrent increment in between
+        model.objects.filter(**lookup).update(**values)
+
+
+def get_evaluation_time_bucket(evaluation_time):
+    """Returns the bucket counting an evaluation time (in seconds)"""
+    if evaluation_time <= EVALUATION_TIME_BUCKET_BASE:
+        return 0
+    return int(math.ceil(math.log(evaluation_time / EVALUATION_TIME_BUCKET_BASE, EVALUATION_TIME_BUCKET_GROWTH)))
+
+
+def get_evaluation_time_bucket_bounds(bucket):
+    """Returns the lower and upper bounds (in seconds) of the evaluation times counted in a bucket"""
+    if bucket == 0:
+        return 0, EVALUATION_TIME_BUCKET_BASE
+    upper_bound = EVALUATION_TIME_BUCKET_BASE * EVALUATION_TIME_BUCKET_GROWTH ** bucket
+    return upper_bound / EVALUATION_TIME_BUCKET_GROWTH, upper_bound
+
+
+def estimate_evaluation_time_quantile(bucket_counts, quantile):
+    """
+    Returns the quantile of the evaluation times estimated from `(bucket, count)` pairs, interpolating
+    linearly within the bucket holding the quantile, or `None` if nothing was counted
+    """
+    bucket_counts = sorted((int(bucket), count) for bucket, count in bucket_counts)
+    rank = sum(count for _, count in bucket_counts) * quantile
+    counted = 0
+    for bucket, count in bucket_counts:
+        if count and counted + count >= rank:
+            lower_bound, upper_bound = get_evaluation_time_bucket_bounds(bucket)
+            return lower_bound + (upper_bound - lower_bound) * (rank - counted) / count
+        counted += count
+    return None
+
+
+def estimate_median_evaluation_time(bucket_counts):
+    """Returns the median evaluation time estimated from `(bucket, count)` pairs"""
+    return estimate_evaluation_time_quantile(bucket_counts, 0.5)
+
+
+def add_to_sketch(sketch, duration, count=1):
+    """Counts a duration (in seconds) in a sketch, a dict of counts keyed by evaluation time bucket"""
+    bucket = str(get_evaluation_time_bucket(duration))
+    sketch[bucket] = sketch.get(bucket, 0) + count
+    return sketch
+
+
+def merge_sketches(sketch, other_sketch):
+    """Returns the sketch counting the durations of both sketches"""
+    merged_sketch = dict(sketch)
+    for bucket, count in other_sketch.items():
+        merged_sketch[bucket] = merged_sketch.get(bucket, 0) + count
+    return merged_sketch
+
+
+def truncate_datetime(value, resolution):
+    """Returns the start of the `minute`, `hour` or `day` (in UTC) holding a datetime"""
+    value = value.astimezone(utc).replace(second=0, microsecond=0)
+    if resolution in ('hour', 'day'):
+        value = value.replace(minute=0)
+    if resolution == 'day':
+        value = value.replace(hour=0)
+    return value
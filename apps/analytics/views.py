@@ -1 +1,181 @@
-# Create your views here.
+import datetime
+
+from django.utils import timezone
+
+from rest_framework import permissions, status
+from rest_framework.decorators import (api_view,
+                                       authentication_classes,
+                                       permission_classes,
+                                       throttle_classes,)
+from rest_framework.response import Response
+from rest_framework_expiring_authtoken.authentication import (ExpiringTokenAuthentication,)
+
+from accounts.permissions import HasVerifiedEmail
+from base.throttles import UserRateThrottle
+from challenges.models import Challenge, ChallengePhase
+from hosts.utils import is_user_a_host_of_challenge
+from jobs.utils import parse_submission_filter_datetime
+
+from .models import ChallengePhaseStatistics, ChallengeStatistics, DailySubmissionCount, SubmissionActivity
+from .serializers import (ChallengePhaseStatisticsSerializer,
+                          ChallengeStatisticsSerializer,
+                          DailySubmissionCountSerializer,
+                          SubmissionActivitySerializer,)
+from .utils import truncate_datetime
+
+# number of days of submission counts returned when the `days` query parameter is not given
+DEFAULT_DAILY_SUBMISSION_DAYS = 30
+
+SUBMISSION_ACTIVITY_PERIODS = {
+    SubmissionActivity.MINUTE: datetime.timedelta(minutes=1),
+    SubmissionActivity.HOUR: datetime.timedelta(hours=1),
+    SubmissionActivity.DAY: datetime.timedelta(days=1),
+}
+# number of periods of submission activity returned when the `start` query parameter is not given
+DEFAULT_SUBMISSION_ACTIVITY_PERIODS = 60
+# maximum number of periods of submission activity returned per challenge phase, a day of minutes
+MAX_SUBMISSION_ACTIVITY_PERIODS = 1440
+
+
+def get_challenge_phase_statistics(challenge_phase):
+    """Returns the statistics of a challenge phase, which are all zero until its first submission"""
+    try:
+        return challenge_phase.statistics
+    except ChallengePhaseStatistics.DoesNotExist:
+        return ChallengePhaseStatistics(challenge_phase=challenge_phase)
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def challenge_statistics(request, challenge_pk):
+    """Returns the participation in a Challenge along with the statistics of each of its phases"""
+    try:
+        challenge = Challenge.objects.get(pk=challenge_pk)
+    except Challenge.DoesNotExist:
+        response_data = {'error': 'Challenge does not exist'}
+        return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    if not (request.user.is_staff or is_user_a_host_of_challenge(request.user, challenge_pk)):
+        response_data = {'error': 'Sorry, you are not allowed to view the statistics of this challenge!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        statistics = challenge.statistics
+    except ChallengeStatistics.DoesNotExist:
+        statistics = ChallengeStatistics(challenge=challenge)
+    challenge_phases = ChallengePhase.objects.filter(challenge=challenge).order_by('id').select_related(
+        'statistics').prefetch_related('evaluation_time_buckets')
+    challenge_phase_statistics = [get_challenge_phase_statistics(phase) for phase in challenge_phases]
+    serializer = ChallengeStatisticsSerializer(statistics,
+                                               context={'challenge_phase_statistics': challenge_phase_statistics})
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def challenge_phase_statistics(request, challenge_pk, challenge_phase_pk):
+    """Returns the statistics of the submissions to a Challenge Phase"""
+    try:
+        challenge_phase = ChallengePhase.objects.select_related('statistics').get(
+            pk=challenge_phase_pk, challenge_id=challenge_pk)
+    except ChallengePhase.DoesNotExist:
+        response_data = {'error': 'Challenge Phase does not exist'}
+        return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    if not (request.user.is_staff or is_user_a_host_of_challenge(request.user, challenge_pk)):
+        response_data = {'error': 'Sorry, you are not allowed to view the statistics of this challenge!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = ChallengePhaseStatisticsSerializer(get_challenge_phase_statistics(challenge_phase))
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def daily_submission_counts(request, challenge_pk, challenge_phase_pk):
+    """Returns the number of submissions made to a Challenge Phase on each of the last `days` days"""
+    try:
+        challenge_phase = ChallengePhase.objects.get(pk=challenge_phase_pk, challenge_id=challenge_pk)
+    except ChallengePhase.DoesNotExist:
+        response_data = {'error': 'Challenge Phase does not exist'}
+        return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    if not (request.user.is_staff or is_user_a_host_of_challenge(request.user, challenge_pk)):
+        response_data = {'error': 'Sorry, you are not allowed to view the statistics of this challenge!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    days = request.query_params.get('days', str(DEFAULT_DAILY_SUBMISSION_DAYS))
+    if not days.isdigit() or int(days) == 0:
+        response_data = {'error': 'Invalid value of the query parameter days'}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    first_date = timezone.localtime(timezone.now()).date() - datetime.timedelta(days=int(days) - 1)
+    daily_submission_counts = DailySubmissionCount.objects.filter(
+        challenge_phase=challenge_phase, date__gte=first_date).order_by('date')
+    serializer = DailySubmissionCountSerializer(daily_submission_counts, many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def submission_activity(request, challenge_pk):
+    """
+    Returns the submissions made to the phases of a Challenge and evaluated in each period of the query
+    parameter `resolution` (`minute`, `hour` or `day`) from `start` to `end`, optionally of a single
+    `challenge_phase`. It is read from the rollups of `SubmissionActivity`, so periods which were
+    already downsampled to a coarser resolution are missing.
+    """
+    try:
+        challenge = Challenge.objects.get(pk=challenge_pk)
+    except Challenge.DoesNotExist:
+        response_data = {'error': 'Challenge does not exist'}
+        return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    if not (request.user.is_staff or is_user_a_host_of_challenge(request.user, challenge_pk)):
+        response_data = {'error': 'Sorry, you are not allowed to view the statistics of this challenge!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    resolution = request.query_params.get('resolution', SubmissionActivity.HOUR)
+    if resolution not in SUBMISSION_ACTIVITY_PERIODS:
+        response_data = {'error': 'Invalid value of the query parameter resolution'}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+    period = SUBMISSION_ACTIVITY_PERIODS[resolution]
+
+    end = timezone.now()
+    if request.query_params.get('end'):
+        end = parse_submission_filter_datetime(request.query_params['end'])
+        if end is None:
+            response_data = {'error': 'Invalid value of the query parameter end'}
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+    start = end - period * DEFAULT_SUBMISSION_ACTIVITY_PERIODS
+    if request.query_params.get('start'):
+        start = parse_submission_filter_datetime(request.query_params['start'])
+        if start is None or start > end:
+            response_data = {'error': 'Invalid value of the query parameter start'}
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+    if end - start > period * MAX_SUBMISSION_ACTIVITY_PERIODS:
+        response_data = {'error': 'At most {0} periods of a {1} can be requested, use a coarser resolution'.format(
+            MAX_SUBMISSION_ACTIVITY_PERIODS, resolution)}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    filters = {}
+    if request.query_params.get('challenge_phase'):
+        if not request.query_params['challenge_phase'].isdigit():
+            response_data = {'error': 'Invalid value of the query parameter challenge_phase'}
+            return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+        filters['challenge_phase'] = int(request.query_params['challenge_phase'])
+
+    # the activity of finer resolutions which is not downsampled yet is merged into the periods
+    activities = SubmissionActivity.objects.filter(
+        challenge=challenge, resolution__in=SubmissionActivity.get_finer_resolutions(resolution),
+        period_start__gte=truncate_datetime(start, resolution), period_start__lt=end, **filters)
+    serializer = SubmissionActivitySerializer(SubmissionActivity.merge(activities.iterator(), resolution), many=True)
+    return Response(serializer.data, status=status.HTTP_200_OK)
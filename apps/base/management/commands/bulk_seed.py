@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from scripts.bulk_seed import DEFAULT_OPTIONS, bulk_seed
+
+
+class Command(BaseCommand):
+
+    help = "Seeds the database with a large amount of synthetic data, the same for a given seed."
+
+    def add_arguments(self, parser):
+        for name, default in sorted(DEFAULT_OPTIONS.items()):
+            parser.add_argument('--{}'.format(name.replace('_', '-')), dest=name, type=int, default=default,
+                                help='Defaults to {}'.format(default))
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Starting the bulk database seeder. Hang on...'))
+        bulk_seed(**dict((name, options[name]) for name in DEFAULT_OPTIONS))
+        self.stdout.write(self.style.SUCCESS('Database successfully seeded.'))
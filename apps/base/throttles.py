@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework import throttling
+
+
+class SlidingWindowRateThrottleMixin(object):
+    '''
+        * Counts the requests of a client in fixed windows of `duration` seconds with atomic
+          cache increments, instead of keeping the timestamp of every request
+        * Estimates the number of requests in the sliding window ending now from the counts of
+          the current and the previous window, the previous one weighted by its overlap
+        * Costs two cache operations per request, whatever the rate
+    '''
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE', 'default')]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.window_key = '{0}:{1}'.format(self.key, window)
+        self.previous_count = self.cache.get('{0}:{1}'.format(self.key, window - 1), 0)
+        self.current_count = self.increment(self.window_key)
+        if self.get_request_count() > self.num_requests:
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def increment(self, key):
+        '''
+            Increments the counter of a window and returns its new value
+        '''
+        # a window is read again as the previous window until its end
+        if self.cache.add(key, 1, 2 * self.duration):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # the counter expired in between
+            self.cache.set(key, 1, 2 * self.duration)
+            return 1
+
+    def get_request_count(self):
+        elapsed_fraction = (self.now % self.duration) / float(self.duration)
+        return self.previous_count * (1 - elapsed_fraction) + self.current_count
+
+    def throttle_success(self):
+        return True
+
+    def throttle_failure(self):
+        # a throttled request does not use up the rate of the client
+        try:
+            self.cache.decr(self.window_key)
+        except ValueError:
+            pass
+        self.current_count -= 1
+        return False
+
+    def wait(self):
+        elapsed = self.now % self.duration
+        allowance = self.num_requests - self.current_count - 1
+        if allowance >= 0 and self.previous_count:
+            # the previous window has to slide out until its weighted count fits in the allowance
+            return max(0, self.duration * (1 - float(allowance) / self.previous_count) - elapsed)
+        # the current window is full, so it has to slide out of the next window
+        next_window_fraction = 1 - float(self.num_requests - 1) / max(self.current_count, 1)
+        return self.duration - elapsed + self.duration * next_window_fraction
+
+
+class AnonRateThrottle(SlidingWindowRateThrottleMixin, throttling.AnonRateThrottle):
+    pass
+
+
+class UserRateThrottle(SlidingWindowRateThrottleMixin, throttling.UserRateThrottle):
+    pass
+
+
+class SubmissionRateThrottle(UserRateThrottle):
+    '''
+        Limits the rate at which a user makes submissions, as each of them is evaluated by a worker
+    '''
+    scope = 'submission'
+
+    def allow_request(self, request, view):
+        if request.method != 'POST':
+            return True
+        return super(SubmissionRateThrottle, self).allow_request(request, view)
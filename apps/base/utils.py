@@ -1,10 +1,20 @@
+import json
 import os
 import uuid
 
 from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.utils.deconstruct import deconstructible
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+# number of objects fetched and serialized at once by a streaming response
+STREAMING_CHUNK_SIZE = 500
+
+# extensions of compressed files, which keep the extension of their content before it so that they are
+# served with the content type of their content and a `Content-Encoding`
+COMPRESSED_FILE_EXTENSIONS = ('.gz',)
 
 
 def paginated_queryset(queryset, request):
@@ -17,13 +27,63 @@ def paginated_queryset(queryset, request):
     return (paginator, result_page)
 
 
+def cursor_paginated_queryset(queryset, request, ordering):
+    '''
+        * Return a keyset paginated result for a queryset ordered by `ordering`
+        * The next page is fetched by filtering on the ordering key of the last object of the
+          page instead of skipping an offset, so that deep pages are as fast as the first one
+    '''
+    paginator = CursorPagination()
+    paginator.ordering = ordering
+    paginator.page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    result_page = paginator.paginate_queryset(queryset, request)
+    return (paginator, result_page)
+
+
+def iterate_queryset_in_chunks(queryset, chunk_size=STREAMING_CHUNK_SIZE):
+    '''
+        * Yields the objects of a queryset ordered by primary key, as lists of `chunk_size` objects
+        * Each chunk is fetched by its own query starting after the last primary key of the
+          previous chunk, so that a single chunk is held in memory at a time
+    '''
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk_queryset[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def streaming_json_response(queryset, serializer_class, context=None, chunk_size=STREAMING_CHUNK_SIZE):
+    '''
+        * Returns a response streaming the objects of a queryset serialized as `{"results": [...]}`
+        * Objects are fetched, serialized and rendered one chunk at a time, so that the memory
+          used does not depend on the number of objects
+    '''
+    def iterate_json():
+        yield '{"results": ['
+        separator = ''
+        for chunk in iterate_queryset_in_chunks(queryset, chunk_size):
+            serializer = serializer_class(chunk, many=True, context=context)
+            yield separator + ','.join(json.dumps(item, cls=JSONEncoder) for item in serializer.data)
+            separator = ','
+        yield ']}'
+
+    return StreamingHttpResponse(iterate_json(), content_type='application/json')
+
+
 @deconstructible
 class RandomFileName(object):
     def __init__(self, path):
         self.path = path
 
     def __call__(self, instance, filename):
-        extension = os.path.splitext(filename)[1]
+        root, extension = os.path.splitext(filename)
+        if extension in COMPRESSED_FILE_EXTENSIONS:
+            extension = os.path.splitext(root)[1] + extension
         if 'id' in self.path and instance.pk:
             self.path = self.path.format(id=instance.pk)
         elif 'id' not in self.path and instance.pk:
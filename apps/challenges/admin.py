@@ -21,7 +21,9 @@ class DatasetSplitAdmin(TimeStampedAdmin):
 
 @admin.register(ChallengePhase)
 class ChallengePhaseAdmin(TimeStampedAdmin):
-    list_display = ("name", "challenge", "start_date", "end_date", "test_annotation", "is_public", "leaderboard_public")
+    list_display = ("name", "challenge", "start_date", "end_date", "test_annotation", "is_public", "leaderboard_public",
+                    "priority")
+    list_editable = ("priority",)
     list_filter = ("leaderboard_public", "challenge")
     search_fields = ("name",)
 
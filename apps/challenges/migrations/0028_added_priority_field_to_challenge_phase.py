@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:51
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0027_adds_unique_to_codename_dataset_split'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challengephase',
+            name='priority',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Submission Priority'),
+        ),
+    ]
@@ -102,6 +102,8 @@ class ChallengePhase(TimeStampedModel):
     max_submissions_per_day = models.PositiveIntegerField(default=100000)
     max_submissions = models.PositiveIntegerField(default=100000)
     codename = models.CharField(max_length=100, default="Phase Code Name")
+    # weight of the phase while workers share their time between challenge phases
+    priority = models.PositiveSmallIntegerField(default=1, verbose_name="Submission Priority")
     dataset_split = models.ManyToManyField(DatasetSplit, blank=True, through='ChallengePhaseSplit')
 
     class Meta:
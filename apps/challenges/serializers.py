@@ -45,7 +45,9 @@ class ChallengePhaseSerializer(serializers.ModelSerializer):
         model = ChallengePhase
         fields = ('id', 'name', 'description', 'leaderboard_public', 'start_date',
                   'end_date', 'challenge', 'max_submissions_per_day', 'max_submissions',
-                  'is_public', 'is_active', 'codename')
+                  'is_public', 'is_active', 'codename', 'priority')
+        # the share of the workers a phase gets is set by the staff from the admin, not by its hosts
+        read_only_fields = ('priority',)
 
 
 class DatasetSplitSerializer(serializers.ModelSerializer):
@@ -7,14 +7,14 @@ from rest_framework.decorators import (api_view,
                                        throttle_classes,)
 from rest_framework.response import Response
 from rest_framework_expiring_authtoken.authentication import (ExpiringTokenAuthentication,)
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 
 from accounts.permissions import HasVerifiedEmail
+from base.throttles import AnonRateThrottle, UserRateThrottle
 from base.utils import paginated_queryset
 from hosts.models import ChallengeHost, ChallengeHostTeam
 from hosts.utils import get_challenge_host_teams_for_user
 from participants.models import Participant, ParticipantTeam
-from participants.utils import get_participant_teams_for_user, has_user_participated_in_challenge
+from participants.utils import get_participant_teams_for_user, has_any_user_participated_in_challenge
 
 
 from .models import Challenge, ChallengePhase, ChallengePhaseSplit
@@ -34,7 +34,7 @@ def challenge_list(request, challenge_host_team_pk):
         return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
     if request.method == 'GET':
-        challenge = Challenge.objects.filter(creator=challenge_host_team)
+        challenge = Challenge.objects.filter(creator=challenge_host_team).select_related('creator__created_by')
         paginator, result_page = paginated_queryset(challenge, request)
         serializer = ChallengeSerializer(result_page, many=True, context={'request': request})
         response_data = serializer.data
@@ -134,12 +134,11 @@ def add_participant_team_to_challenge(request, challenge_pk, participant_team_pk
                          'challenge_id': int(challenge_pk), 'participant_team_id': int(participant_team_pk)}
         return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
-    for user in participant_team_user_ids:
-        if has_user_participated_in_challenge(user, challenge_pk):
-            response_data = {'error': 'Sorry, other team member(s) have already participated in the Challenge.'
-                             ' Please participate with a different team!',
-                             'challenge_id': int(challenge_pk), 'participant_team_id': int(participant_team_pk)}
-            return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+    if has_any_user_participated_in_challenge(participant_team_user_ids, challenge_pk):
+        response_data = {'error': 'Sorry, other team member(s) have already participated in the Challenge.'
+                         ' Please participate with a different team!',
+                         'challenge_id': int(challenge_pk), 'participant_team_id': int(participant_team_pk)}
+        return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
     if participant_team.challenge_set.filter(id=challenge_pk).exists():
         response_data = {'error': 'Team already exists', 'challenge_id': int(challenge_pk),
@@ -189,7 +188,7 @@ def get_all_challenges(request, challenge_time):
         q_params['start_date__gt'] = timezone.now()
     # for `all` we dont need any condition in `q_params`
 
-    challenge = Challenge.objects.filter(**q_params)
+    challenge = Challenge.objects.filter(**q_params).select_related('creator__created_by')
     paginator, result_page = paginated_queryset(challenge, request)
     serializer = ChallengeSerializer(result_page, many=True, context={'request': request})
     response_data = serializer.data
@@ -244,7 +243,7 @@ def get_challenges_based_on_teams(request):
         host_team_ids = get_challenge_host_teams_for_user(request.user)
         q_params['creator__id__in'] = host_team_ids
 
-    challenge = Challenge.objects.filter(**q_params)
+    challenge = Challenge.objects.filter(**q_params).select_related('creator__created_by')
     paginator, result_page = paginated_queryset(challenge, request)
     serializer = ChallengeSerializer(result_page, many=True, context={'request': request})
     response_data = serializer.data
@@ -335,7 +334,8 @@ def challenge_phase_split_list(request, challenge_pk):
         response_data = {'error': 'Challenge does not exist'}
         return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
-    challenge_phase_split = ChallengePhaseSplit.objects.filter(challenge_phase__challenge=challenge)
+    challenge_phase_split = ChallengePhaseSplit.objects.filter(
+        challenge_phase__challenge=challenge).select_related('challenge_phase', 'dataset_split')
     paginator, result_page = paginated_queryset(challenge_phase_split, request)
     serializer = ChallengePhaseSplitSerializer(result_page, many=True)
     response_data = serializer.data
@@ -80,6 +80,7 @@ class HostTeamDetailSerializer(serializers.ModelSerializer):
         fields = ('id', 'team_name', 'created_by', 'members')
 
     def get_members(self, obj):
-        hosts = ChallengeHost.objects.filter(team_name_id=obj.id)
+        # uses the hosts prefetched along with the team, see `get_challenge_host_team_queryset`
+        hosts = obj.challengehost_set.all()
         serializer = ChallengeHostSerializer(hosts, many=True)
         return serializer.data
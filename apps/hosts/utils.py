@@ -1,6 +1,19 @@
-from .models import ChallengeHost
+from challenges.models import Challenge
+
+from .models import ChallengeHost, ChallengeHostTeam
 
 
 def get_challenge_host_teams_for_user(user):
     """Returns challenge host team ids for a particular user"""
     return ChallengeHost.objects.filter(user=user).values_list('team_name', flat=True)
+
+
+def get_challenge_host_team_queryset():
+    """Returns challenge host teams along with their creator and hosts, as shown by `HostTeamDetailSerializer`"""
+    return ChallengeHostTeam.objects.select_related('created_by').prefetch_related('challengehost_set__user')
+
+
+def is_user_a_host_of_challenge(user, challenge_pk):
+    """Returns boolean if the user belongs to the host team of a particular challenge"""
+    challenge_host_team_ids = get_challenge_host_teams_for_user(user)
+    return Challenge.objects.filter(pk=challenge_pk, creator_id__in=challenge_host_team_ids).exists()
@@ -1,3 +1,5 @@
+from django.db.models import prefetch_related_objects
+
 from rest_framework import permissions, status
 from rest_framework.decorators import (api_view,
                                        authentication_classes,
@@ -5,9 +7,9 @@ from rest_framework.decorators import (api_view,
                                        throttle_classes,)
 from rest_framework.response import Response
 from rest_framework_expiring_authtoken.authentication import (ExpiringTokenAuthentication,)
-from rest_framework.throttling import UserRateThrottle
 
 from accounts.permissions import HasVerifiedEmail
+from base.throttles import UserRateThrottle
 from base.utils import paginated_queryset
 from .models import (ChallengeHost,
                      ChallengeHostTeam,)
@@ -15,6 +17,7 @@ from .serializers import (ChallengeHostSerializer,
                           ChallengeHostTeamSerializer,
                           InviteHostToTeamSerializer,
                           HostTeamDetailSerializer,)
+from .utils import get_challenge_host_team_queryset
 
 
 @throttle_classes([UserRateThrottle])
@@ -25,7 +28,7 @@ def challenge_host_team_list(request):
 
     if request.method == 'GET':
         challenge_host_team_ids = ChallengeHost.objects.filter(user=request.user).values_list('team_name', flat=True)
-        challenge_host_teams = ChallengeHostTeam.objects.filter(id__in=challenge_host_team_ids)
+        challenge_host_teams = get_challenge_host_team_queryset().filter(id__in=challenge_host_team_ids)
         paginator, result_page = paginated_queryset(challenge_host_teams, request)
         serializer = HostTeamDetailSerializer(result_page, many=True)
         response_data = serializer.data
@@ -53,6 +56,7 @@ def challenge_host_team_detail(request, pk):
         return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
     if request.method == 'GET':
+        prefetch_related_objects([challenge_host_team], 'created_by', 'challengehost_set__user')
         serializer = HostTeamDetailSerializer(challenge_host_team)
         response_data = serializer.data
         return Response(response_data, status=status.HTTP_200_OK)
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from base.admin import TimeStampedAdmin
 
-from .models import Submission
+from .models import Submission, SubmissionMetrics
 
 
 @admin.register(Submission)
@@ -14,3 +14,10 @@ class SubmissionAdmin(TimeStampedAdmin):
                    'created_by', 'status', 'is_public')
     search_fields = ('participant_team', 'challenge_phase',
                      'created_by', 'status')
+
+
+@admin.register(SubmissionMetrics)
+class SubmissionMetricsAdmin(TimeStampedAdmin):
+    list_display = ('submission', 'queue_wait_time', 'wall_time', 'cpu_user_time', 'cpu_system_time',
+                    'peak_memory', 'bytes_downloaded', 'db_queries', 'db_time', )
+    search_fields = ('submission__id', )
@@ -0,0 +1,82 @@
+import csv
+import uuid
+
+from django.db import connection
+
+from challenges.models import LeaderboardData
+
+# columns of a leaderboard export preceding the labels of the leaderboard schema,
+# along with the fields of `LeaderboardData` they are read from
+LEADERBOARD_EXPORT_FIELDS = (
+    ('submission_id', 'submission_id'),
+    ('participant_team_id', 'submission__participant_team_id'),
+    ('participant_team', 'submission__participant_team__team_name'),
+    ('submitted_by', 'submission__created_by__username'),
+    ('status', 'submission__status'),
+    ('is_public', 'submission__is_public'),
+    ('method_name', 'submission__method_name'),
+    ('submitted_at', 'submission__submitted_at'),
+    ('completed_at', 'submission__completed_at'),
+    ('wall_time', 'submission__metrics__wall_time'),
+    ('peak_memory', 'submission__metrics__peak_memory'),
+)
+
+# number of rows fetched from the database at once
+EXPORT_BATCH_SIZE = 2000
+
+
+class Echo(object):
+    """File-like object returning what is written to it, so that a csv writer returns its lines"""
+
+    def write(self, value):
+        return value
+
+
+def iterate_leaderboard_data(challenge_phase_split, batch_size=EXPORT_BATCH_SIZE):
+    '''
+        * Yields the leaderboard data of a challenge phase split as tuples of the fields in
+          `LEADERBOARD_EXPORT_FIELDS` followed by the result
+        * Reads them through a server side cursor, so that the memory used does not depend
+          on the size of the leaderboard
+    '''
+    queryset = LeaderboardData.objects.filter(challenge_phase_split=challenge_phase_split).order_by('id')
+    queryset = queryset.values_list(*[field for _, field in LEADERBOARD_EXPORT_FIELDS] + ['result'])
+    sql, params = queryset.query.sql_with_params()
+
+    connection.ensure_connection()
+    # `withhold` keeps the cursor open outside of a transaction, as a streaming response
+    # is read after the view returns
+    cursor = connection.connection.cursor(name='leaderboard_export_{}'.format(uuid.uuid4().hex), withhold=True)
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(sql, params)
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+
+
+def format_csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+def iterate_leaderboard_csv(challenge_phase_split):
+    '''
+        * Yields the leaderboard data of a challenge phase split as lines of csv, with a column
+          for each of the fields in `LEADERBOARD_EXPORT_FIELDS` and each label of the leaderboard
+        * Includes the submissions which are not public, it is meant for the challenge hosts
+    '''
+    labels = challenge_phase_split.leaderboard.schema.get('labels', [])
+    writer = csv.writer(Echo())
+    yield writer.writerow([column for column, _ in LEADERBOARD_EXPORT_FIELDS] + [
+        format_csv_value(label) for label in labels])
+    for row in iterate_leaderboard_data(challenge_phase_split):
+        result = row[-1] or {}
+        yield writer.writerow([format_csv_value(value) for value in row[:-1]] + [
+            format_csv_value(result.get(label.lower(), result.get(label))) for label in labels])
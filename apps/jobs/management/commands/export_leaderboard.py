@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand, CommandError
+
+from challenges.models import ChallengePhaseSplit
+from jobs.exports import iterate_leaderboard_csv
+
+
+class Command(BaseCommand):
+
+    help = "Exports all the leaderboard data of a challenge phase split as csv."
+
+    def add_arguments(self, parser):
+        parser.add_argument('challenge_phase_split_id', type=int)
+        parser.add_argument('--output', help='Path of the csv file, defaults to the standard output')
+
+    def handle(self, *args, **options):
+        try:
+            challenge_phase_split = ChallengePhaseSplit.objects.select_related('leaderboard').get(
+                pk=options['challenge_phase_split_id'])
+        except ChallengePhaseSplit.DoesNotExist:
+            raise CommandError('Challenge Phase Split {} does not exist'.format(options['challenge_phase_split_id']))
+
+        if not options['output']:
+            for line in iterate_leaderboard_csv(challenge_phase_split):
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'wb') as output_file:
+            for line in iterate_leaderboard_csv(challenge_phase_split):
+                output_file.write(line)
+        self.stderr.write('Leaderboard exported to {}'.format(options['output']))
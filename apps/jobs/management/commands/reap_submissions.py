@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from jobs.sender import publish_submission_message
+from jobs.utils import get_stuck_submissions, retry_submission
+
+
+class Command(BaseCommand):
+
+    help = ("Requeues the submissions whose worker died, which failed because of the infrastructure or which no "
+            "worker started, with an exponential backoff, and fails the ones retried "
+            "SUBMISSION_REAPER['MAX_RETRIES'] times. Meant to run every few minutes.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only list the stuck submissions')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        requeued_count = 0
+        for submission in get_stuck_submissions(now):
+            self.stdout.write('Submission {0} is stuck {1} after {2} retries'.format(
+                submission.pk, submission.status, submission.retry_count))
+            if options['dry_run']:
+                continue
+            if retry_submission(submission, now):
+                publish_submission_message(submission.challenge_phase.challenge_id, submission.challenge_phase_id,
+                                           submission.pk)
+                requeued_count += 1
+        self.stdout.write(self.style.SUCCESS('Requeued {} submissions'.format(requeued_count)))
@@ -0,0 +1,34 @@
+import pika
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from challenges.models import ChallengePhase
+from jobs.utils import declare_submission_exchanges, release_submission_queue
+
+
+class Command(BaseCommand):
+
+    help = ("Hands the submission queues of the phases of challenges over to the shared queue, once the workers "
+            "serving these challenges are gone. Meant to run when dedicated workers are scaled in.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('challenge_ids', nargs='+', type=int, help='Ids of the challenges')
+
+    def handle(self, *args, **options):
+        connection = pika.BlockingConnection(pika.ConnectionParameters(host=settings.RABBITMQ_PARAMETERS['HOST']))
+        declare_submission_exchanges(connection.channel())
+        for phase in ChallengePhase.objects.filter(challenge_id__in=options['challenge_ids']).order_by('pk'):
+            # RabbitMQ closes the channel of a failed operation, e.g. on a queue which does not exist
+            channel = connection.channel()
+            try:
+                moved_count = release_submission_queue(channel, phase.challenge_id, phase.pk)
+            except pika.exceptions.ChannelClosed as e:
+                self.stdout.write('Queue of phase {0} of challenge {1} was not released: {2}'.format(
+                    phase.pk, phase.challenge_id, e))
+                continue
+            channel.close()
+            self.stdout.write(self.style.SUCCESS('Released the queue of phase {0} of challenge {1}, moved {2} '
+                                                 'submissions to the shared queue'.format(
+                                                     phase.pk, phase.challenge_id, moved_count)))
+        connection.close()
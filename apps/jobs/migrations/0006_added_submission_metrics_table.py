@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:56
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_added_new_fields_to_submission_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionMetrics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('queue_wait_time', models.FloatField(blank=True, null=True)),
+                ('wall_time', models.FloatField()),
+                ('cpu_user_time', models.FloatField()),
+                ('cpu_system_time', models.FloatField()),
+                ('peak_memory', models.BigIntegerField()),
+                ('bytes_downloaded', models.BigIntegerField(default=0)),
+                ('db_queries', models.PositiveIntegerField(default=0)),
+                ('db_time', models.FloatField(default=0)),
+                ('submission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='jobs.Submission')),
+            ],
+            options={
+                'db_table': 'submission_metrics',
+            },
+        ),
+    ]
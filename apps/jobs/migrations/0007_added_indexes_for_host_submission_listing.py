@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 22:24
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('challenges', '0028_added_priority_field_to_challenge_phase'),
+        ('participants', '0008_added_unique_in_team_name'),
+        ('jobs', '0006_added_submission_metrics_table'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='submission',
+            index_together=set([('challenge_phase', 'participant_team'), ('challenge_phase', 'status', 'submitted_at')]),
+        ),
+    ]
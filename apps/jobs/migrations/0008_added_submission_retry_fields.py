@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 22:57
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_added_indexes_for_host_submission_listing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='retried_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='submission',
+            name='retry_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
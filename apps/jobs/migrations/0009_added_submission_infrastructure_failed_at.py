@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 23:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_added_submission_retry_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submission',
+            name='infrastructure_failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
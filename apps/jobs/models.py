@@ -78,6 +78,12 @@ class Submission(TimeStampedModel):
     submission_metadata_file = models.FileField(
         upload_to=RandomFileName("submission_files/submission_{id}"), null=True, blank=True)
     execution_time_limit = models.PositiveIntegerField(default=300)
+    # number of times the submission was requeued by `reap_submissions` after its worker died
+    retry_count = models.PositiveIntegerField(default=0)
+    retried_at = models.DateTimeField(null=True, blank=True)
+    # set by a worker which could not evaluate the submission because of the infrastructure, e.g. when
+    # its input file could not be downloaded, and cleared when `reap_submissions` requeues it
+    infrastructure_failed_at = models.DateTimeField(null=True, blank=True)
     method_name = models.CharField(max_length=1000, null=True)
     method_description = models.TextField(blank=True, null=True)
     publication_url = models.CharField(max_length=1000, null=True)
@@ -89,6 +95,11 @@ class Submission(TimeStampedModel):
     class Meta:
         app_label = 'jobs'
         db_table = 'submission'
+        # used by the listings of the submissions of a challenge phase to its hosts
+        index_together = [
+            ('challenge_phase', 'status', 'submitted_at'),
+            ('challenge_phase', 'participant_team'),
+        ]
 
     @property
     def execution_time(self):
@@ -162,3 +173,28 @@ class Submission(TimeStampedModel):
 
         submission_instance = super(Submission, self).save(*args, **kwargs)
         return submission_instance
+
+
+class SubmissionMetrics(TimeStampedModel):
+    """Model representing the resources spent by a worker on evaluating a submission"""
+
+    submission = models.OneToOneField(Submission, related_name='metrics')
+    # time spent in the queue, from `submitted_at` to `started_at` of submission (in seconds)
+    queue_wait_time = models.FloatField(null=True, blank=True)
+    # time spent by the worker on the submission, including downloads and saving results (in seconds)
+    wall_time = models.FloatField()
+    cpu_user_time = models.FloatField()
+    cpu_system_time = models.FloatField()
+    # maximum resident set size of the evaluating process (in kilobytes)
+    peak_memory = models.BigIntegerField()
+    bytes_downloaded = models.BigIntegerField(default=0)
+    db_queries = models.PositiveIntegerField(default=0)
+    # time spent in database queries (in seconds)
+    db_time = models.FloatField(default=0)
+
+    def __unicode__(self):
+        return '{}'.format(self.submission_id)
+
+    class Meta:
+        app_label = 'jobs'
+        db_table = 'submission_metrics'
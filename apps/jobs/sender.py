@@ -1,27 +1,31 @@
 import json
 import pika
 
+from django.conf import settings
+
+from .utils import declare_submission_exchanges, get_submission_routing_key
+
 
 def publish_submission_message(challenge_id, phase_id, submission_id):
 
     connection = pika.BlockingConnection(pika.ConnectionParameters(
-            host='localhost'))
+            host=settings.RABBITMQ_PARAMETERS['HOST']))
     channel = connection.channel()
-    channel.exchange_declare(exchange='evalai_submissions', type='topic')
 
-    # though worker is creating the queue(queue creation is idempotent too)
-    # but lets create the queue here again, so that messages dont get missed
-    # later on we can apply a check on queue message length to raise some alert
-    # this way we will be notified of worker being up or not
-    channel.queue_declare(queue='submission_task_queue', durable=True)
+    # the queue of a challenge phase is created by the workers which have the challenge loaded.
+    # if there is no such worker yet, the message falls back to the shared submission queue,
+    # so that messages dont get missed. later on we can apply a check on the length of the
+    # shared queue to raise some alert, this way we will be notified of worker being up or not
+    declare_submission_exchanges(channel)
+    routing_key = get_submission_routing_key(challenge_id, phase_id)
 
     message = {
         'challenge_id': challenge_id,
         'phase_id': phase_id,
         'submission_id': submission_id
     }
-    channel.basic_publish(exchange='evalai_submissions',
-                          routing_key='submission.*.*',
+    channel.basic_publish(exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
+                          routing_key=routing_key,
                           body=json.dumps(message),
                           properties=pika.BasicProperties(delivery_mode=2))    # make message persistent
 
@@ -2,7 +2,7 @@ from rest_framework import serializers
 
 from challenges.models import LeaderboardData
 
-from .models import Submission
+from .models import Submission, SubmissionMetrics
 
 
 class SubmissionSerializer(serializers.ModelSerializer):
@@ -56,3 +56,11 @@ class LeaderboardDataSerializer(serializers.ModelSerializer):
 
     def get_leaderboard_schema(self, obj):
         return obj.leaderboard.schema
+
+
+class SubmissionMetricsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = SubmissionMetrics
+        fields = ('submission', 'queue_wait_time', 'wall_time', 'cpu_user_time', 'cpu_system_time',
+                  'peak_memory', 'bytes_downloaded', 'db_queries', 'db_time',)
@@ -6,9 +6,19 @@ urlpatterns = [
     url(r'challenge/(?P<challenge_id>[0-9]+)/'
         r'challenge_phase/(?P<challenge_phase_id>[0-9]+)/submission/(?P<submission_id>[0-9]+)',
         views.change_submission_visibility, name='change_submission_visibility'),
+    url(r'challenge/(?P<challenge_id>[0-9]+)/'
+        r'challenge_phase/(?P<challenge_phase_id>[0-9]+)/submissions$',
+        views.get_challenge_phase_submissions, name='get_challenge_phase_submissions'),
+    url(r'challenge/(?P<challenge_id>[0-9]+)/'
+        r'challenge_phase/(?P<challenge_phase_id>[0-9]+)/submissions/stream$',
+        views.stream_challenge_phase_submissions, name='stream_challenge_phase_submissions'),
     url(r'challenge/(?P<challenge_id>[0-9]+)/'
         r'challenge_phase/(?P<challenge_phase_id>[0-9]+)/submission/',
         views.challenge_submission, name='challenge_submission'),
+    url(r'challenge_phase_split/(?P<challenge_phase_split_id>[0-9]+)/leaderboard/export$',
+        views.export_leaderboard, name='export_leaderboard'),
     url(r'challenge_phase_split/(?P<challenge_phase_split_id>[0-9]+)/leaderboard/',
         views.leaderboard, name='leaderboard'),
+    url(r'submission/(?P<submission_id>[0-9]+)/metrics$',
+        views.get_submission_metrics, name='get_submission_metrics'),
 ]
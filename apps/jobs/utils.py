@@ -0,0 +1,187 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from challenges.models import LeaderboardData
+
+from .models import Submission
+
+# measurements of `SubmissionMetrics` by which hosts can filter the submissions of a challenge phase
+SUBMISSION_METRIC_FILTERS = ('queue_wait_time', 'wall_time', 'cpu_user_time', 'cpu_system_time', 'peak_memory')
+
+
+def declare_submission_exchanges(channel):
+    """
+    Declares the submission exchange along with its shared fallback exchange and queue.
+    Messages which no challenge phase queue is bound for end up in the shared queue.
+    """
+    channel.exchange_declare(exchange=settings.RABBITMQ_PARAMETERS['SHARED_EXCHANGE']['NAME'],
+                             type=settings.RABBITMQ_PARAMETERS['SHARED_EXCHANGE']['TYPE'])
+    channel.queue_declare(queue=settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'], durable=True)
+    channel.queue_bind(exchange=settings.RABBITMQ_PARAMETERS['SHARED_EXCHANGE']['NAME'],
+                       queue=settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'],
+                       routing_key='submission.*.*')
+    channel.exchange_declare(exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
+                             type=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['TYPE'],
+                             arguments={
+                                 'alternate-exchange': settings.RABBITMQ_PARAMETERS['SHARED_EXCHANGE']['NAME']})
+
+
+def get_submission_routing_key(challenge_id, phase_id):
+    """Returns the routing key with which submission messages of a challenge phase are published"""
+    return 'submission.{0}.{1}'.format(challenge_id, phase_id)
+
+
+def get_submission_queue_name(challenge_id, phase_id):
+    """Returns the name of the queue holding submission messages of a challenge phase"""
+    return '{0}.challenge_{1}.phase_{2}'.format(settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'],
+                                                challenge_id, phase_id)
+
+
+def get_submission_queue_arguments():
+    """
+    Returns the arguments with which the queue of a challenge phase is declared. Its dropped messages are
+    dead-lettered to the shared exchange, with their routing key, and so are its messages waiting for more than
+    `PHASE_QUEUE_MESSAGE_TTL` seconds if it is set. The queue is never deleted by RabbitMQ, which would discard
+    its messages, see `release_submission_queue`.
+    """
+    arguments = {
+        'x-dead-letter-exchange': settings.RABBITMQ_PARAMETERS['SHARED_EXCHANGE']['NAME'],
+    }
+    if settings.RABBITMQ_PARAMETERS['PHASE_QUEUE_MESSAGE_TTL']:
+        arguments['x-message-ttl'] = settings.RABBITMQ_PARAMETERS['PHASE_QUEUE_MESSAGE_TTL'] * 1000
+    return arguments
+
+
+def release_submission_queue(channel, challenge_id, phase_id):
+    """
+    Unbinds the queue of a challenge phase, moves its messages to the shared exchange with their routing key and
+    deletes it, so that the submissions of a challenge whose workers are gone reach the shared queue.
+    Returns the number of moved messages.
+    """
+    queue_name = get_submission_queue_name(challenge_id, phase_id)
+    routing_key = get_submission_routing_key(challenge_id, phase_id)
+    channel.queue_unbind(queue=queue_name, exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
+                         routing_key=routing_key)
+    moved_count = 0
+    while True:
+        method, properties, body = channel.basic_get(queue=queue_name)
+        if not method:
+            break
+        # acknowledged once published, a message is never lost and at worst moved twice
+        channel.basic_publish(exchange=settings.RABBITMQ_PARAMETERS['SHARED_EXCHANGE']['NAME'],
+                              routing_key=routing_key, body=body, properties=properties)
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        moved_count += 1
+    # a message published before the queue was unbound may still arrive, it is then left in the queue
+    channel.queue_delete(queue=queue_name, if_empty=True)
+    return moved_count
+
+
+def parse_submission_filter_datetime(value):
+    """Returns the aware datetime of a query parameter, or `None` if it is not a valid datetime"""
+    try:
+        value = parse_datetime(value)
+    except ValueError:
+        return None
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def get_submission_filters(query_params):
+    """
+    Returns the lookups filtering the submissions of a challenge phase by the query parameters
+    `status` (comma separated), `participant_team`, `submitted_after`, `submitted_before` and
+    `min_<metric>` / `max_<metric>` for each metric in `SUBMISSION_METRIC_FILTERS`.
+    Raises `ValueError` with the name of the first invalid parameter.
+    """
+    filters = {}
+    if query_params.get('status'):
+        statuses = query_params['status'].split(',')
+        if not set(statuses) <= set(option for option, _ in Submission.STATUS_OPTIONS):
+            raise ValueError('status')
+        filters['status__in'] = statuses
+
+    if query_params.get('participant_team'):
+        if not query_params['participant_team'].isdigit():
+            raise ValueError('participant_team')
+        filters['participant_team'] = int(query_params['participant_team'])
+
+    for param, lookup in (('submitted_after', 'submitted_at__gte'), ('submitted_before', 'submitted_at__lt')):
+        if query_params.get(param):
+            filters[lookup] = parse_submission_filter_datetime(query_params[param])
+            if filters[lookup] is None:
+                raise ValueError(param)
+
+    for metric in SUBMISSION_METRIC_FILTERS:
+        for prefix, lookup in (('min', 'gte'), ('max', 'lte')):
+            param = '{0}_{1}'.format(prefix, metric)
+            if query_params.get(param):
+                try:
+                    filters['metrics__{0}__{1}'.format(metric, lookup)] = float(query_params[param])
+                except ValueError:
+                    raise ValueError(param)
+    return filters
+
+
+def get_submission_retry_delay(retry_count):
+    """Returns the seconds a submission retried `retry_count` times waits after a failure before it is retried again"""
+    return settings.SUBMISSION_REAPER['RETRY_BACKOFF'] * 2 ** retry_count
+
+
+def get_stuck_submissions(now):
+    """
+    Returns the submissions to retry once their retry delay is over: the running ones beyond their
+    `execution_time_limit` plus `RUNNING_SLACK` seconds, whose worker died, the submitted ones which a worker could
+    not evaluate because of the infrastructure, and the submitted ones which no worker started since they were
+    submitted or retried, whose message may have been lost.
+    """
+    running_slack = timedelta(seconds=settings.SUBMISSION_REAPER['RUNNING_SLACK'])
+    running_submissions = Submission.objects.select_related('challenge_phase').filter(
+        status=Submission.RUNNING, started_at__lt=now - running_slack)
+    stuck_submissions = [
+        submission for submission in running_submissions
+        if submission.started_at + timedelta(seconds=submission.execution_time_limit) + running_slack < now]
+
+    before_retry_delay = Q()
+    for retry_count in range(settings.SUBMISSION_REAPER['MAX_RETRIES'] + 1):
+        retry_delay_start = now - timedelta(seconds=get_submission_retry_delay(retry_count))
+        # never started ones keep the delay of their last retry once they reached `MAX_RETRIES`
+        retry_count_lookup = (
+            Q(retry_count=retry_count) if retry_count < settings.SUBMISSION_REAPER['MAX_RETRIES'] else
+            Q(retry_count__gte=retry_count))
+        before_retry_delay |= retry_count_lookup & (
+            Q(infrastructure_failed_at__lt=retry_delay_start) |
+            Q(infrastructure_failed_at__isnull=True, last_queued_at__lt=retry_delay_start))
+    submitted_submissions = Submission.objects.select_related('challenge_phase').filter(
+        status=Submission.SUBMITTED).annotate(last_queued_at=Coalesce('retried_at', 'submitted_at'))
+    stuck_submissions.extend(submitted_submissions.filter(before_retry_delay))
+    return stuck_submissions
+
+
+def retry_submission(submission, now):
+    """
+    Puts a stuck submission back to `submitted` to be requeued, deleting the leaderboard data its
+    interrupted evaluation may have created, or fails it once it was retried `MAX_RETRIES` times. A submission
+    no worker started is never failed, it is requeued with the delay of its last retry instead.
+    Returns whether the submission is to be requeued, `False` if a worker updated it in the meantime.
+    """
+    max_retries = settings.SUBMISSION_REAPER['MAX_RETRIES']
+    never_started = submission.status == Submission.SUBMITTED and submission.infrastructure_failed_at is None
+    # the update only applies if the submission is still in the state it was found stuck in
+    submissions = Submission.objects.filter(pk=submission.pk, status=submission.status,
+                                            retry_count=submission.retry_count)
+    if submission.retry_count >= max_retries and not never_started:
+        submissions.update(status=Submission.FAILED, completed_at=now)
+        return False
+    retry_count = submission.retry_count + 1 if submission.retry_count < max_retries else submission.retry_count
+    if not submissions.update(status=Submission.SUBMITTED, retry_count=retry_count, retried_at=now,
+                              infrastructure_failed_at=None):
+        return False
+    LeaderboardData.objects.filter(submission=submission).delete()
+    return True
@@ -6,30 +6,35 @@ from rest_framework.decorators import (api_view,
 
 from django.db.models.expressions import RawSQL
 from django.db.models import FloatField
+from django.http import StreamingHttpResponse
 
 from rest_framework_expiring_authtoken.authentication import (
     ExpiringTokenAuthentication,)
 from rest_framework.response import Response
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 
 from accounts.permissions import HasVerifiedEmail
-from base.utils import paginated_queryset
+from base.throttles import AnonRateThrottle, SubmissionRateThrottle, UserRateThrottle
+from base.utils import cursor_paginated_queryset, paginated_queryset, streaming_json_response
 from challenges.models import (
     ChallengePhase,
     Challenge,
     ChallengePhaseSplit,
     LeaderboardData,)
+from hosts.utils import is_user_a_host_of_challenge
 from participants.models import (ParticipantTeam,)
 from participants.utils import (
     get_participant_team_id_of_user_for_a_challenge,)
 
-from .models import Submission
+from .exports import iterate_leaderboard_csv
+from .models import Submission, SubmissionMetrics
 from .sender import publish_submission_message
-from .serializers import SubmissionSerializer
+from .serializers import SubmissionSerializer, SubmissionMetricsSerializer
+from .utils import get_submission_filters
 
 
-@throttle_classes([UserRateThrottle])
 @api_view(['GET', 'POST'])
+# below `api_view`, which reads the throttles of the view when it wraps it
+@throttle_classes([UserRateThrottle, SubmissionRateThrottle])
 @permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
 @authentication_classes((ExpiringTokenAuthentication,))
 def challenge_submission(request, challenge_id, challenge_phase_id):
@@ -63,7 +68,8 @@ def challenge_submission(request, challenge_id, challenge_phase_id):
             return Response(response_data, status=status.HTTP_403_FORBIDDEN)
 
         submission = Submission.objects.filter(participant_team=participant_team_id,
-                                               challenge_phase=challenge_phase).order_by('-submitted_at')
+                                               challenge_phase=challenge_phase).select_related(
+            'participant_team').order_by('-submitted_at')
         paginator, result_page = paginated_queryset(submission, request)
         try:
             serializer = SubmissionSerializer(result_page, many=True, context={'request': request})
@@ -228,3 +234,118 @@ def leaderboard(request, challenge_phase_split_id):
     paginator, result_page = paginated_queryset(distinct_sorted_leaderboard_data, request)
     response_data = result_page
     return paginator.get_paginated_response(response_data)
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def get_challenge_phase_submissions(request, challenge_id, challenge_phase_id):
+    """
+    Returns the submissions of a Challenge Phase to the challenge hosts and admins, latest first,
+    filtered by the query parameters described in `get_submission_filters`
+    """
+
+    try:
+        challenge_phase = ChallengePhase.objects.get(pk=challenge_phase_id, challenge_id=challenge_id)
+    except ChallengePhase.DoesNotExist:
+        response_data = {'error': 'Challenge Phase does not exist'}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    if not (request.user.is_staff or is_user_a_host_of_challenge(request.user, challenge_id)):
+        response_data = {'error': 'Sorry, you are not allowed to view the submissions of this challenge phase!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        filters = get_submission_filters(request.query_params)
+    except ValueError as e:
+        response_data = {'error': 'Invalid value of the query parameter {}'.format(e)}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    submissions = Submission.objects.filter(challenge_phase=challenge_phase, **filters).select_related(
+        'participant_team')
+    paginator, result_page = cursor_paginated_queryset(submissions, request, ordering='-submitted_at')
+    serializer = SubmissionSerializer(result_page, many=True, context={'request': request})
+    response_data = serializer.data
+    return paginator.get_paginated_response(response_data)
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def stream_challenge_phase_submissions(request, challenge_id, challenge_phase_id):
+    """Streams all the submissions of a Challenge Phase as json to the challenge hosts and admins"""
+
+    try:
+        challenge_phase = ChallengePhase.objects.get(pk=challenge_phase_id, challenge_id=challenge_id)
+    except ChallengePhase.DoesNotExist:
+        response_data = {'error': 'Challenge Phase does not exist'}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    if not (request.user.is_staff or is_user_a_host_of_challenge(request.user, challenge_id)):
+        response_data = {'error': 'Sorry, you are not allowed to view the submissions of this challenge phase!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        filters = get_submission_filters(request.query_params)
+    except ValueError as e:
+        response_data = {'error': 'Invalid value of the query parameter {}'.format(e)}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    submissions = Submission.objects.filter(challenge_phase=challenge_phase, **filters).select_related(
+        'participant_team')
+    return streaming_json_response(submissions, SubmissionSerializer, context={'request': request})
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def export_leaderboard(request, challenge_phase_split_id):
+    """Streams all the leaderboard data of a Challenge Phase Split as csv to the challenge hosts and admins"""
+
+    try:
+        challenge_phase_split = ChallengePhaseSplit.objects.select_related('challenge_phase', 'leaderboard').get(
+            pk=challenge_phase_split_id)
+    except ChallengePhaseSplit.DoesNotExist:
+        response_data = {'error': 'Challenge Phase Split does not exist'}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    if not (request.user.is_staff or
+            is_user_a_host_of_challenge(request.user, challenge_phase_split.challenge_phase.challenge_id)):
+        response_data = {'error': 'Sorry, you are not allowed to export this leaderboard!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    response = StreamingHttpResponse(iterate_leaderboard_csv(challenge_phase_split), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="leaderboard_{0}.csv"'.format(challenge_phase_split.pk)
+    return response
+
+
+@api_view(['GET'])
+@throttle_classes([UserRateThrottle])
+@permission_classes((permissions.IsAuthenticated, HasVerifiedEmail))
+@authentication_classes((ExpiringTokenAuthentication,))
+def get_submission_metrics(request, submission_id):
+    """Returns the resources spent on evaluating a submission to the challenge hosts and admins"""
+
+    try:
+        submission = Submission.objects.select_related('challenge_phase').get(pk=submission_id)
+    except Submission.DoesNotExist:
+        response_data = {'error': 'Submission does not exist'}
+        return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+
+    if not (request.user.is_staff or
+            is_user_a_host_of_challenge(request.user, submission.challenge_phase.challenge_id)):
+        response_data = {'error': 'Sorry, you are not allowed to view the metrics of this submission!'}
+        return Response(response_data, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        submission_metrics = SubmissionMetrics.objects.get(submission=submission)
+    except SubmissionMetrics.DoesNotExist:
+        response_data = {'error': 'Submission has not been evaluated yet'}
+        return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
+
+    serializer = SubmissionMetricsSerializer(submission_metrics)
+    response_data = serializer.data
+    return Response(response_data, status=status.HTTP_200_OK)
@@ -75,7 +75,8 @@ class ParticipantTeamDetailSerializer(serializers.ModelSerializer):
         fields = ('id', 'team_name', 'created_by', 'members')
 
     def get_members(self, obj):
-        participants = Participant.objects.filter(team__pk=obj.id)
+        # uses the participants prefetched along with the team, see `get_participant_team_queryset`
+        participants = obj.participants.all()
         serializer = ParticipantSerializer(participants, many=True)
         return serializer.data
 
@@ -1,6 +1,6 @@
 from challenges.models import Challenge
 
-from .models import Participant
+from .models import Participant, ParticipantTeam
 
 
 def is_user_part_of_participant_team(user, participant_team_id):
@@ -24,13 +24,20 @@ def has_user_participated_in_challenge(user, challenge_id):
     return Challenge.objects.filter(pk=challenge_id, participant_teams__in=participant_teams).exists()
 
 
+def has_any_user_participated_in_challenge(users, challenge_id):
+    """Returns boolean if any of the users has participated in a particular challenge"""
+    return Challenge.objects.filter(pk=challenge_id, participant_teams__participants__user__in=users).exists()
+
+
 def get_participant_team_id_of_user_for_a_challenge(user, challenge_id):
-    """Returns the participant team object for a particular user for a particular challenge"""
-    participant_teams = get_participant_teams_for_user(user)
-    for participant_team in participant_teams:
-        if Challenge.objects.filter(pk=challenge_id, participant_teams=participant_team).exists():
-            return participant_team
-    return None
+    """Returns the id of the participant team of a particular user for a particular challenge, or `None`"""
+    return ParticipantTeam.objects.filter(
+        participants__user=user, challenge__pk=challenge_id).values_list('id', flat=True).first()
+
+
+def get_participant_team_queryset():
+    """Returns participant teams along with their creator and members, as shown by `ParticipantTeamDetailSerializer`"""
+    return ParticipantTeam.objects.select_related('created_by').prefetch_related('participants__user')
 
 
 def get_list_of_challenges_for_participant_team(participant_teams=[]):
@@ -1,4 +1,5 @@
 from django.contrib.auth.models import User
+from django.db.models import Prefetch, prefetch_related_objects
 
 from rest_framework import permissions, status
 from rest_framework.decorators import (api_view,
@@ -8,9 +9,9 @@ from rest_framework.decorators import (api_view,
 from rest_framework.response import Response
 from rest_framework_expiring_authtoken.authentication import (
     ExpiringTokenAuthentication,)
-from rest_framework.throttling import UserRateThrottle
 
 from accounts.permissions import HasVerifiedEmail
+from base.throttles import UserRateThrottle
 from base.utils import paginated_queryset
 from challenges.models import Challenge
 
@@ -22,7 +23,8 @@ from .serializers import (InviteParticipantToTeamSerializer,
                           ChallengeParticipantTeamListSerializer,
                           ParticipantTeamDetailSerializer,)
 from .utils import (get_list_of_challenges_for_participant_team,
-                    get_list_of_challenges_participated_by_a_user,)
+                    get_list_of_challenges_participated_by_a_user,
+                    get_participant_team_queryset,)
 
 
 @throttle_classes([UserRateThrottle])
@@ -33,7 +35,7 @@ def participant_team_list(request):
 
     if request.method == 'GET':
         participant_teams_id = Participant.objects.filter(user_id=request.user).values_list('team_id', flat=True)
-        participant_teams = ParticipantTeam.objects.filter(
+        participant_teams = get_participant_team_queryset().filter(
             id__in=participant_teams_id)
         paginator, result_page = paginated_queryset(participant_teams, request)
         serializer = ParticipantTeamDetailSerializer(result_page, many=True)
@@ -68,6 +70,7 @@ def participant_team_detail(request, pk):
         return Response(response_data, status=status.HTTP_406_NOT_ACCEPTABLE)
 
     if request.method == 'GET':
+        prefetch_related_objects([participant_team], 'created_by', 'participants__user')
         serializer = ParticipantTeamDetailSerializer(participant_team)
         response_data = serializer.data
         return Response(response_data, status=status.HTTP_200_OK)
@@ -183,16 +186,17 @@ def get_teams_and_corresponding_challenges_for_a_participant(request):
     Returns list of teams and corresponding challenges for a participant
     """
     # first get list of all the participants and teams related to the user
-    participant_objs = Participant.objects.filter(user=request.user).prefetch_related('team')
+    participant_objs = Participant.objects.filter(user=request.user).select_related(
+        'team__created_by').prefetch_related(
+        Prefetch('team__challenge_set', queryset=Challenge.objects.select_related('creator__created_by')))
 
     challenge_participated_teams = []
     for participant_obj in participant_objs:
         participant_team = participant_obj.team
 
-        challenges = Challenge.objects.filter(
-            participant_teams=participant_team)
+        challenges = participant_team.challenge_set.all()
 
-        if challenges.count():
+        if challenges:
             for challenge in challenges:
                 challenge_participated_teams.append(ChallengeParticipantTeam(
                     challenge, participant_team))
@@ -1,11 +1,19 @@
+import logging
+import os
+import threading
 import time
 import traceback
 
+from Queue import Queue, Full
+
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
 from datadog import initialize
-from datadog import statsd, api
+from datadog import api
+from datadog.threadstats import ThreadStats
+
+logger = logging.getLogger(__name__)
 
 options = {
     'api_key': settings.DATADOG_API_KEY,
@@ -14,15 +22,56 @@ options = {
 
 initialize(**options)
 
+# metrics are aggregated in process and sent to DataDog in batches from a background thread
+stats = ThreadStats()
+
+# events waiting to be sent to DataDog, new events are dropped when it is full
+event_queue = Queue(maxsize=getattr(settings, 'DATADOG_EVENT_QUEUE_SIZE', 100))
+
+# id of the process which started the background threads, see `start_background_threads`
+background_threads_pid = None
+background_threads_lock = threading.Lock()
+
+
+def send_events():
+    while True:
+        event = event_queue.get()
+        try:
+            api.Event.create(**event)
+        except Exception as e:
+            logger.warning('Failed to send event to DataDog, error {}'.format(e))
+
+
+def start_background_threads():
+    """
+    Starts the threads flushing the metrics and sending the events, once in every process.
+    uwsgi imports the application in its master process and forks the workers from it, and
+    threads do not survive a fork, so they are started on the first request of each worker.
+    """
+    global background_threads_pid
+    with background_threads_lock:
+        if background_threads_pid == os.getpid():
+            return
+        stats.start(flush_interval=getattr(settings, 'DATADOG_FLUSH_INTERVAL', 10))
+        event_thread = threading.Thread(target=send_events, name='datadog-events')
+        event_thread.daemon = True
+        event_thread.start()
+        background_threads_pid = os.getpid()
+
 
 class DatadogMiddleware(MiddlewareMixin):
     """
     Middleware to submit some metrics to DataDog about each requests.
+
+    Nothing is sent to DataDog inside the request, so a slow or failing DataDog
+    does not add latency to the API.
     """
     DATADOG_TIMING_ATTRIBUTE = '_datadog_start_time'
     app_name = settings.DATADOG_APP_NAME
 
     def process_request(self, request):
+        if background_threads_pid != os.getpid():
+            start_background_threads()
         setattr(request, self.DATADOG_TIMING_ATTRIBUTE, time.time())
 
     def process_response(self, request, response):
@@ -39,12 +88,12 @@ class DatadogMiddleware(MiddlewareMixin):
         tags = self._get_metric_tags(request)
 
         if 200 <= response.status_code < 400:
-            statsd.increment(success_metric, tags=tags)
+            stats.increment(success_metric, tags=tags)
         else:
-            statsd.increment(unsuccess_metric, tags=tags)
+            stats.increment(unsuccess_metric, tags=tags)
 
-        statsd.increment(count_metric, tags=tags)
-        statsd.histogram(timing_metric, request_time, tags=tags)
+        stats.increment(count_metric, tags=tags)
+        stats.histogram(timing_metric, request_time, tags=tags)
 
         return response
 
@@ -53,12 +102,19 @@ class DatadogMiddleware(MiddlewareMixin):
         title = 'Exception from {0}'.format(request.path)
         text = "Traceback: {0}".format(exc)
 
-        tags = self._get_metric_tags(request)
+        tags = self._get_metric_tags(request) + ['exception:{0}'.format(type(exception).__name__)]
         event_tags = [self.app_name, 'unhandled_exception']
-        app_error_metric = '{0}.unhandled_errors.{1}'.format(self.app_name, request.path)
+        app_error_metric = '{0}.unhandled_errors'.format(self.app_name)
 
-        statsd.increment(app_error_metric, tags=tags)
-        api.Event.create(title=title, text=text, tags=event_tags)
+        stats.increment(app_error_metric, tags=tags)
+        try:
+            event_queue.put_nowait({'title': title, 'text': text, 'tags': event_tags})
+        except Full:
+            stats.increment('{0}.dropped_events'.format(self.app_name))
 
     def _get_metric_tags(self, request):
-            return ['path:{0}'.format(request.path)]
+        # tag by the name of the url pattern, as raw paths contain ids and would
+        # create a new series for every challenge or submission
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = resolver_match.view_name if resolver_match else 'unresolved'
+        return ['route:{0}'.format(route), 'method:{0}'.format(request.method)]
@@ -0,0 +1,3 @@
+from query_profiling_middleware import QueryProfilingMiddleware
+
+__all__ = [QueryProfilingMiddleware]
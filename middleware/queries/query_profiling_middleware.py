@@ -0,0 +1,164 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.utils import CursorDebugWrapper
+from django.utils.deprecation import MiddlewareMixin
+
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+QUERY_PROFILING = dict({
+    # fraction of requests which are profiled
+    'SAMPLE_RATE': 1.0,
+    # add the profile to the response headers, meant for development
+    'RESPONSE_HEADERS': False,
+    # send the profile as DataDog metrics tagged with the view, meant for production
+    'METRICS': False,
+    # number of duplicate query fingerprints reported in the response headers
+    'DUPLICATE_QUERIES_TO_REPORT': 5,
+}, **getattr(settings, 'QUERY_PROFILING', {}))
+
+# literals are replaced so that queries differing only in their parameters share a fingerprint
+QUERY_LITERALS_REGEX = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+# state of the profile of the current request
+query_profile = threading.local()
+
+profiling_hooks_lock = threading.Lock()
+profiling_hooks_installed = False
+
+
+def is_profiling():
+    return getattr(query_profile, 'active', False)
+
+
+def profile_cursor_method(method):
+    # the debug cursor has just logged the query, which is also recorded for the request as
+    # `queries_log` is bounded and its indexes shift once it is full
+    def profiled_method(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if is_profiling():
+                query_profile.queries.append(self.db.queries_log[-1])
+    return profiled_method
+
+
+def profile_serializer_data(serializer_data):
+    def profiled_serializer_data(self):
+        if not is_profiling():
+            return serializer_data(self)
+        # a serializer accessing the data of another one is counted only once
+        query_profile.serializer_depth += 1
+        start_time = time.time()
+        start_query_count = len(query_profile.queries)
+        try:
+            return serializer_data(self)
+        finally:
+            query_profile.serializer_depth -= 1
+            if query_profile.serializer_depth == 0:
+                query_profile.serializer_time += time.time() - start_time
+                query_profile.serializer_query_count += len(query_profile.queries) - start_query_count
+    return profiled_serializer_data
+
+
+def install_profiling_hooks():
+    """
+    Wraps the debug cursor and the serializers to record the profile of the requests,
+    only once the middleware is enabled.
+    """
+    global profiling_hooks_installed
+    with profiling_hooks_lock:
+        if profiling_hooks_installed:
+            return
+        CursorDebugWrapper.execute = profile_cursor_method(CursorDebugWrapper.execute)
+        CursorDebugWrapper.executemany = profile_cursor_method(CursorDebugWrapper.executemany)
+        BaseSerializer.data = property(profile_serializer_data(BaseSerializer.data.fget))
+        profiling_hooks_installed = True
+
+
+def get_query_fingerprint(sql):
+    return hashlib.sha1(QUERY_LITERALS_REGEX.sub('?', sql).encode('utf-8')).hexdigest()[:12]
+
+
+class QueryProfilingMiddleware(MiddlewareMixin):
+    """
+    Middleware to profile the SQL queries and the serializers of a sample of requests.
+
+    Records the number of queries, the time spent in them, the queries repeated with
+    different parameters (usually N + 1 queries) and the time spent in serializers,
+    per view.
+    """
+    PROFILING_ATTRIBUTE = '_query_profiling'
+
+    def __init__(self, get_response=None):
+        super(QueryProfilingMiddleware, self).__init__(get_response)
+        install_profiling_hooks()
+
+    def process_request(self, request):
+        if random.random() >= QUERY_PROFILING['SAMPLE_RATE']:
+            return
+        setattr(request, self.PROFILING_ATTRIBUTE, {
+            'force_debug_cursor': connection.force_debug_cursor,
+        })
+        # log queries along with their time even when `DEBUG` is off
+        connection.force_debug_cursor = True
+        query_profile.active = True
+        query_profile.queries = []
+        query_profile.serializer_depth = 0
+        query_profile.serializer_time = 0
+        query_profile.serializer_query_count = 0
+
+    def process_response(self, request, response):
+        profiling = getattr(request, self.PROFILING_ATTRIBUTE, None)
+        if profiling is None:
+            return response
+
+        queries = query_profile.queries
+        connection.force_debug_cursor = profiling['force_debug_cursor']
+        query_profile.active = False
+        query_profile.queries = []
+
+        query_time = sum(float(query['time']) for query in queries)
+        fingerprints = Counter(get_query_fingerprint(query['sql']) for query in queries)
+        duplicates = [(fingerprint, count) for fingerprint, count in fingerprints.most_common() if count > 1]
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else 'unresolved'
+
+        if QUERY_PROFILING['RESPONSE_HEADERS']:
+            response['X-Query-Count'] = len(queries)
+            response['X-Query-Time'] = '{0:.3f}'.format(query_time)
+            response['X-Duplicate-Query-Count'] = sum(count - 1 for _, count in duplicates)
+            response['X-Duplicate-Queries'] = ','.join(
+                '{0}:{1}'.format(fingerprint, count)
+                for fingerprint, count in duplicates[:QUERY_PROFILING['DUPLICATE_QUERIES_TO_REPORT']])
+            response['X-Serializer-Time'] = '{0:.3f}'.format(query_profile.serializer_time)
+            response['X-Serializer-Query-Count'] = query_profile.serializer_query_count
+            for fingerprint, count in duplicates[:QUERY_PROFILING['DUPLICATE_QUERIES_TO_REPORT']]:
+                sql = next(query['sql'] for query in queries if get_query_fingerprint(query['sql']) == fingerprint)
+                logger.info('{0} ran {1} times in {2}: {3}'.format(fingerprint, count, view_name, sql))
+
+        if QUERY_PROFILING['METRICS']:
+            # imported here as DataDog is configured only in production
+            from middleware.metrics.metrics_middleware import stats
+
+            app_name = settings.DATADOG_APP_NAME
+            tags = ['route:{0}'.format(view_name)]
+            stats.histogram('{0}.query_count'.format(app_name), len(queries), tags=tags)
+            stats.histogram('{0}.query_time'.format(app_name), query_time, tags=tags)
+            stats.histogram('{0}.duplicate_query_count'.format(app_name),
+                            sum(count - 1 for _, count in duplicates), tags=tags)
+            stats.histogram('{0}.serializer_time'.format(app_name), query_profile.serializer_time, tags=tags)
+            stats.histogram('{0}.serializer_query_count'.format(app_name), query_profile.serializer_query_count,
+                            tags=tags)
+
+        return response
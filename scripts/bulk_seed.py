@@ -0,0 +1,428 @@
+# Command to run : python manage.py bulk_seed --settings=settings.dev --challenges 1000 --teams 100000
+'''
+    Seeds the database with a large amount of synthetic data to benchmark EvalAI at production scale.
+
+    * Small tables are filled with `bulk_create`, large tables (users, teams, submissions and
+      leaderboard data) are streamed into the database with `COPY` in batches
+    * Teams join challenges following a power law, so that a few challenges get huge leaderboards
+    * Scores of the submissions of a team improve with its skill and number of attempts
+    * The data generated for a seed is always the same, provided that the database is empty
+'''
+import bisect
+import math
+import os
+import random
+import time
+
+from cStringIO import StringIO
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from allauth.account.models import EmailAddress
+from faker import Factory
+
+from challenges.models import (Challenge,
+                               ChallengePhase,
+                               ChallengePhaseSplit,
+                               DatasetSplit,
+                               Leaderboard,
+                               LeaderboardData,)
+from hosts.models import ChallengeHost, ChallengeHostTeam
+from jobs.models import Submission
+from participants.models import Participant, ParticipantTeam
+
+fake = Factory.create()
+
+DEFAULT_OPTIONS = {
+    'seed': 0,
+    'challenges': 1000,
+    'phases': 2,
+    'splits': 2,
+    'teams': 100000,
+    'max_team_size': 4,
+    # mean number of challenges a team participates in
+    'participations': 2,
+    # mean number of submissions of a team to a challenge phase
+    'submissions': 10,
+    # number of rows sent to the database in one `COPY`
+    'batch_size': 50000,
+}
+
+LEADERBOARD_SCHEMA = {
+    'labels': ['score', ],
+    'default_order_by': 'score',
+}
+
+json_encoder = DjangoJSONEncoder()
+
+# exponent of the power law followed by the popularity of challenges
+CHALLENGE_POPULARITY_EXPONENT = 1.1
+
+
+def reserve_ids(model, count):
+    '''
+        Reserves `count` consecutive ids in the sequence of a table and returns the first one
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT setval(pg_get_serial_sequence(%s, 'id'), nextval(pg_get_serial_sequence(%s, 'id')) + %s - 1)",
+            [model._meta.db_table, model._meta.db_table, count])
+        return cursor.fetchone()[0] - count + 1
+
+
+def format_copy_value(value):
+    '''
+        Formats a value for the text format of `COPY`
+    '''
+    if value is None:
+        return '\\N'
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (int, long)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        value = json_encoder.encode(value)
+    elif hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    value = unicode(value).encode('utf-8')
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class CopyWriter(object):
+    '''
+        * Buffers rows of a model and sends them to the database with `COPY` every `batch_size` rows
+        * Allocates the ids of the rows in blocks of `batch_size`, so that rows can reference each other
+    '''
+
+    def __init__(self, model, batch_size):
+        self.model = model
+        self.batch_size = batch_size
+        self.fields = model._meta.concrete_fields
+        self.now = timezone.now()
+        # defaults of the fields which are not given in a row
+        self.defaults = dict(
+            (field.attname, None if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+             else format_copy_value(field.get_default())) for field in self.fields)
+        self.buffer = StringIO()
+        self.buffered_rows = 0
+        self.next_id = None
+        self.last_id = None
+        self.count = 0
+
+    def allocate_id(self):
+        if self.next_id is None or self.next_id > self.last_id:
+            self.next_id = reserve_ids(self.model, self.batch_size)
+            self.last_id = self.next_id + self.batch_size - 1
+        self.next_id += 1
+        return self.next_id - 1
+
+    def write(self, **row):
+        '''
+            Expects the values of a row by attribute name, e.g. `team_id`, and returns its id
+        '''
+        row.setdefault('id', self.allocate_id())
+        values = []
+        for field in self.fields:
+            if field.attname in row:
+                values.append(format_copy_value(row[field.attname]))
+            elif self.defaults[field.attname] is None:
+                values.append(format_copy_value(row.get('created_at', self.now)))
+            else:
+                values.append(self.defaults[field.attname])
+        self.buffer.write('\t'.join(values) + '\n')
+        self.buffered_rows += 1
+        if self.buffered_rows >= self.batch_size:
+            self.flush()
+        return row['id']
+
+    def flush(self):
+        if not self.buffered_rows:
+            return
+        self.buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert('COPY {} ({}) FROM STDIN'.format(
+                connection.ops.quote_name(self.model._meta.db_table),
+                ', '.join(connection.ops.quote_name(field.column) for field in self.fields)), self.buffer)
+        self.count += self.buffered_rows
+        self.buffer = StringIO()
+        self.buffered_rows = 0
+
+
+def save_example_file(file_name, upload_to):
+    '''
+        Saves a file of `examples/example1` once, it is shared by all the seeded objects
+    '''
+    with open(os.path.join(settings.BASE_DIR, 'examples', 'example1', file_name), 'rb') as example_file:
+        return default_storage.save(os.path.join(upload_to, file_name), ContentFile(example_file.read()))
+
+
+def choose_weighted(rng, cumulative_weights):
+    '''
+        Returns the index of an item chosen with probability proportional to its weight
+    '''
+    return bisect.bisect(cumulative_weights, rng.random() * cumulative_weights[-1])
+
+
+def geometric(rng, mean):
+    '''
+        Returns a positive integer following a geometric distribution with the given mean
+    '''
+    if mean <= 1:
+        return 1
+    return 1 + int(math.log(1 - rng.random()) / math.log(1 - 1.0 / mean))
+
+
+def log(message, start_time):
+    print '{} in {:.1f}s'.format(message, time.time() - start_time)
+
+
+def create_users(writer, rng, count, password, prefix):
+    user_ids = []
+    email_writer = CopyWriter(EmailAddress, writer.batch_size)
+    for i in xrange(count):
+        username = '{}{}'.format(prefix, i)
+        email = '{}@example.com'.format(username)
+        date_joined = writer.now - timedelta(days=rng.randint(0, 1000))
+        user_ids.append(writer.write(username=username, email=email, password=password, first_name='',
+                                     last_name='', is_staff=False, is_superuser=False, is_active=True,
+                                     date_joined=date_joined))
+        email_writer.write(user_id=user_ids[-1], email=email, verified=True, primary=True)
+    writer.flush()
+    email_writer.flush()
+    return user_ids
+
+
+def create_challenges(rng, options, host_teams, evaluation_script):
+    now = timezone.now()
+    challenges = []
+    for i in xrange(options['challenges']):
+        duration = timedelta(days=rng.randint(30, 365))
+        # half of the challenges are running, most of the others are over
+        state = rng.random()
+        if state < 0.5:
+            start_date = now - timedelta(seconds=rng.random() * duration.total_seconds())
+        elif state < 0.85:
+            start_date = now - duration - timedelta(days=rng.randint(1, 700))
+        else:
+            start_date = now + timedelta(days=rng.randint(1, 100))
+        challenges.append(Challenge(
+            title='{} Challenge {}'.format(fake.first_name(), i + 1),
+            short_description=fake.sentence(),
+            description=fake.paragraph(),
+            terms_and_conditions=fake.paragraph(),
+            submission_guidelines=fake.paragraph(),
+            evaluation_details=fake.paragraph(),
+            evaluation_script=evaluation_script,
+            creator=host_teams[i % len(host_teams)],
+            published=rng.random() < 0.9,
+            enable_forum=True,
+            anonymous_leaderboard=rng.random() < 0.1,
+            start_date=start_date,
+            end_date=start_date + duration,
+        ))
+    return Challenge.objects.bulk_create(challenges)
+
+
+def create_challenge_phases(rng, options, challenges, test_annotation):
+    challenge_phases = []
+    for challenge in challenges:
+        for i in xrange(options['phases']):
+            challenge_phases.append(ChallengePhase(
+                name='Phase {}'.format(i + 1),
+                description=fake.paragraph(),
+                leaderboard_public=True,
+                is_public=True,
+                is_submission_public=True,
+                start_date=challenge.start_date,
+                end_date=challenge.end_date,
+                challenge=challenge,
+                test_annotation=test_annotation,
+                max_submissions_per_day=rng.choice([3, 5, 10, 20]),
+                max_submissions=rng.choice([50, 100, 500, 1000]),
+                codename='phase{}'.format(i + 1),
+            ))
+    return ChallengePhase.objects.bulk_create(challenge_phases)
+
+
+def create_challenge_phase_splits(options, challenges, challenge_phases):
+    leaderboards = Leaderboard.objects.bulk_create([Leaderboard(schema=LEADERBOARD_SCHEMA) for _ in challenges])
+    dataset_splits = DatasetSplit.objects.bulk_create([
+        DatasetSplit(name='Split {}'.format(i + 1), codename='challenge{}_split{}'.format(challenge.id, i + 1))
+        for challenge in challenges for i in xrange(options['splits'])])
+    leaderboard_of_challenge = dict(zip((challenge.id for challenge in challenges), leaderboards))
+    challenge_phase_splits = []
+    for index, challenge_phase in enumerate(challenge_phases):
+        challenge_index = index // options['phases']
+        for dataset_split in dataset_splits[challenge_index * options['splits']:
+                                            (challenge_index + 1) * options['splits']]:
+            challenge_phase_splits.append(ChallengePhaseSplit(
+                challenge_phase=challenge_phase,
+                dataset_split=dataset_split,
+                leaderboard=leaderboard_of_challenge[challenge_phase.challenge_id],
+                visibility=ChallengePhaseSplit.PUBLIC,
+            ))
+    return ChallengePhaseSplit.objects.bulk_create(challenge_phase_splits)
+
+
+def create_submissions(rng, options, writers, team_id, member_ids, challenge_phase, phase_splits, input_file,
+                       skill, difficulty):
+    '''
+        Creates the submissions of a team to a challenge phase along with their leaderboard data
+    '''
+    now = writers['submission'].now
+    start_date = challenge_phase.start_date
+    end_date = min(challenge_phase.end_date, now)
+    number_of_submissions = min(geometric(rng, options['submissions']), challenge_phase.max_submissions)
+    duration = (end_date - start_date).total_seconds()
+    submitted_at_list = sorted(start_date + timedelta(seconds=rng.random() * duration)
+                               for _ in xrange(number_of_submissions))
+    best_score = difficulty + skill * (100 - difficulty)
+    for submission_number, submitted_at in enumerate(submitted_at_list, 1):
+        if now - submitted_at < timedelta(minutes=10):
+            status = rng.choice([Submission.SUBMITTED, Submission.RUNNING])
+        else:
+            status = Submission.FAILED if rng.random() < 0.15 else Submission.FINISHED
+        started_at = submitted_at + timedelta(seconds=rng.expovariate(1 / 30.0))
+        completed_at = None
+        if status in (Submission.FINISHED, Submission.FAILED):
+            completed_at = started_at + timedelta(seconds=rng.expovariate(1 / 60.0))
+        submission_id = writers['submission'].write(
+            participant_team_id=team_id,
+            challenge_phase_id=challenge_phase.id,
+            created_by_id=rng.choice(member_ids),
+            status=status,
+            is_public=rng.random() < 0.8,
+            submission_number=submission_number,
+            submitted_at=submitted_at,
+            started_at=started_at if status != Submission.SUBMITTED else None,
+            completed_at=completed_at,
+            input_file=input_file,
+            stdout_file=None,
+            stderr_file=None,
+            submission_result_file=None,
+            submission_metadata_file=None,
+            created_at=submitted_at,
+        )
+        if status != Submission.FINISHED:
+            continue
+        # a team gets closer to its best score with every attempt
+        score = best_score * (1 - math.exp(-submission_number / 3.0)) + rng.gauss(0, 2)
+        for challenge_phase_split in phase_splits:
+            writers['leaderboard_data'].write(
+                challenge_phase_split_id=challenge_phase_split.id,
+                submission_id=submission_id,
+                leaderboard_id=challenge_phase_split.leaderboard_id,
+                result={'score': round(min(max(score + rng.gauss(0, 1), 0), 100), 4)},
+                created_at=completed_at,
+            )
+
+
+def bulk_seed(**options):
+    '''
+        Seeds the database, see `DEFAULT_OPTIONS` for the options
+    '''
+    options = dict(DEFAULT_OPTIONS, **options)
+    rng = random.Random(options['seed'])
+    fake.seed(options['seed'])
+    batch_size = options['batch_size']
+    start_time = time.time()
+    # hashing a password takes tens of milliseconds, so every user gets the same hash
+    password = make_password('password')
+
+    evaluation_script = save_example_file('string_matching.zip', 'evaluation_scripts')
+    test_annotation = save_example_file('test_annotation.txt', 'test_annotations')
+    input_file = save_example_file('test_annotation.txt', 'submission_files')
+
+    with transaction.atomic():
+        number_of_hosts = max(1, options['challenges'] // 10)
+        host_user_ids = create_users(CopyWriter(User, batch_size), rng, number_of_hosts, password, 'bulk_host')
+        host_teams = ChallengeHostTeam.objects.bulk_create([
+            ChallengeHostTeam(team_name='{} Host Team {}'.format(fake.city(), i + 1), created_by_id=user_id)
+            for i, user_id in enumerate(host_user_ids)])
+        ChallengeHost.objects.bulk_create([
+            ChallengeHost(user_id=host_team.created_by_id, team_name=host_team, status=ChallengeHost.SELF,
+                          permissions=ChallengeHost.ADMIN) for host_team in host_teams])
+        log('Created {} challenge hosts'.format(number_of_hosts), start_time)
+
+        challenges = create_challenges(rng, options, host_teams, evaluation_script)
+        challenge_phases = create_challenge_phases(rng, options, challenges, test_annotation)
+        challenge_phase_splits = create_challenge_phase_splits(options, challenges, challenge_phases)
+        log('Created {} challenges, {} phases and {} phase splits'.format(
+            len(challenges), len(challenge_phases), len(challenge_phase_splits)), start_time)
+
+        team_sizes = [min(geometric(rng, 1.6), options['max_team_size']) for _ in xrange(options['teams'])]
+        participant_user_ids = create_users(CopyWriter(User, batch_size), rng, sum(team_sizes), password,
+                                            'bulk_participant')
+        log('Created {} users'.format(len(participant_user_ids) + number_of_hosts), start_time)
+
+        # teams only join challenges which have started, the most popular ones the most
+        started_challenges = [challenge for challenge in challenges if challenge.start_date < timezone.now()]
+        cumulative_weights = []
+        for rank in xrange(len(started_challenges)):
+            weight = 1.0 / (rank + 1) ** CHALLENGE_POPULARITY_EXPONENT
+            cumulative_weights.append(weight + (cumulative_weights[-1] if cumulative_weights else 0))
+        difficulties = dict((challenge.id, rng.uniform(10, 60)) for challenge in started_challenges)
+        phases_of_challenge = {}
+        for challenge_phase in challenge_phases:
+            phases_of_challenge.setdefault(challenge_phase.challenge_id, []).append(challenge_phase)
+        splits_of_phase = {}
+        for challenge_phase_split in challenge_phase_splits:
+            splits_of_phase.setdefault(challenge_phase_split.challenge_phase_id, []).append(challenge_phase_split)
+
+        writers = {
+            'team': CopyWriter(ParticipantTeam, batch_size),
+            'participant': CopyWriter(Participant, batch_size),
+            'challenge_team': CopyWriter(Challenge.participant_teams.through, batch_size),
+            'submission': CopyWriter(Submission, batch_size),
+            'leaderboard_data': CopyWriter(LeaderboardData, batch_size),
+        }
+        member_index = 0
+        for team_number, team_size in enumerate(team_sizes, 1):
+            member_ids = participant_user_ids[member_index:member_index + team_size]
+            member_index += team_size
+            team_id = writers['team'].write(team_name='{} Team {}'.format(fake.last_name(), team_number),
+                                            created_by_id=member_ids[0])
+            for user_id in member_ids:
+                writers['participant'].write(user_id=user_id, team_id=team_id, status=Participant.ACCEPTED)
+            if not started_challenges:
+                continue
+            skill = rng.betavariate(2, 5)
+            joined_challenges = sorted(set(choose_weighted(rng, cumulative_weights)
+                                           for _ in xrange(geometric(rng, options['participations']))))
+            for challenge in (started_challenges[index] for index in joined_challenges):
+                writers['challenge_team'].write(challenge_id=challenge.id, participantteam_id=team_id)
+                for index, challenge_phase in enumerate(phases_of_challenge.get(challenge.id, [])):
+                    # fewer teams make it to the later phases
+                    if index and rng.random() < 0.5:
+                        break
+                    create_submissions(rng, options, writers, team_id, member_ids, challenge_phase,
+                                       splits_of_phase.get(challenge_phase.id, []), input_file, skill,
+                                       difficulties[challenge.id])
+        for writer in writers.values():
+            writer.flush()
+        log('Created {} participant teams, {} submissions and {} leaderboard entries'.format(
+            writers['team'].count, writers['submission'].count, writers['leaderboard_data'].count), start_time)
+
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def run(*args):
+    '''
+        Entry point of `python manage.py runscript bulk_seed --script-args teams=1000 seed=42`
+    '''
+    options = {}
+    for arg in args:
+        name, _, value = arg.partition('=')
+        options[name] = int(value)
+    bulk_seed(**options)
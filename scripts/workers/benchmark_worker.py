@@ -0,0 +1,439 @@
+'''
+    Throughput benchmark of the submission worker.
+
+    Drives the message processing pipeline of `submission_worker` with an in-memory stand-in of
+    the broker, so that neither RabbitMQ nor a running web server is needed, e.g.
+
+        python scripts/workers/benchmark_worker.py --settings settings.dev --submissions 500 --scale 100
+
+    * A benchmark challenge is created along with its submissions, and deleted at the end
+    * Its evaluation script is the string matcher of `examples/example1`, which matches the
+      submission against the annotation file `--scale` times
+    * Files are downloaded over HTTP from a local file server serving `MEDIA_ROOT`, or copied
+      from the filesystem with `--files filesystem`. `--latency` delays every download like
+      remote storage would, and `--prefetch` downloads inputs ahead of their evaluation
+    * `--mmap` evaluates with a variant of the matcher taking the annotation as a memory mapped
+      array of numbers, which needs numpy
+    * Reports the throughput, the p50 / p99 latency of submissions and the time spent in each
+      stage of the pipeline
+'''
+from __future__ import absolute_import, division
+import argparse
+import collections
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import SimpleHTTPServer
+import SocketServer
+import sys
+import threading
+import time
+import zipfile
+
+from datetime import timedelta
+from os.path import dirname, join
+
+parser = argparse.ArgumentParser(description='Measures the throughput of the submission worker.')
+parser.add_argument('--settings', default='settings.dev', help='Django settings module')
+parser.add_argument('--submissions', type=int, default=200, help='number of submissions to evaluate')
+parser.add_argument('--phases', type=int, default=2, help='number of phases of the benchmark challenge')
+parser.add_argument('--splits', type=int, default=2, help='number of dataset splits of each phase')
+parser.add_argument('--lines', type=int, default=10000, help='number of lines of the annotation files')
+parser.add_argument('--scale', type=int, default=10,
+                    help='number of times the evaluation script matches a submission, scales its cpu time')
+parser.add_argument('--files', choices=('http', 'filesystem'), default='http',
+                    help='serve files from a local http server or copy them from the filesystem')
+parser.add_argument('--latency', type=float, default=0,
+                    help='seconds the http file server waits before each response, to mimic remote storage')
+parser.add_argument('--prefetch', type=int, default=0,
+                    help='number of submissions the worker takes ahead to download their input files meanwhile')
+parser.add_argument('--mmap', action='store_true',
+                    help='pass the annotation to the evaluation script as a memory map, parsed once with numpy')
+parser.add_argument('--evaluators', type=int, default=0,
+                    help='number of warm evaluator processes, evaluate in the worker process if 0')
+parser.add_argument('--seed', type=int, default=0, help='seed of the generated annotation files')
+parser.add_argument('--output', help='path of a json file to write the report to')
+parser.add_argument('--keep', action='store_true', help='keep the benchmark challenge and its submissions')
+ARGS = parser.parse_args()
+
+# the worker reads its settings module from the command line when it is imported
+sys.argv = [sys.argv[0], ARGS.settings]
+sys.path.insert(0, dirname(os.path.abspath(__file__)))
+
+import submission_worker  # noqa
+
+from django.conf import settings  # noqa
+from django.contrib.auth.models import User  # noqa
+from django.core.files.base import ContentFile  # noqa
+from django.core.files.storage import default_storage  # noqa
+from django.core.files.uploadedfile import SimpleUploadedFile  # noqa
+from django.utils import timezone  # noqa
+
+from challenges.models import (Challenge,
+                               ChallengePhase,
+                               ChallengePhaseSplit,
+                               DatasetSplit,
+                               Leaderboard,)  # noqa
+from hosts.models import ChallengeHostTeam  # noqa
+from jobs.models import Submission  # noqa
+from jobs.utils import get_submission_routing_key  # noqa
+from participants.models import ParticipantTeam  # noqa
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_SCRIPT = '''
+import sys
+
+SCALE = {scale}
+SPLITS = {splits!r}
+
+
+def evaluate(test_annotation_file, user_annotation_file, phase_codename):
+    with open(test_annotation_file, "r") as f:
+        original_values = f.read().splitlines()
+    with open(user_annotation_file, "r") as f:
+        user_values = f.read().splitlines()
+    for _ in range(SCALE):
+        score = len(set(user_values).intersection(original_values))
+    return {{
+        'result': [{{split: {{'score': score}}}} for split in SPLITS],
+        'submission_metadata': 'Benchmark submission',
+        'submission_result': 'Matched {{}} lines'.format(score),
+    }}
+'''
+
+# the same matcher, taking the annotation parsed once as a sorted array of the numbers of its lines
+MMAP_EVALUATION_SCRIPT = '''
+import numpy
+
+SCALE = {scale}
+SPLITS = {splits!r}
+
+
+def parse_annotation_file(annotation_file_path):
+    with open(annotation_file_path, "r") as f:
+        return numpy.unique(numpy.array([int(value) for value in f.read().splitlines()], dtype=numpy.int64))
+
+
+def evaluate(test_annotation_file, user_annotation_file, phase_codename, annotation=None):
+    with open(user_annotation_file, "r") as f:
+        user_values = numpy.unique(numpy.array([int(value) for value in f.read().splitlines() if value.isdigit()],
+                                               dtype=numpy.int64))
+    for _ in range(SCALE):
+        positions = numpy.searchsorted(annotation, user_values).clip(max=len(annotation) - 1)
+        score = int(numpy.count_nonzero(annotation[positions] == user_values))
+    return {{
+        'result': [{{split: {{'score': score}}}} for split in SPLITS],
+        'submission_metadata': 'Benchmark submission',
+        'submission_result': 'Matched {{}} lines'.format(score),
+    }}
+'''
+
+# map of stage name : list of seconds spent in the stage, one entry per call
+STAGE_TIMINGS = collections.OrderedDict()
+
+
+class Method(object):
+
+    def __init__(self, delivery_tag, redelivered=False):
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+
+
+class InMemoryChannel(object):
+    '''
+        Stand-in of a pika channel, implements the part of the api used by the worker
+    '''
+
+    def __init__(self):
+        self.is_open = True
+        # map of queue name : (time at which the message was published, body, whether it was redelivered)
+        self.queues = collections.defaultdict(collections.deque)
+        self.bindings = {}
+        self.delivery_tags = iter(xrange(1, sys.maxint))
+        # map of delivery tag : (queue name, time at which the message was published, body)
+        self.unacked = {}
+        self.latencies = []
+
+    def queue_declare(self, queue, **kwargs):
+        self.queues[queue]
+
+    def queue_bind(self, exchange, queue, routing_key):
+        self.bindings[routing_key] = queue
+
+    def publish(self, routing_key, body):
+        # like the alternate exchange, unrouted messages go to the shared submission queue
+        queue = self.bindings.get(routing_key, settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'])
+        self.queues[queue].append((time.time(), body, False))
+
+    def basic_get(self, queue):
+        if not self.queues[queue]:
+            return None, None, None
+        published_at, body, redelivered = self.queues[queue].popleft()
+        delivery_tag = next(self.delivery_tags)
+        self.unacked[delivery_tag] = (queue, published_at, body)
+        return Method(delivery_tag, redelivered), None, body
+
+    def basic_ack(self, delivery_tag):
+        queue, published_at, body = self.unacked.pop(delivery_tag)
+        self.latencies.append(time.time() - published_at)
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        queue, published_at, body = self.unacked.pop(delivery_tag)
+        if requeue:
+            self.queues[queue].appendleft((published_at, body, True))
+
+
+def timed_stage(name, function):
+    '''
+        Returns a wrapper of `function` recording the time spent in each call as a stage
+    '''
+    timings = STAGE_TIMINGS.setdefault(name, [])
+
+    def wrapper(*args, **kwargs):
+        start_time = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings.append(time.time() - start_time)
+    return wrapper
+
+
+def percentile(values, fraction):
+    '''
+        Returns the nearest rank percentile of a list of values
+    '''
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else None,
+        'p50': percentile(values, 0.5),
+        'p99': percentile(values, 0.99),
+        'total': sum(values),
+    }
+
+
+def serve_media_root():
+    '''
+        Serves `MEDIA_ROOT` over HTTP from a daemon thread and points the worker to it
+    '''
+    media_root = settings.MEDIA_ROOT
+
+    class MediaRequestHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+
+        def translate_path(self, path):
+            return join(media_root, path.split('?', 1)[0][len(settings.MEDIA_URL):])
+
+        def send_head(self):
+            time.sleep(ARGS.latency)
+            return SimpleHTTPServer.SimpleHTTPRequestHandler.send_head(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = SocketServer.ThreadingTCPServer(('127.0.0.1', 0), MediaRequestHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='benchmark-file-server')
+    thread.daemon = True
+    thread.start()
+    submission_worker.return_file_url_per_environment = lambda url: 'http://127.0.0.1:{0}{1}'.format(
+        server.server_address[1], url)
+    return server
+
+
+def copy_from_media_root(url, download_location, cancelled=None):
+    '''
+        Stand-in of `download_and_extract_file` copying the file from `MEDIA_ROOT`
+    '''
+    shutil.copyfile(join(settings.MEDIA_ROOT, url[len(settings.MEDIA_URL):]), download_location)
+
+
+def generate_annotation_file(rng, lines, match_ratio=1.0):
+    return '\n'.join(str(index) if rng.random() < match_ratio else 'wrong {}'.format(index)
+                     for index in xrange(lines))
+
+
+def create_benchmark_challenge(rng):
+    '''
+        Creates the benchmark challenge along with its phases and submissions
+    '''
+    suffix = '{0}_{1}'.format(int(time.time()), os.getpid())
+    user = User.objects.create(username='benchmark_{}'.format(suffix), email='benchmark_{}@example.com'.format(
+        suffix))
+    host_team = ChallengeHostTeam.objects.create(team_name='Benchmark Host Team {}'.format(suffix), created_by=user)
+    participant_team = ParticipantTeam.objects.create(team_name='Benchmark Team {}'.format(suffix), created_by=user)
+
+    split_codenames = ['benchmark_{0}_split{1}'.format(suffix, index + 1) for index in xrange(ARGS.splits)]
+    evaluation_script = io.BytesIO()
+    with zipfile.ZipFile(evaluation_script, 'w') as zip_file:
+        zip_file.writestr('__init__.py', 'from .main import *  # noqa\n')
+        zip_file.writestr('main.py', (MMAP_EVALUATION_SCRIPT if ARGS.mmap else EVALUATION_SCRIPT).format(
+            scale=ARGS.scale, splits=split_codenames))
+
+    challenge = Challenge.objects.create(
+        title='Benchmark Challenge {}'.format(suffix), creator=host_team, published=False,
+        start_date=timezone.now(), end_date=timezone.now() + timedelta(days=1),
+        evaluation_script=SimpleUploadedFile('benchmark.zip', evaluation_script.getvalue()))
+    leaderboard = Leaderboard.objects.create(schema={'labels': ['score'], 'default_order_by': 'score'})
+    dataset_splits = [DatasetSplit.objects.create(name=codename, codename=codename) for codename in split_codenames]
+
+    test_annotation = generate_annotation_file(rng, ARGS.lines)
+    phases = []
+    for index in xrange(ARGS.phases):
+        phase = ChallengePhase.objects.create(
+            name='Phase {}'.format(index + 1), description='Benchmark phase', challenge=challenge,
+            codename='phase{}'.format(index + 1), start_date=challenge.start_date, end_date=challenge.end_date,
+            test_annotation=SimpleUploadedFile('test_annotation.txt', test_annotation))
+        phases.append(phase)
+        for dataset_split in dataset_splits:
+            ChallengePhaseSplit.objects.create(challenge_phase=phase, dataset_split=dataset_split,
+                                               leaderboard=leaderboard, visibility=ChallengePhaseSplit.PUBLIC)
+
+    input_file = default_storage.save('submission_files/benchmark_{}.txt'.format(suffix),
+                                      ContentFile(generate_annotation_file(rng, ARGS.lines, match_ratio=0.8)))
+    # bypasses the submission quotas checked on save
+    Submission.objects.bulk_create([
+        Submission(participant_team=participant_team, challenge_phase=phases[index % len(phases)], created_by=user,
+                   status=Submission.SUBMITTED, submission_number=index + 1, input_file=input_file)
+        for index in xrange(ARGS.submissions)])
+    submissions = list(Submission.objects.filter(participant_team=participant_team).order_by('id'))
+    return user, challenge, dataset_splits, submissions
+
+
+def delete_benchmark_challenge(user, challenge, dataset_splits):
+    for submission in Submission.objects.filter(created_by=user):
+        for field in ('input_file', 'stdout_file', 'stderr_file', 'submission_result_file',
+                      'submission_metadata_file'):
+            file_field = getattr(submission, field)
+            # the input file is shared by all the submissions
+            if file_field and default_storage.exists(file_field.name):
+                default_storage.delete(file_field.name)
+    Leaderboard.objects.filter(challengephasesplit__challenge_phase__challenge=challenge).delete()
+    for phase in challenge.challengephase_set.all():
+        phase.test_annotation.delete(save=False)
+    challenge.evaluation_script.delete(save=False)
+    challenge.delete()
+    DatasetSplit.objects.filter(pk__in=[dataset_split.pk for dataset_split in dataset_splits]).delete()
+    user.delete()
+
+
+def run_benchmark(challenge, submissions):
+    worker = submission_worker
+    channel = InMemoryChannel()
+    channel.queue_declare(settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'])
+    worker.create_dir_as_python_package(worker.CHALLENGE_DATA_BASE_DIR)
+    worker.create_dir_as_python_package(worker.SUBMISSION_DATA_BASE_DIR)
+    if ARGS.prefetch:
+        worker.start_staging_threads()
+
+    # the stages of the pipeline, every submission goes through each of them once
+    worker.fetch_next_submission_message = timed_stage('fetch', worker.fetch_next_submission_message)
+    worker.extract_submission_data = timed_stage('download', worker.extract_submission_data)
+    worker.run_submission = timed_stage('run', worker.run_submission)
+    worker.save_submission_metrics = timed_stage('save_metrics', worker.save_submission_metrics)
+
+    start_time = time.time()
+    timed_stage('load_challenge', worker.process_add_challenge_message)({'challenge_id': challenge.id})
+    worker.bind_submission_queues(channel, challenge.id)
+    if ARGS.evaluators:
+        # timed from the worker, as the evaluator processes only report their output back
+        worker.EvaluatorProcess.evaluate = timed_stage('evaluate', worker.EvaluatorProcess.evaluate)
+    else:
+        evaluation_script = worker.EVALUATION_SCRIPTS[challenge.id]
+        evaluation_script.evaluate = timed_stage('evaluate', evaluation_script.evaluate)
+
+    for submission in submissions:
+        channel.publish(get_submission_routing_key(challenge.id, submission.challenge_phase_id), json.dumps({
+            'challenge_id': challenge.id,
+            'phase_id': submission.challenge_phase_id,
+            'submission_id': submission.id,
+        }))
+
+    processing_start_time = time.time()
+    while worker.process_next_submission_message(channel):
+        pass
+    end_time = time.time()
+    worker.terminate_evaluator_processes()
+
+    statuses = collections.Counter(Submission.objects.filter(
+        pk__in=[submission.pk for submission in submissions]).values_list('status', flat=True))
+    # `run` includes the evaluation, the rest of it is spent persisting the results
+    STAGE_TIMINGS['persist'] = [run - evaluate for run, evaluate in zip(STAGE_TIMINGS['run'],
+                                                                        STAGE_TIMINGS['evaluate'])]
+    return {
+        'options': vars(ARGS),
+        'submissions': len(submissions),
+        'statuses': dict(statuses),
+        'unprocessed': sum(len(queue) for queue in channel.queues.values()) + len(channel.unacked),
+        'seconds': end_time - processing_start_time,
+        'seconds_with_challenge_load': end_time - start_time,
+        'throughput': len(channel.latencies) / (end_time - processing_start_time),
+        'queued_latency': summarize(channel.latencies),
+        'stages': collections.OrderedDict((name, summarize(timings)) for name, timings in STAGE_TIMINGS.items()),
+    }
+
+
+def print_report(report):
+    # the percentiles of values which were never measured, e.g. when nothing was acked, are `None`
+    def milliseconds(seconds):
+        return '{0:10.1f}'.format(seconds * 1000) if seconds is not None else '{0:>10}'.format('n/a')
+
+    def latency(seconds):
+        return '{0:.1f}ms'.format(seconds * 1000) if seconds is not None else 'n/a'
+
+    print('Evaluated {0} submissions in {1:.2f}s, statuses {2}'.format(
+        report['submissions'], report['seconds'], report['statuses']))
+    print('Throughput: {0:.2f} submissions / second'.format(report['throughput']))
+    print('Latency from publish to ack: p50 {0}, p99 {1}'.format(
+        latency(report['queued_latency']['p50']), latency(report['queued_latency']['p99'])))
+    print('{0:<16}{1:>8}{2:>10}{3:>10}{4:>10}{5:>10}'.format('stage (ms)', 'calls', 'mean', 'p50', 'p99', 'total'))
+    for name, stage in report['stages'].items():
+        print('{0:<16}{1:>8}{2}{3}{4}{5}'.format(name, stage['count'], milliseconds(stage['mean']),
+                                                 milliseconds(stage['p50']), milliseconds(stage['p99']),
+                                                 milliseconds(stage['total'])))
+
+
+def main():
+    # a log line per message would slow down the worker and flood the report
+    logging.getLogger(submission_worker.__name__).setLevel(logging.WARNING)
+    rng = random.Random(ARGS.seed)
+    submission_worker.create_dir_as_python_package(submission_worker.COMPUTE_DIRECTORY_PATH)
+    sys.path.append(submission_worker.COMPUTE_DIRECTORY_PATH)
+    # the evaluator processes are forked with the options set at this point
+    submission_worker.WORKER_PREFETCH_COUNT = ARGS.prefetch
+    submission_worker.WORKER_MMAP_ANNOTATIONS = ARGS.mmap
+    submission_worker.WORKER_EVALUATOR_PROCESSES = ARGS.evaluators
+    if ARGS.evaluators:
+        # before the file server thread is started, as in the worker
+        submission_worker.start_evaluator_fork_server()
+    if ARGS.files == 'http':
+        server = serve_media_root()
+    else:
+        submission_worker.return_file_url_per_environment = lambda url: url
+        submission_worker.download_and_extract_file = copy_from_media_root
+    user, challenge, dataset_splits, submissions = create_benchmark_challenge(rng)
+    try:
+        report = run_benchmark(challenge, submissions)
+    finally:
+        if not ARGS.keep:
+            delete_benchmark_challenge(user, challenge, dataset_splits)
+        shutil.rmtree(submission_worker.BASE_TEMP_DIR, ignore_errors=True)
+        if ARGS.files == 'http':
+            server.shutdown()
+    print_report(report)
+    if ARGS.output:
+        with open(ARGS.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,46 @@
 from __future__ import absolute_import
 import contextlib
 import django
+import collections
+import fnmatch
+import gzip
+import hashlib
 import importlib
+import inspect
 import logging
+import json
+import mmap
+import multiprocessing
+import multiprocessing.pool
+import multiprocessing.reduction
 import os
 import pika
+import Queue
 import requests
+import resource
 import shutil
+import signal
 import socket
 import sys
 import tempfile
+import threading
+import time
 import traceback
 import yaml
 import zipfile
+import _multiprocessing
 
 from os.path import dirname, join
 
-from django.core.files.base import ContentFile
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from django.core.files.base import File
+from django.db import transaction
 from django.utils import timezone
+from django.utils.encoding import force_bytes
 from django.conf import settings
 # need to add django project path in sys path
 # root directory : where manage.py lives
@@ -43,13 +66,20 @@ sys.path.insert(0, DJANGO_PROJECT_PATH)
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', DJANGO_SETTINGS_MODULE)
 django.setup()
 
+from analytics.models import ChallengePhaseStatistics, SubmissionActivity  # noqa
 from challenges.models import (Challenge,
                                ChallengePhase,
                                ChallengePhaseSplit,
                                DatasetSplit,
                                LeaderboardData) # noqa
 
-from jobs.models import Submission          # noqa
+from jobs.models import Submission, SubmissionMetrics          # noqa
+from jobs.utils import (declare_submission_exchanges,
+                        get_submission_queue_arguments,
+                        get_submission_queue_name,
+                        get_submission_routing_key)  # noqa
+
+import worker_metrics  # noqa
 
 CHALLENGE_DATA_BASE_DIR = join(COMPUTE_DIRECTORY_PATH, 'challenge_data')
 SUBMISSION_DATA_BASE_DIR = join(COMPUTE_DIRECTORY_PATH, 'submission_files')
@@ -57,16 +87,148 @@ CHALLENGE_DATA_DIR = join(CHALLENGE_DATA_BASE_DIR, 'challenge_{challenge_id}')
 PHASE_DATA_BASE_DIR = join(CHALLENGE_DATA_DIR, 'phase_data')
 PHASE_DATA_DIR = join(PHASE_DATA_BASE_DIR, 'phase_{phase_id}')
 PHASE_ANNOTATION_FILE_PATH = join(PHASE_DATA_DIR, '{annotation_file}')
+EVALUATION_SCRIPT_DIR = join(CHALLENGE_DATA_DIR, 'evaluation_script_{version}')
 SUBMISSION_DATA_DIR = join(SUBMISSION_DATA_BASE_DIR, 'submission_{submission_id}')
 SUBMISSION_INPUT_FILE_PATH = join(SUBMISSION_DATA_DIR, '{input_file}')
-CHALLENGE_IMPORT_STRING = 'challenge_data.challenge_{challenge_id}'
+CHALLENGE_IMPORT_STRING = 'challenge_data.challenge_{challenge_id}.evaluation_script_{version}'
 EVALUATION_SCRIPTS = {}
 
+# map of challenge id : list of versions of its evaluation script, latest at the end
+# Use: a version is the hash of the evaluation script zip file, every version is extracted
+# into its own directory and imported as its own package, so an updated evaluation script
+# is never shadowed by the previously imported module
+EVALUATION_SCRIPT_VERSIONS = {}
+
+# number of latest evaluation script versions of a challenge kept on disk, the previous
+# version is kept so that evaluations already holding its module can finish
+EVALUATION_SCRIPT_VERSIONS_TO_KEEP = 2
+
 # map of challenge id : phase id : phase annotation file name
 # Use: On arrival of submission message, lookup here to fetch phase file name
 # this saves db query just to fetch phase annotation file name
 PHASE_ANNOTATION_FILE_NAME_MAP = {}
 
+# map of challenge id : phase id : phase priority
+# Use: the priority of a phase is its weight while sharing the worker between phase queues
+PHASE_PRIORITY_MAP = {}
+
+# map of submission queue name : virtual time at which the queue is due next
+# Use: queues are polled in increasing order of this value and serving a queue advances
+# it by 1 / priority, so phases share the worker in proportion to their priority and
+# one phase with a burst of submissions cannot starve the others
+SUBMISSION_QUEUE_PASS = {}
+
+# virtual time of the last served submission queue
+SUBMISSION_QUEUE_VIRTUAL_TIME = 0
+
+# seconds to wait for new messages when all the submission queues are empty
+SUBMISSION_QUEUE_POLL_INTERVAL = 1
+
+# comma separated challenge ids in `EVALAI_WORKER_CHALLENGES` dedicate the worker to these challenges
+# Use: shard challenges with large annotation files onto dedicated workers
+WORKER_CHALLENGE_IDS = set(int(pk) for pk in os.environ.get('EVALAI_WORKER_CHALLENGES', '').split(',') if pk.strip())
+
+# comma separated challenge ids in `EVALAI_WORKER_EXCLUDED_CHALLENGES` are left to dedicated workers
+WORKER_EXCLUDED_CHALLENGE_IDS = set(
+    int(pk) for pk in os.environ.get('EVALAI_WORKER_EXCLUDED_CHALLENGES', '').split(',') if pk.strip())
+
+# port on which the worker serves its metrics to Prometheus, see `worker_metrics`
+WORKER_METRICS_PORT = os.environ.get('EVALAI_WORKER_METRICS_PORT')
+
+# `host:port` of the StatsD server to which the worker pushes its metrics
+WORKER_STATSD_ADDRESS = os.environ.get('EVALAI_WORKER_STATSD_ADDRESS')
+
+# number of submissions being evaluated by the worker at the moment
+SLOTS_IN_USE = 0
+
+# number of submission messages the worker takes ahead of the one it evaluates, set by
+# `EVALAI_WORKER_PREFETCH_COUNT`. Their submissions are fetched and their input files are
+# downloaded by background threads in the meantime, which hides this time behind the evaluations
+WORKER_PREFETCH_COUNT = int(os.environ.get('EVALAI_WORKER_PREFETCH_COUNT', '0'))
+
+# number of threads staging the inputs of the submissions taken ahead
+WORKER_DOWNLOAD_THREADS = int(os.environ.get('EVALAI_WORKER_DOWNLOAD_THREADS', '2'))
+
+# size of the chunks in which files are streamed to disk (in bytes)
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# members of evaluation script zip files which are not extracted, such as the metadata added by macOS
+ZIP_IGNORED_PATTERNS = ('__MACOSX/*', '.DS_Store', '*/.DS_Store', '*.pyc', '__pycache__/*', '*/__pycache__/*')
+
+# zip files extracting to more than this many megabytes, or more than this many times their
+# compressed size, are refused as zip bombs
+ZIP_MAX_EXTRACTED_SIZE = int(os.environ.get('EVALAI_WORKER_ZIP_MAX_EXTRACTED_SIZE', '10240'))
+ZIP_MAX_COMPRESSION_RATIO = int(os.environ.get('EVALAI_WORKER_ZIP_MAX_COMPRESSION_RATIO', '200'))
+
+# members larger than this (in bytes) are extracted in parallel by `ZIP_EXTRACTION_THREADS` threads,
+# zlib releases the GIL while it decompresses
+ZIP_PARALLEL_MEMBER_SIZE = 8 * 1024 * 1024
+ZIP_EXTRACTION_THREADS = int(os.environ.get('EVALAI_WORKER_ZIP_EXTRACTION_THREADS', '4'))
+
+# name of the file listing the extracted and skipped members, written in the extract location
+ZIP_MANIFEST_FILE_NAME = '.evalai_manifest.json'
+
+# set `EVALAI_WORKER_COMPRESS_ARTIFACTS=0` to store the stdout, stderr, result and metadata files of
+# submissions as they are, otherwise they are gzipped into `.gz` files served with `Content-Encoding: gzip`
+WORKER_COMPRESS_ARTIFACTS = os.environ.get('EVALAI_WORKER_COMPRESS_ARTIFACTS', '1').lower() in ('1', 'true', 'yes')
+
+# stdout and stderr larger than this (in kilobytes) are stored truncated to their first and last halves
+WORKER_MAX_LOG_SIZE = int(os.environ.get('EVALAI_WORKER_MAX_LOG_SIZE', '1024'))
+
+# set `EVALAI_WORKER_MMAP_ANNOTATIONS` to pass the annotation of a phase as a read-only memory map to
+# the evaluation scripts taking an `annotation` argument, see `map_annotation_file`
+WORKER_MMAP_ANNOTATIONS = os.environ.get('EVALAI_WORKER_MMAP_ANNOTATIONS', '').lower() in ('1', 'true', 'yes')
+
+# directory of the memory mapped annotations, shared by the workers of a host so that they map the
+# same files and share their pages
+ANNOTATION_CACHE_DIR = os.environ.get('EVALAI_WORKER_ANNOTATION_CACHE_DIR',
+                                      join(tempfile.gettempdir(), 'evalai_annotation_cache'))
+
+# map of annotation file path : (modification time, evaluation script version, memory map)
+MAPPED_ANNOTATIONS = {}
+
+# set `EVALAI_WORKER_EVALUATOR_PROCESSES` to evaluate submissions in long lived child processes, one per
+# challenge and at most this many at a time, instead of in the worker process. They import the evaluation
+# script once, load the annotations once and evaluate submissions until they are recycled
+WORKER_EVALUATOR_PROCESSES = int(os.environ.get('EVALAI_WORKER_EVALUATOR_PROCESSES', '0'))
+
+# number of evaluations after which an evaluator process is replaced by a fresh one
+EVALUATOR_MAX_EVALUATIONS = int(os.environ.get('EVALAI_WORKER_EVALUATOR_MAX_EVALUATIONS', '100'))
+
+# peak resident memory (in megabytes) above which an evaluator process is replaced by a fresh one
+EVALUATOR_MAX_MEMORY = int(os.environ.get('EVALAI_WORKER_EVALUATOR_MAX_MEMORY', '2048'))
+
+# map of challenge id : `EvaluatorProcess`, the least recently used first
+EVALUATOR_PROCESSES = collections.OrderedDict()
+
+# `EvaluatorForkServer` forking the evaluator processes, started along with the worker
+EVALUATOR_FORK_SERVER = None
+
+# submission messages taken from the queues and not evaluated yet, in the order of evaluation
+PREFETCHED_SUBMISSION_MESSAGES = collections.deque()
+
+# map of delivery tag : submission id of the submission messages being processed
+IN_FLIGHT_SUBMISSION_MESSAGES = {}
+
+# seconds a worker asked to stop with SIGTERM gives the submission being evaluated to finish, an evaluation
+# in an evaluator process is interrupted and requeued afterwards
+WORKER_DRAIN_TIMEOUT = int(os.environ.get('EVALAI_WORKER_DRAIN_TIMEOUT', '60'))
+
+# set when the worker is asked to stop, it takes no more messages from then on
+SHUTDOWN_REQUESTED = threading.Event()
+
+# time after which the evaluation in progress is interrupted, set along with `SHUTDOWN_REQUESTED`
+DRAIN_DEADLINE = None
+
+# map of submission id : `StagedSubmissionInput` of the submissions taken ahead
+STAGED_SUBMISSION_INPUTS = {}
+
+# `StagedSubmissionInput` to be staged by the background threads, in the order of evaluation
+STAGING_QUEUE = Queue.Queue()
+
+# held while a `StreamRouter` is installed in place of `sys.stdout` or `sys.stderr`
+STREAM_ROUTERS_LOCK = threading.Lock()
+
 django.db.close_old_connections()
 
 
@@ -74,69 +236,480 @@ class ExecutionTimeLimitExceeded(Exception):
     pass
 
 
+class UnsafeZipFile(Exception):
+    pass
+
+
+class DrainTimeoutExceeded(BaseException):
+    '''
+        Raised in the worker when an evaluation in an evaluator process outlasts `WORKER_DRAIN_TIMEOUT` after
+        SIGTERM, it is not an `Exception` so that the handlers of the worker let it through
+    '''
+    pass
+
+
+class EvaluationError(Exception):
+    '''
+        Raised with the traceback of an exception raised by `evaluate` in an evaluator process
+    '''
+    pass
+
+
+class EvaluatorForkServer(object):
+    '''
+        Child process forking the evaluator processes. It is started before the worker starts any thread,
+        so that the evaluator processes never inherit a lock held by a thread of the worker, e.g. in
+        `logging`, `urllib` or `boto`
+    '''
+
+    def __init__(self):
+        # the connections are opened again by the worker when it needs them, never shared with the children
+        django.db.connections.close_all()
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_evaluator_forks, args=(child_connection,),
+                                               name='evaluator-fork-server')
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()
+
+    def fork(self, challenge_id, version):
+        '''
+            Returns the process id of a new evaluator process for a version of the evaluation script of a
+            challenge, along with the connection to it
+        '''
+        self.connection.send((challenge_id, version))
+        connection = _multiprocessing.Connection(multiprocessing.reduction.recv_handle(self.connection))
+        return self.connection.recv(), connection
+
+    def terminate(self):
+        self.connection.close()
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+
+
+class EvaluatorProcess(object):
+    '''
+        Long lived process evaluating the submissions of a challenge, forked by `EVALUATOR_FORK_SERVER`
+    '''
+
+    def __init__(self, challenge_id):
+        self.challenge_id = challenge_id
+        self.version = EVALUATION_SCRIPT_VERSIONS.get(challenge_id, [None])[-1]
+        self.evaluations = 0
+        # in kilobytes, as reported by the process after each evaluation
+        self.peak_memory = 0
+        # resources spent by the process on the last evaluation, as reported by it
+        self.resource_usage = {}
+        self.pid, self.connection = EVALUATOR_FORK_SERVER.fork(challenge_id, self.version)
+
+    def is_alive(self):
+        # the process never writes to the connection between evaluations, it is readable once the process exited
+        try:
+            return not self.connection.closed and not self.connection.poll()
+        except IOError:
+            return False
+
+    def is_usable(self):
+        '''
+            Returns whether the process can evaluate more submissions with the current evaluation script
+        '''
+        return (self.is_alive() and
+                self.version == EVALUATION_SCRIPT_VERSIONS.get(self.challenge_id, [None])[-1] and
+                self.evaluations < EVALUATOR_MAX_EVALUATIONS and
+                self.peak_memory <= EVALUATOR_MAX_MEMORY * 1024)
+
+    def evaluate(self, time_limit, *args):
+        '''
+            * Sends the arguments of `call_evaluate` followed by the paths of the stdout and stderr
+              files to the process and returns the output of `evaluate`
+            * Kills the process if the evaluation takes more than `time_limit` seconds, or if it outlasts
+              the drain of the worker
+        '''
+        deadline = time.time() + time_limit
+        try:
+            self.connection.send(args)
+            # a signal, e.g. SIGTERM, makes `poll` return early
+            while not self.connection.poll(max(0, min(deadline, DRAIN_DEADLINE or deadline) - time.time())):
+                if DRAIN_DEADLINE is not None and time.time() >= DRAIN_DEADLINE:
+                    self.terminate()
+                    raise DrainTimeoutExceeded('The evaluation did not finish within {} seconds after SIGTERM'.format(
+                        WORKER_DRAIN_TIMEOUT))
+                if time.time() >= deadline:
+                    self.terminate()
+                    raise ExecutionTimeLimitExceeded('The evaluation took more than {} seconds'.format(time_limit))
+            status, output, self.resource_usage = self.connection.recv()
+        except (EOFError, IOError):
+            # e.g. the process was killed for using too much memory
+            self.terminate()
+            raise EvaluationError('The evaluator process {} exited'.format(self.pid))
+        self.evaluations += 1
+        self.peak_memory = self.resource_usage['peak_memory']
+        if status == 'error':
+            raise EvaluationError(output)
+        return output
+
+    def terminate(self):
+        self.connection.close()
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            # the process already exited, it is reaped by the fork server
+            pass
+
+
+class StagedSubmissionInput(object):
+    '''
+        Submission taken ahead of the one being evaluated, which a background thread fetches
+        from the database along with its input file
+    '''
+
+    def __init__(self, submission_id):
+        self.submission_id = submission_id
+        # `None` until it is fetched, or if the staging failed
+        self.submission = None
+        self.staged = threading.Event()
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        '''
+            Stops the staging, a download in progress is abandoned after its current chunk
+        '''
+        self.cancelled.set()
+
+
+class StreamRouter(object):
+    '''
+        File-like object installed in place of `sys.stdout` or `sys.stderr`, which writes to the stream
+        redirected for the current thread or to the original stream in the other threads. So that several
+        evaluations can capture their output at once, and the output of the worker threads never ends
+        up in the logs of a submission
+    '''
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def get_stream(self):
+        return getattr(self.local, 'stream', None) or self.stream
+
+    @contextlib.contextmanager
+    def redirect(self, where):
+        previous_stream = getattr(self.local, 'stream', None)
+        self.local.stream = where
+        try:
+            yield where
+        finally:
+            self.local.stream = previous_stream
+
+    @property
+    def softspace(self):
+        # kept by `print` on the stream it writes to
+        return getattr(self.get_stream(), 'softspace', 0)
+
+    @softspace.setter
+    def softspace(self, value):
+        self.get_stream().softspace = value
+
+    def __getattr__(self, name):
+        if name in ('stream', 'local'):
+            raise AttributeError(name)
+        return getattr(self.get_stream(), name)
+
+
+def get_stream_router(name):
+    '''
+        Returns the `StreamRouter` of `sys.stdout` or `sys.stderr`, installing it on first use
+    '''
+    with STREAM_ROUTERS_LOCK:
+        stream = getattr(sys, name)
+        if not isinstance(stream, StreamRouter):
+            stream = StreamRouter(stream)
+            setattr(sys, name, stream)
+    return stream
+
+
 @contextlib.contextmanager
 def stdout_redirect(where):
-    sys.stdout = where
-    try:
+    with get_stream_router('stdout').redirect(where):
         yield where
-    finally:
-        sys.stdout = sys.__stdout__
 
 
 @contextlib.contextmanager
 def stderr_redirect(where):
-    sys.stderr = where
+    with get_stream_router('stderr').redirect(where):
+        yield where
+
+
+@contextlib.contextmanager
+def file_descriptor_redirect(where, file_descriptor):
+    '''
+        * Points a file descriptor of the process, 1 for stdout or 2 for stderr, to a file inside the block,
+          which captures the output of C extensions and subprocesses as well
+        * Affects every thread of the process, so it is only used in evaluator processes
+    '''
+    saved_file_descriptor = os.dup(file_descriptor)
+    os.dup2(where.fileno(), file_descriptor)
     try:
         yield where
     finally:
-        sys.stderr = sys.__stderr__
+        os.dup2(saved_file_descriptor, file_descriptor)
+        os.close(saved_file_descriptor)
 
 
-def alarm_handler(signum, frame):
-    raise ExecutionTimeLimitExceeded
+def shutdown_handler(signum, frame):
+    '''
+        Makes the worker stop taking messages, the submission being evaluated is given
+        `WORKER_DRAIN_TIMEOUT` seconds to finish. Only an evaluator process can be interrupted
+        afterwards, an evaluation in the worker process always runs to its end, as raising into
+        the evaluation script would be swallowed by its own exception handlers
+    '''
+    global DRAIN_DEADLINE
+    if SHUTDOWN_REQUESTED.is_set():
+        return
+    logger.info('Received signal {}, draining within {} seconds'.format(signum, WORKER_DRAIN_TIMEOUT))
+    DRAIN_DEADLINE = time.time() + WORKER_DRAIN_TIMEOUT
+    SHUTDOWN_REQUESTED.set()
 
 
-def download_and_extract_file(url, download_location):
+def reset_peak_memory():
     '''
-        * Function to extract download a file.
-        * `download_location` should include name of file as well.
+        Resets the peak resident memory of the process to its current resident memory, so that it is
+        measured per evaluation. Only supported on Linux, elsewhere the peak of the process lifetime is kept
     '''
     try:
-        response = requests.get(url)
-    except Exception as e:
-        logger.error('Failed to fetch file from {}, error {}'.format(url, e))
-        traceback.print_exc()
-        response = None
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except (IOError, OSError):
+        pass
+
 
-    if response and response.status_code == 200:
-        with open(download_location, 'w') as f:
-            f.write(response.content)
+def get_peak_memory():
+    '''
+        Returns the peak resident memory (in kilobytes) of the process since `reset_peak_memory`
+    '''
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (IOError, OSError):
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
 
 
-def download_and_extract_zip_file(url, download_location, extract_location):
+@contextlib.contextmanager
+def measure_resource_usage():
+    '''
+        * Measures the resources spent by the worker inside the block
+        * Yields a dict which is filled with the measurements when the block is left, the cpu times and
+          the peak memory already set in it by an evaluator process are kept
     '''
-        * Function to extract download a zip file, extract it and then removes the zip file.
+    resource_usage = {}
+    connection = django.db.connection
+    force_debug_cursor = connection.force_debug_cursor
+    # log queries along with their time even when `DEBUG` is off
+    connection.force_debug_cursor = True
+    django.db.reset_queries()
+    start_time = time.time()
+    reset_peak_memory()
+    start_rusage = resource.getrusage(resource.RUSAGE_SELF)
+    try:
+        yield resource_usage
+    finally:
+        end_rusage = resource.getrusage(resource.RUSAGE_SELF)
+        resource_usage['wall_time'] = time.time() - start_time
+        # of the whole worker process, including its staging threads, when the evaluation runs inside it
+        resource_usage.setdefault('cpu_user_time', end_rusage.ru_utime - start_rusage.ru_utime)
+        resource_usage.setdefault('cpu_system_time', end_rusage.ru_stime - start_rusage.ru_stime)
+        resource_usage.setdefault('peak_memory', get_peak_memory())
+        resource_usage['db_queries'] = len(connection.queries_log)
+        resource_usage['db_time'] = sum(float(query['time']) for query in connection.queries_log)
+        connection.force_debug_cursor = force_debug_cursor
+        django.db.reset_queries()
+
+
+def download_and_extract_file(url, download_location, cancelled=None):
+    '''
+        * Function to extract download a file.
         * `download_location` should include name of file as well.
+        * Streams the file to disk in chunks, so that large files are never held in memory
+        * Gives up without leaving anything behind once the optional `cancelled` event is set
     '''
     try:
-        response = requests.get(url)
+        with worker_metrics.timed('evalai_worker_download_seconds'):
+            response = requests.get(url, stream=True)
+            if response.status_code == 200:
+                # written next to the download location and then renamed, so that a half
+                # downloaded file is never read
+                temp_file, temp_location = tempfile.mkstemp(dir=dirname(download_location))
+                try:
+                    downloaded_bytes = 0
+                    with os.fdopen(temp_file, 'wb') as f:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            if cancelled is not None and cancelled.is_set():
+                                break
+                            f.write(chunk)
+                            downloaded_bytes += len(chunk)
+                    worker_metrics.increment('evalai_worker_downloaded_bytes_total', downloaded_bytes)
+                    if cancelled is not None and cancelled.is_set():
+                        logger.info('Cancelled the download of {}'.format(url))
+                        return
+                    # a connection closed in the middle of the body ends the iteration without an error,
+                    # the bytes read from the connection are compared before any decoding
+                    content_length = response.headers.get('Content-Length')
+                    if content_length is not None and response.raw.tell() != int(content_length):
+                        raise IOError('Received {0} of {1} bytes'.format(response.raw.tell(), content_length))
+                    os.rename(temp_location, download_location)
+                    return
+                finally:
+                    response.close()
+                    # left behind only when the download failed or was cancelled
+                    if os.path.exists(temp_location):
+                        os.remove(temp_location)
     except Exception as e:
         logger.error('Failed to fetch file from {}, error {}'.format(url, e))
-        response = None
-
-    if response and response.status_code == 200:
-        with open(download_location, 'w') as f:
-            f.write(response.content)
-        # extract zip file
-        zip_ref = zipfile.ZipFile(download_location, 'r')
-        zip_ref.extractall(extract_location)
-        zip_ref.close()
-        # delete zip file
+        traceback.print_exc()
+    worker_metrics.increment('evalai_worker_failures_total', cause='download')
+
+
+def stage_submission_inputs_in_background():
+    '''
+        * Fetches the submissions put in `STAGING_QUEUE` and downloads their input files one
+          after another, runs in a daemon thread
+        * Skips the submissions whose staging is cancelled
+    '''
+    while True:
+        staged_input = STAGING_QUEUE.get()
         try:
-            os.remove(download_location)
+            if not staged_input.cancelled.is_set():
+                submission = Submission.objects.get(id=staged_input.submission_id)
+                if submission.status == Submission.SUBMITTED:
+                    submission_input_file, submission_input_file_path = get_submission_input_file(submission)
+                    download_and_extract_file(submission_input_file, submission_input_file_path,
+                                              staged_input.cancelled)
+                staged_input.submission = submission
         except Exception as e:
-            logger.error('Failed to remove zip file {}, error {}'.format(download_location, e))
+            # the submission is fetched and downloaded again when it is processed
+            logger.error('Failed to stage submission {}, error {}'.format(staged_input.submission_id, e))
             traceback.print_exc()
+        finally:
+            # every thread has its own database connection
+            django.db.close_old_connections()
+            staged_input.staged.set()
+
+
+def start_staging_threads():
+    '''
+        Starts the threads staging the inputs of the submissions taken ahead
+    '''
+    for index in range(WORKER_DOWNLOAD_THREADS):
+        thread = threading.Thread(target=stage_submission_inputs_in_background,
+                                  name='worker-staging-{}'.format(index))
+        thread.daemon = True
+        thread.start()
+
+
+def is_ignored_zip_member(name):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in ZIP_IGNORED_PATTERNS)
+
+
+def get_zip_member_path(extract_location, name):
+    '''
+        Returns the path a zip member is extracted to, raises `UnsafeZipFile` if it is outside
+        of the extract location
+    '''
+    extract_location = os.path.realpath(extract_location)
+    path = os.path.realpath(join(extract_location, name))
+    if os.path.isabs(name) or not path.startswith(extract_location + os.sep):
+        raise UnsafeZipFile('Member {} would be extracted outside of {}'.format(name, extract_location))
+    return path
+
+
+def extract_zip_member(zip_file_path, member, path):
+    '''
+        * Streams a member of a zip file to `path` in chunks
+        * Opens its own `ZipFile`, so that members can be extracted by several threads at once
+        * Raises `UnsafeZipFile` if the member holds more bytes than its header declares
+    '''
+    create_dir(dirname(path))
+    with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+        with contextlib.closing(zip_ref.open(member)) as source, open(path, 'wb') as destination:
+            extracted_size = 0
+            for chunk in iter(lambda: source.read(DOWNLOAD_CHUNK_SIZE), b''):
+                extracted_size += len(chunk)
+                if extracted_size > member.file_size:
+                    raise UnsafeZipFile('Member {} is larger than declared'.format(member.filename))
+                destination.write(chunk)
+
+
+def extract_zip_file(zip_file_path, extract_location):
+    '''
+        * Function to extract a zip file and then removes the zip file.
+        * Skips the members matching `ZIP_IGNORED_PATTERNS` and extracts the large ones in parallel
+        * Raises `UnsafeZipFile` before extracting anything if a member would be written outside of
+          `extract_location` or if the zip file would extract beyond the size limits
+        * Writes a manifest of the extracted and skipped members and returns it
+    '''
+    with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+        members = zip_ref.infolist()
+    manifest = {'extracted': {}, 'skipped': []}
+    files = []
+    for member in members:
+        if is_ignored_zip_member(member.filename):
+            manifest['skipped'].append(member.filename)
+            continue
+        path = get_zip_member_path(extract_location, member.filename)
+        if member.filename.endswith('/'):
+            create_dir(path)
+            continue
+        files.append((member, path))
+        manifest['extracted'][member.filename] = {'size': member.file_size, 'crc': member.CRC}
+
+    extracted_size = sum(member.file_size for member, _ in files)
+    compressed_size = sum(member.compress_size for member, _ in files)
+    if extracted_size > ZIP_MAX_EXTRACTED_SIZE * 1024 * 1024:
+        raise UnsafeZipFile('{} would extract to {} bytes'.format(zip_file_path, extracted_size))
+    if extracted_size > ZIP_MAX_COMPRESSION_RATIO * max(compressed_size, 1024):
+        raise UnsafeZipFile('{} would extract to {} bytes from {} compressed bytes'.format(
+            zip_file_path, extracted_size, compressed_size))
+
+    large_files = [member_path for member_path in files if member_path[0].file_size >= ZIP_PARALLEL_MEMBER_SIZE]
+    small_files = [member_path for member_path in files if member_path[0].file_size < ZIP_PARALLEL_MEMBER_SIZE]
+    if len(large_files) > 1 and ZIP_EXTRACTION_THREADS > 1:
+        pool = multiprocessing.pool.ThreadPool(min(ZIP_EXTRACTION_THREADS, len(large_files)))
+        try:
+            pool.map(lambda member_path: extract_zip_member(zip_file_path, *member_path), large_files)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        small_files = large_files + small_files
+    for member, path in small_files:
+        extract_zip_member(zip_file_path, member, path)
+
+    with open(join(extract_location, ZIP_MANIFEST_FILE_NAME), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    if manifest['skipped']:
+        logger.info('Skipped {} members of {}'.format(len(manifest['skipped']), zip_file_path))
+    # delete zip file
+    try:
+        os.remove(zip_file_path)
+    except Exception as e:
+        logger.error('Failed to remove zip file {}, error {}'.format(zip_file_path, e))
+        traceback.print_exc()
+    return manifest
+
+
+def get_file_hash(file_path):
+    '''
+        Returns the sha1 hex digest of the content of a file
+    '''
+    file_hash = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
 
 
 def create_dir(directory):
@@ -170,10 +743,70 @@ def return_file_url_per_environment(url):
     return url
 
 
+def unload_evaluation_script(challenge_id, version):
+    '''
+        Removes the modules of a version of evaluation script from the module cache
+    '''
+    import_string = CHALLENGE_IMPORT_STRING.format(challenge_id=challenge_id, version=version)
+    for module_name in list(sys.modules):
+        if module_name == import_string or module_name.startswith(import_string + '.'):
+            del sys.modules[module_name]
+
+
+def load_evaluation_script(challenge_id, challenge_zip_file):
+    '''
+        * Expects a challenge id and path of its downloaded evaluation script zip file
+        * Extracts the zip file into a directory named after the hash of its content and imports it
+        * Swaps the imported module into `EVALUATION_SCRIPTS` and unloads the previous version
+    '''
+    version = get_file_hash(challenge_zip_file)[:16]
+    versions = EVALUATION_SCRIPT_VERSIONS.setdefault(challenge_id, [])
+    if versions and versions[-1] == version and challenge_id in EVALUATION_SCRIPTS:
+        logger.info('Evaluation script of challenge {} is up to date'.format(challenge_id))
+        worker_metrics.increment('evalai_worker_cache_hits_total', cache='evaluation_script')
+        os.remove(challenge_zip_file)
+        return
+    worker_metrics.increment('evalai_worker_cache_misses_total', cache='evaluation_script')
+
+    evaluation_script_directory = EVALUATION_SCRIPT_DIR.format(challenge_id=challenge_id, version=version)
+    if not os.path.exists(evaluation_script_directory):
+        # extract next to the final directory and then rename it, so that a half extracted
+        # evaluation script is never imported
+        temp_directory = tempfile.mkdtemp(dir=dirname(evaluation_script_directory))
+        create_dir_as_python_package(temp_directory)
+        try:
+            extract_zip_file(challenge_zip_file, temp_directory)
+        except Exception:
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            os.remove(challenge_zip_file)
+            raise
+        os.rename(temp_directory, evaluation_script_directory)
+    else:
+        os.remove(challenge_zip_file)
+
+    challenge_module = importlib.import_module(
+        CHALLENGE_IMPORT_STRING.format(challenge_id=challenge_id, version=version))
+    EVALUATION_SCRIPTS[challenge_id] = challenge_module
+
+    # the previous module object stays alive as long as an evaluation holds it
+    for old_version in versions:
+        if old_version != version:
+            unload_evaluation_script(challenge_id, old_version)
+    if version in versions:
+        versions.remove(version)
+    versions.append(version)
+    while len(versions) > EVALUATION_SCRIPT_VERSIONS_TO_KEEP:
+        old_version = versions.pop(0)
+        shutil.rmtree(EVALUATION_SCRIPT_DIR.format(challenge_id=challenge_id, version=old_version),
+                      ignore_errors=True)
+
+
 def extract_challenge_data(challenge, phases):
     '''
         * Expects a challenge object and an array of phase object
         * Extracts `evaluation_script` for challenge and `annotation_file` for each phase
+        * Can be called again to reload a challenge, an updated evaluation script replaces
+          the loaded one without restarting the worker
 
     '''
 
@@ -182,11 +815,12 @@ def extract_challenge_data(challenge, phases):
     evaluation_script_url = return_file_url_per_environment(evaluation_script_url)
     # create challenge directory as package
     create_dir_as_python_package(challenge_data_directory)
-    # set entry in map
-    PHASE_ANNOTATION_FILE_NAME_MAP[challenge.id] = {}
+    # entries are swapped into the maps after everything is finished
+    phase_annotation_file_names = {}
+    phase_priorities = {}
 
     challenge_zip_file = join(challenge_data_directory, 'challenge_{}.zip'.format(challenge.id))
-    download_and_extract_zip_file(evaluation_script_url, challenge_zip_file, challenge_data_directory)
+    download_and_extract_file(evaluation_script_url, challenge_zip_file)
 
     phase_data_base_directory = PHASE_DATA_BASE_DIR.format(challenge_id=challenge.id)
     create_dir(phase_data_base_directory)
@@ -198,66 +832,358 @@ def extract_challenge_data(challenge, phases):
         annotation_file_url = phase.test_annotation.url
         annotation_file_url = return_file_url_per_environment(annotation_file_url)
         annotation_file_name = os.path.basename(phase.test_annotation.name)
-        PHASE_ANNOTATION_FILE_NAME_MAP[challenge.id][phase.id] = annotation_file_name
+        phase_annotation_file_names[phase.id] = annotation_file_name
+        phase_priorities[phase.id] = phase.priority
         annotation_file_path = PHASE_ANNOTATION_FILE_PATH.format(challenge_id=challenge.id, phase_id=phase.id,
                                                                  annotation_file=annotation_file_name)
         download_and_extract_file(annotation_file_url, annotation_file_path)
 
     # import the challenge after everything is finished
-    challenge_module = importlib.import_module(CHALLENGE_IMPORT_STRING.format(challenge_id=challenge.id))
-    EVALUATION_SCRIPTS[challenge.id] = challenge_module
+    load_evaluation_script(challenge.id, challenge_zip_file)
+    PHASE_ANNOTATION_FILE_NAME_MAP[challenge.id] = phase_annotation_file_names
+    PHASE_PRIORITY_MAP[challenge.id] = phase_priorities
+
+
+def is_challenge_served_by_worker(challenge_id):
+    '''
+        Returns whether submissions of a challenge should be routed to this worker
+    '''
+    if WORKER_CHALLENGE_IDS:
+        return challenge_id in WORKER_CHALLENGE_IDS
+    return challenge_id not in WORKER_EXCLUDED_CHALLENGE_IDS
 
 
 def load_active_challenges():
     '''
-         * Fetches active challenges and corresponding active phases for it.
+         * Fetches active challenges served by this worker and corresponding active phases for it.
     '''
     q_params = {'published': True}
     q_params['start_date__lt'] = timezone.now()
     q_params['end_date__gt'] = timezone.now()
+    if WORKER_CHALLENGE_IDS:
+        q_params['id__in'] = WORKER_CHALLENGE_IDS
 
     # make sure that the challenge base directory exists
     create_dir_as_python_package(CHALLENGE_DATA_BASE_DIR)
 
-    active_challenges = Challenge.objects.filter(**q_params)
+    active_challenges = Challenge.objects.filter(**q_params).exclude(id__in=WORKER_EXCLUDED_CHALLENGE_IDS)
 
     for challenge in active_challenges:
         phases = challenge.challengephase_set.all()
         extract_challenge_data(challenge, phases)
 
 
+def get_submission_input_file(submission):
+    '''
+        Returns the url of the input file of a submission and the path it is downloaded to
+    '''
+    submission_input_file = submission.input_file.url
+    submission_input_file = return_file_url_per_environment(submission_input_file)
+    submission_input_file_name = os.path.basename(submission.input_file.name)
+    submission_input_file_path = SUBMISSION_INPUT_FILE_PATH.format(submission_id=submission.id,
+                                                                   input_file=submission_input_file_name)
+    # create submission directory
+    create_dir_as_python_package(SUBMISSION_DATA_DIR.format(submission_id=submission.id))
+    return submission_input_file, submission_input_file_path
+
+
 def extract_submission_data(submission_id):
     '''
-        * Expects submission id and extracts input file for it.
+        * Expects submission id and extracts input file for it, unless it is not submitted anymore
+        * Waits for the submission instead if it is staged in the background
     '''
 
+    staged_input = STAGED_SUBMISSION_INPUTS.pop(submission_id, None)
+    if staged_input:
+        with worker_metrics.timed('evalai_worker_staged_input_wait_seconds'):
+            staged_input.staged.wait()
+        if staged_input.submission and not staged_input.cancelled.is_set():
+            return staged_input.submission
+
     try:
         submission = Submission.objects.get(id=submission_id)
     except Submission.DoesNotExist:
         logger.critical('Submission {} does not exist'.format(submission_id))
         traceback.print_exc()
 
-    submission_input_file = submission.input_file.url
-    submission_input_file = return_file_url_per_environment(submission_input_file)
+    # e.g. the message is a duplicate published by `reap_submissions`
+    if submission.status == Submission.SUBMITTED:
+        submission_input_file, submission_input_file_path = get_submission_input_file(submission)
+        download_and_extract_file(submission_input_file, submission_input_file_path)
 
-    submission_data_directory = SUBMISSION_DATA_DIR.format(submission_id=submission.id)
-    submission_input_file_name = os.path.basename(submission.input_file.name)
-    submission_input_file_path = SUBMISSION_INPUT_FILE_PATH.format(submission_id=submission.id,
-                                                                   input_file=submission_input_file_name)
-    # create submission directory
-    create_dir_as_python_package(submission_data_directory)
+    return submission
 
-    download_and_extract_file(submission_input_file, submission_input_file_path)
 
-    return submission
+def cancel_staged_submission_input(submission_id):
+    '''
+        Cancels the staging of a submission taken ahead, if any
+    '''
+    staged_input = STAGED_SUBMISSION_INPUTS.pop(submission_id, None)
+    if staged_input:
+        staged_input.cancel()
+
+
+def stage_submission_input(submission_id):
+    '''
+        * Expects the submission id of a message taken ahead of the one being evaluated
+        * Queues the submission to the background threads, `extract_submission_data` waits
+          for it to be staged when the submission is evaluated
+    '''
+    # a redelivered message may have been staged from its previous delivery, which is
+    # abandoned in favour of a fresh one
+    cancel_staged_submission_input(submission_id)
+    staged_input = StagedSubmissionInput(submission_id)
+    STAGED_SUBMISSION_INPUTS[submission_id] = staged_input
+    STAGING_QUEUE.put(staged_input)
+
 
+def accepts_mapped_annotation(evaluation_script):
+    '''
+        Returns whether the `evaluate` function of an evaluation script takes an `annotation` argument,
+        or any keyword argument
+    '''
+    try:
+        argspec = inspect.getargspec(evaluation_script.evaluate)
+    except TypeError:
+        return False
+    return 'annotation' in argspec.args or argspec.keywords is not None
 
-def run_submission(challenge_id, challenge_phase, submission_id, submission, user_annotation_file_path):
+
+def save_atomically(path, write):
+    '''
+        Creates a file by calling `write` with a file object, which is renamed to `path` once written
+    '''
+    temp_file, temp_path = tempfile.mkstemp(dir=dirname(path))
+    try:
+        with os.fdopen(temp_file, 'wb') as f:
+            write(f)
+        os.rename(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def map_annotation_file(challenge_id, annotation_file_path):
+    '''
+        * Returns the annotation of a phase as a read-only memory map, which is kept until the
+          annotation file or the evaluation script of the challenge change
+        * If numpy is installed and the evaluation script has a `parse_annotation_file(annotation_file_path)`
+          function, the array it returns is saved once as a `.npy` file and mapped with numpy
+        * Otherwise the bytes of the annotation file are mapped with `mmap`
+        * Mapped files are named after the hash of the annotation in `ANNOTATION_CACHE_DIR`, so every
+          process of the host mapping an annotation shares its pages instead of holding its own copy
+    '''
+    version = EVALUATION_SCRIPT_VERSIONS.get(challenge_id, [None])[-1]
+    modified_at = os.path.getmtime(annotation_file_path)
+    mapped_annotation = MAPPED_ANNOTATIONS.get(annotation_file_path)
+    if mapped_annotation and mapped_annotation[:2] == (modified_at, version):
+        worker_metrics.increment('evalai_worker_cache_hits_total', cache='annotation')
+        return mapped_annotation[2]
+    worker_metrics.increment('evalai_worker_cache_misses_total', cache='annotation')
+
+    create_dir(ANNOTATION_CACHE_DIR)
+    annotation_hash = get_file_hash(annotation_file_path)
+    parse_annotation_file = getattr(EVALUATION_SCRIPTS[challenge_id], 'parse_annotation_file', None)
+    if numpy is not None and parse_annotation_file:
+        parsed_annotation_path = join(ANNOTATION_CACHE_DIR, '{0}_{1}.npy'.format(annotation_hash, version))
+        if not os.path.exists(parsed_annotation_path):
+            parsed_annotation = numpy.asarray(parse_annotation_file(annotation_file_path))
+            save_atomically(parsed_annotation_path,
+                            lambda f: numpy.save(f, parsed_annotation, allow_pickle=False))
+        annotation = numpy.load(parsed_annotation_path, mmap_mode='r', allow_pickle=False)
+    else:
+        cached_annotation_path = join(ANNOTATION_CACHE_DIR, annotation_hash)
+        if not os.path.exists(cached_annotation_path):
+            with open(annotation_file_path, 'rb') as annotation_file:
+                save_atomically(cached_annotation_path, lambda f: shutil.copyfileobj(annotation_file, f))
+        with open(cached_annotation_path, 'rb') as f:
+            # an empty file cannot be mapped
+            annotation = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(
+                cached_annotation_path) else b''
+
+    MAPPED_ANNOTATIONS[annotation_file_path] = (modified_at, version, annotation)
+    return annotation
+
+
+def call_evaluate(challenge_id, annotation_file_path, user_annotation_file_path, phase_codename):
+    '''
+        Calls the `evaluate` function of the evaluation script of a challenge, with the memory mapped
+        annotation if the worker maps annotations and the script takes it
+    '''
+    evaluation_script = EVALUATION_SCRIPTS[challenge_id]
+    evaluation_kwargs = {}
+    if WORKER_MMAP_ANNOTATIONS and accepts_mapped_annotation(evaluation_script):
+        evaluation_kwargs['annotation'] = map_annotation_file(challenge_id, annotation_file_path)
+    return evaluation_script.evaluate(annotation_file_path, user_annotation_file_path, phase_codename,
+                                      **evaluation_kwargs)
+
+
+def serve_evaluations(challenge_id, connection):
+    '''
+        * Evaluates the submissions sent by the worker through `connection` one after another,
+          runs in an evaluator process
+        * Sends back the output of each evaluation, or the traceback of its exception, along with
+          the cpu times and the peak memory the process spent on it
+    '''
+    while True:
+        try:
+            annotation_file_path, user_annotation_file_path, phase_codename, stdout_file, stderr_file = \
+                connection.recv()
+        except EOFError:
+            # the worker closed the connection
+            return
+        with open(stdout_file, 'a') as stdout, open(stderr_file, 'a') as stderr:
+            with file_descriptor_redirect(stdout, 1), file_descriptor_redirect(stderr, 2), \
+                    stdout_redirect(stdout), stderr_redirect(stderr):
+                reset_peak_memory()
+                start_rusage = resource.getrusage(resource.RUSAGE_SELF)
+                try:
+                    output = ('ok', call_evaluate(challenge_id, annotation_file_path, user_annotation_file_path,
+                                                  phase_codename))
+                except Exception:
+                    output = ('error', traceback.format_exc())
+                end_rusage = resource.getrusage(resource.RUSAGE_SELF)
+        resource_usage = {
+            'cpu_user_time': end_rusage.ru_utime - start_rusage.ru_utime,
+            'cpu_system_time': end_rusage.ru_stime - start_rusage.ru_stime,
+            'peak_memory': get_peak_memory(),
+        }
+        try:
+            connection.send(output + (resource_usage,))
+        except Exception:
+            connection.send(('error', 'The output of evaluate could not be sent to the worker:\n{}'.format(
+                traceback.format_exc()), resource_usage))
+
+
+def serve_evaluator_forks(connection):
+    '''
+        * Forks an evaluator process for each `(challenge_id, version)` sent by the worker through
+          `connection`, runs in the evaluator fork server
+        * Sends back the connection to the evaluator process, followed by its process id
+        * The evaluator process imports the version of the evaluation script, which the worker extracted
+    '''
+    # the worker terminates the fork server and the evaluator processes, they must not drain like it
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # the evaluator processes which exited are reaped by the kernel
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    while True:
+        try:
+            challenge_id, version = connection.recv()
+        except EOFError:
+            # the worker closed the connection
+            return
+        evaluator_connection, child_connection = multiprocessing.Pipe()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                connection.close()
+                evaluator_connection.close()
+                # the evaluation scripts may wait for their own subprocesses
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                EVALUATION_SCRIPTS[challenge_id] = importlib.import_module(
+                    CHALLENGE_IMPORT_STRING.format(challenge_id=challenge_id, version=version))
+                # the fork server was forked before the challenges were loaded, the version keys the
+                # parsed annotations cached by `map_annotation_file`
+                EVALUATION_SCRIPT_VERSIONS[challenge_id] = [version]
+                serve_evaluations(challenge_id, child_connection)
+            except BaseException:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                # never returns into the fork server
+                os._exit(exit_code)
+        child_connection.close()
+        multiprocessing.reduction.send_handle(connection, evaluator_connection.fileno(), pid)
+        evaluator_connection.close()
+        connection.send(pid)
+
+
+def start_evaluator_fork_server():
+    '''
+        Starts `EVALUATOR_FORK_SERVER`, it must be called before the worker starts any thread
+    '''
+    global EVALUATOR_FORK_SERVER
+    EVALUATOR_FORK_SERVER = EvaluatorForkServer()
+
+
+def get_evaluator_process(challenge_id):
+    '''
+        * Returns the evaluator process of a challenge, a fresh one if it has none, if its evaluation
+          script was updated or if the current one is worn out
+        * Terminates the least recently used evaluator processes beyond `WORKER_EVALUATOR_PROCESSES`
+    '''
+    evaluator = EVALUATOR_PROCESSES.pop(challenge_id, None)
+    if evaluator and not evaluator.is_usable():
+        evaluator.terminate()
+        evaluator = None
+    if evaluator is None:
+        evaluator = EvaluatorProcess(challenge_id)
+        worker_metrics.increment('evalai_worker_evaluator_processes_started_total')
+    EVALUATOR_PROCESSES[challenge_id] = evaluator
+    while len(EVALUATOR_PROCESSES) > WORKER_EVALUATOR_PROCESSES:
+        _, least_recently_used_evaluator = EVALUATOR_PROCESSES.popitem(last=False)
+        least_recently_used_evaluator.terminate()
+    return evaluator
+
+
+def terminate_evaluator_processes():
+    while EVALUATOR_PROCESSES:
+        _, evaluator = EVALUATOR_PROCESSES.popitem()
+        evaluator.terminate()
+    global EVALUATOR_FORK_SERVER
+    if EVALUATOR_FORK_SERVER is not None:
+        EVALUATOR_FORK_SERVER.terminate()
+        EVALUATOR_FORK_SERVER = None
+
+
+def iterate_log_chunks(log_file_path, max_size):
+    '''
+        * Yields the content of a log file in chunks
+        * Only yields its first and last `max_size / 2` bytes if it is larger than `max_size`, with a
+          line telling how many bytes were left out in between
+    '''
+    size = os.path.getsize(log_file_path)
+    with open(log_file_path, 'rb') as log_file:
+        if size <= max_size:
+            for chunk in iter(lambda: log_file.read(DOWNLOAD_CHUNK_SIZE), b''):
+                yield chunk
+            return
+        head_size = max_size // 2
+        yield log_file.read(head_size)
+        yield b'\n... {} bytes truncated ...\n'.format(size - max_size)
+        log_file.seek(head_size - max_size, os.SEEK_END)
+        yield log_file.read()
+
+
+def save_submission_artifact(file_field, name, chunks):
+    '''
+        * Saves chunks of content to a file field of a submission without saving the submission
+        * Gzips them into `<name>.gz` if `WORKER_COMPRESS_ARTIFACTS` is set
+        * The content is spooled to a temporary file, so that large artifacts are never held in memory
+    '''
+    with tempfile.SpooledTemporaryFile(max_size=DOWNLOAD_CHUNK_SIZE) as artifact:
+        if WORKER_COMPRESS_ARTIFACTS:
+            name += '.gz'
+            # without a modification time, the same content is always compressed to the same bytes
+            with gzip.GzipFile(filename='', mode='wb', fileobj=artifact, mtime=0) as compressed_artifact:
+                for chunk in chunks:
+                    compressed_artifact.write(force_bytes(chunk))
+        else:
+            for chunk in chunks:
+                artifact.write(force_bytes(chunk))
+        artifact.seek(0)
+        file_field.save(name, File(artifact), save=False)
+
+
+def run_submission(challenge_id, challenge_phase, submission_id, submission, user_annotation_file_path,
+                   resource_usage=None):
     '''
         * receives a challenge id, phase id and user annotation file path
         * checks whether the corresponding evaluation script for the challenge exists or not
         * checks the above for annotation file
         * calls evaluation script via subprocess passing annotation file and user_annotation_file_path as argument
+        * fills the optional `resource_usage` dict with the resources spent by the evaluator process
     '''
     submission_output = None
     phase_id = challenge_phase.id
@@ -279,15 +1205,28 @@ def run_submission(challenge_id, challenge_phase, submission_id, submission, use
     stdout = open(stdout_file, 'a+')
     stderr = open(stderr_file, 'a+')
 
-    # call `main` from globals and set `status` to running and hence `started_at`
-    submission.status = Submission.RUNNING
-    submission.save()
+    # the submission is already running, see `claim_submission`
+    leaderboard_data_list = []
+    failure_cause = None
     try:
         successful_submission_flag = True
+        failure_cause = 'evaluation_error'
         with stdout_redirect(stdout) as new_stdout, stderr_redirect(stderr) as new_stderr:      # noqa
-            submission_output = EVALUATION_SCRIPTS[challenge_id].evaluate(annotation_file_path,
-                                                                          user_annotation_file_path,
-                                                                          challenge_phase.codename,)
+            with worker_metrics.timed('evalai_worker_evaluation_seconds', challenge_id=challenge_id):
+                if WORKER_EVALUATOR_PROCESSES:
+                    # the evaluator process appends to the same files
+                    stdout.flush()
+                    stderr.flush()
+                    evaluator = get_evaluator_process(challenge_id)
+                    submission_output = evaluator.evaluate(
+                        submission.execution_time_limit, annotation_file_path, user_annotation_file_path,
+                        challenge_phase.codename, stdout_file, stderr_file)
+                    if resource_usage is not None:
+                        resource_usage.update(evaluator.resource_usage)
+                else:
+                    submission_output = call_evaluate(challenge_id, annotation_file_path, user_annotation_file_path,
+                                                      challenge_phase.codename)
+        failure_cause = 'invalid_output'
         '''
         A submission will be marked successful only if it is of the format
             {
@@ -317,7 +1256,6 @@ def run_submission(challenge_id, challenge_phase, submission_id, submission, use
         '''
         if 'result' in submission_output:
 
-            leaderboard_data_list = []
             for split_result in submission_output['result']:
 
                 # Check if the dataset_split exists for the codename in the result
@@ -350,22 +1288,39 @@ def run_submission(challenge_id, challenge_phase, submission_id, submission, use
 
                 leaderboard_data_list.append(leaderboard_data)
 
-            if successful_submission_flag:
-                LeaderboardData.objects.bulk_create(leaderboard_data_list)
-
         # Once the submission_output is processed, then save the submission object with appropriate status
         else:
             successful_submission_flag = False
 
+    except DrainTimeoutExceeded:
+        # the submission is requeued rather than failed
+        raise
     except:
         stderr.write(traceback.format_exc())
         successful_submission_flag = False
 
     submission_status = Submission.FINISHED if successful_submission_flag else Submission.FAILED
+    if not successful_submission_flag:
+        worker_metrics.increment('evalai_worker_failures_total', cause=failure_cause)
     submission.status = submission_status
-    submission.save()
+    if submission_status == Submission.FINISHED:
+        submission.completed_at = timezone.now()
+
+    stderr.close()
+    stdout.close()
 
-    # after the execution is finished, set `status` to finished and hence `completed_at`
+    # the result is only saved while the submission is still running from `claim_submission`, as
+    # `reap_submissions` may have requeued it meanwhile for another worker, which evaluates it again
+    running_submission = Submission.objects.filter(pk=submission.pk, status=Submission.RUNNING,
+                                                   retry_count=submission.retry_count)
+    if not running_submission.exists():
+        logger.warning('Submission {} was requeued during its evaluation, discarding its result'.format(
+            submission.pk))
+        shutil.rmtree(temp_run_dir)
+        return
+
+    # file fields saved by this evaluation, the others may still hold the files of a previous one
+    saved_file_fields = [submission.stdout_file, submission.stderr_file]
     if submission_output:
         output = {}
         output['result'] = submission_output.get('result', '')
@@ -373,46 +1328,121 @@ def run_submission(challenge_id, challenge_phase, submission_id, submission, use
 
         # Save submission_result_file
         submission_result = submission_output.get('submission_result', '')
-        submission.submission_result_file.save('submission_result.json', ContentFile(submission_result))
+        save_submission_artifact(submission.submission_result_file, 'submission_result.json', [submission_result])
 
         # Save submission_metadata_file
         submission_metadata = submission_output.get('submission_metadata', '')
-        submission.submission_metadata_file.save('submission_metadata.json', ContentFile(submission_metadata))
+        save_submission_artifact(submission.submission_metadata_file, 'submission_metadata.json',
+                                 [submission_metadata])
+        saved_file_fields += [submission.submission_result_file, submission.submission_metadata_file]
+
+    save_submission_artifact(submission.stdout_file, 'stdout.txt',
+                             iterate_log_chunks(stdout_file, WORKER_MAX_LOG_SIZE * 1024))
+    save_submission_artifact(submission.stderr_file, 'stderr.txt',
+                             iterate_log_chunks(stderr_file, WORKER_MAX_LOG_SIZE * 1024))
+
+    with transaction.atomic():
+        if running_submission.update(
+                status=submission.status, completed_at=submission.completed_at, output=submission.output,
+                stdout_file=submission.stdout_file, stderr_file=submission.stderr_file,
+                submission_result_file=submission.submission_result_file,
+                submission_metadata_file=submission.submission_metadata_file):
+            if successful_submission_flag:
+                LeaderboardData.objects.bulk_create(leaderboard_data_list)
+        else:
+            # requeued while the files were saved, nothing points to them
+            logger.warning('Submission {} was requeued during its evaluation, discarding its result'.format(
+                submission.pk))
+            for file_field in saved_file_fields:
+                file_field.delete(save=False)
 
-    submission.save()
+    # delete the complete temp run directory
+    shutil.rmtree(temp_run_dir)
 
-    stderr.close()
-    stdout.close()
-    stderr_content = open(stderr_file, 'r').read()
-    stdout_content = open(stdout_file, 'r').read()
 
-    # TODO :: see if two updates can be combine into a single update.
-    with open(stdout_file, 'r') as stdout:
-        stdout_content = stdout.read()
-        submission.stdout_file.save('stdout.txt', ContentFile(stdout_content))
-    with open(stderr_file, 'r') as stderr:
-        stderr_content = stderr.read()
-        submission.stderr_file.save('stderr.txt', ContentFile(stderr_content))
+def save_submission_metrics(submission, resource_usage, bytes_downloaded):
+    '''
+        Saves the resources spent on evaluating a submission along with its time spent in queue,
+        returns whether the submission is evaluated for the first time
+    '''
+    queue_wait_time = None
+    if submission.started_at:
+        queue_wait_time = (submission.started_at - submission.submitted_at).total_seconds()
+    resource_usage = dict(resource_usage, queue_wait_time=queue_wait_time, bytes_downloaded=bytes_downloaded)
+    # a redelivered submission is evaluated again, so keep the latest measurements
+    _, created = SubmissionMetrics.objects.update_or_create(submission=submission, defaults=resource_usage)
+    return created
+
+
+def update_slots_in_use(change):
+    '''
+        Updates the number of submissions being evaluated by the worker
+    '''
+    global SLOTS_IN_USE
+    SLOTS_IN_USE += change
+    worker_metrics.set_gauge('evalai_worker_slots_in_use', SLOTS_IN_USE)
 
-    # delete the complete temp run directory
-    shutil.rmtree(temp_run_dir)
+
+def claim_submission(submission):
+    '''
+        Sets a submitted submission to running, in a single update so that a single worker evaluates it,
+        returns whether the worker got it
+    '''
+    started_at = timezone.now()
+    if not Submission.objects.filter(pk=submission.pk, status=Submission.SUBMITTED,
+                                     retry_count=submission.retry_count).update(
+            status=Submission.RUNNING, started_at=started_at, infrastructure_failed_at=None):
+        return False
+    submission.status = Submission.RUNNING
+    submission.started_at = started_at
+    submission.infrastructure_failed_at = None
+    return True
 
 
 def process_submission_message(message):
     challenge_id = message.get('challenge_id')
     phase_id = message.get('phase_id')
     submission_id = message.get('submission_id')
-    submission_instance = extract_submission_data(submission_id)
 
-    try:
-        challenge_phase = ChallengePhase.objects.get(id=phase_id)
-    except ChallengePhase.DoesNotExist:
-        logger.critical('Challenge Phase {} does not exist'.format(phase_id))
-        traceback.print_exc()
+    with measure_resource_usage() as resource_usage:
+        submission_instance = extract_submission_data(submission_id)
+        if submission_instance.status != Submission.SUBMITTED:
+            # the message was redelivered, or published again by `reap_submissions`, after a worker took it
+            logger.info('Submission {} is already {}, skipping it'.format(submission_id, submission_instance.status))
+            return
 
-    user_annotation_file_path = join(SUBMISSION_DATA_DIR.format(submission_id=submission_id),
-                                     os.path.basename(submission_instance.input_file.name))
-    run_submission(challenge_id, challenge_phase, submission_id, submission_instance, user_annotation_file_path)
+        try:
+            challenge_phase = ChallengePhase.objects.get(id=phase_id)
+        except ChallengePhase.DoesNotExist:
+            logger.critical('Challenge Phase {} does not exist'.format(phase_id))
+            traceback.print_exc()
+
+        user_annotation_file_path = join(SUBMISSION_DATA_DIR.format(submission_id=submission_id),
+                                         os.path.basename(submission_instance.input_file.name))
+        if not os.path.exists(user_annotation_file_path):
+            # a failure of the infrastructure rather than of the submission, which stays submitted
+            # until `reap_submissions` retries it
+            logger.error('Input file of submission {} is not available, leaving it to be retried'.format(
+                submission_id))
+            Submission.objects.filter(pk=submission_id, status=Submission.SUBMITTED).update(
+                infrastructure_failed_at=timezone.now())
+            return
+        if not claim_submission(submission_instance):
+            # the message was redelivered, or requeued by `reap_submissions`, after another worker took it
+            logger.info('Submission {} was already taken by a worker, skipping it'.format(submission_id))
+            return
+        bytes_downloaded = os.path.getsize(user_annotation_file_path)
+        update_slots_in_use(1)
+        try:
+            run_submission(challenge_id, challenge_phase, submission_id, submission_instance,
+                           user_annotation_file_path, resource_usage)
+        finally:
+            update_slots_in_use(-1)
+
+    if save_submission_metrics(submission_instance, resource_usage, bytes_downloaded):
+        # a redelivered submission is counted in the statistics of its phase only once
+        ChallengePhaseStatistics.record_evaluation(submission_instance, resource_usage['wall_time'])
+        SubmissionActivity.record_evaluation(submission_instance, resource_usage['wall_time'])
 
 
 def process_add_challenge_message(message):
@@ -428,44 +1458,222 @@ def process_add_challenge_message(message):
     extract_challenge_data(challenge, phases)
 
 
+def bind_submission_queues(channel, challenge_id):
+    '''
+        * Declares the submission queue of every phase of a loaded challenge
+        * Binds each queue to the exchange with the routing key of its phase, from then on
+          submissions of the challenge are routed to the workers having it loaded
+        * Messages left in a queue nobody consumes go back to the shared queue, see
+          `get_submission_queue_arguments`
+    '''
+    for phase_id in PHASE_PRIORITY_MAP.get(challenge_id, {}):
+        queue_name = get_submission_queue_name(challenge_id, phase_id)
+        channel.queue_declare(queue=queue_name, durable=True, arguments=get_submission_queue_arguments())
+        channel.queue_bind(
+            exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
+            queue=queue_name,
+            routing_key=get_submission_routing_key(challenge_id, phase_id))
+
+
+def get_submission_queue_weights():
+    '''
+        Returns a map of submission queue name : weight for every loaded challenge phase
+    '''
+    queue_weights = {}
+    # the shared queue receives submissions of challenges which are not loaded by any worker yet,
+    # only workers which are not dedicated to some challenges serve it
+    if not WORKER_CHALLENGE_IDS:
+        queue_weights[settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE']] = 1
+    for challenge_id, phases in PHASE_PRIORITY_MAP.items():
+        # challenges loaded only to serve the shared queue have no bound queues here
+        if not is_challenge_served_by_worker(challenge_id):
+            continue
+        for phase_id, priority in phases.items():
+            queue_weights[get_submission_queue_name(challenge_id, phase_id)] = priority
+    return queue_weights
+
+
+def fetch_next_submission_message(channel):
+    '''
+        * Polls the submission queues in weighted fair share order of phase priority
+        * Returns a tuple of (method, properties, body), which are all `None` if every queue is empty
+        * Messages are only taken when the worker is ready for them, so that a message never waits
+          on a busy worker while another one is idle
+    '''
+    global SUBMISSION_QUEUE_VIRTUAL_TIME
+
+    queue_weights = get_submission_queue_weights()
+    for queue_name in queue_weights:
+        SUBMISSION_QUEUE_PASS.setdefault(queue_name, SUBMISSION_QUEUE_VIRTUAL_TIME)
+
+    idle_queue_names = []
+    # a phase with priority 0 is polled after all the others, even when it was idle
+    for queue_name in sorted(queue_weights, key=lambda name: (not queue_weights[name], SUBMISSION_QUEUE_PASS[name])):
+        method, properties, body = channel.basic_get(queue=queue_name)
+        if method:
+            SUBMISSION_QUEUE_VIRTUAL_TIME = SUBMISSION_QUEUE_PASS[queue_name]
+            weight = queue_weights[queue_name]
+            # a phase with priority 0 is served only when no other phase has submissions
+            SUBMISSION_QUEUE_PASS[queue_name] += 1.0 / weight if weight else float('inf')
+            # an idle queue should not bank its share and then burst once it gets busy
+            for idle_queue_name in idle_queue_names:
+                SUBMISSION_QUEUE_PASS[idle_queue_name] = SUBMISSION_QUEUE_VIRTUAL_TIME
+            return method, properties, body
+        idle_queue_names.append(queue_name)
+    return None, None, None
+
+
+def take_submission_messages(channel):
+    '''
+        * Takes submission messages until `WORKER_PREFETCH_COUNT` of them are waiting behind
+          the next one to evaluate
+        * Stages the inputs of the taken messages, so that they are fetched and downloaded
+          while the messages ahead of them are evaluated
+    '''
+    while len(PREFETCHED_SUBMISSION_MESSAGES) <= WORKER_PREFETCH_COUNT:
+        method, properties, body = fetch_next_submission_message(channel)
+        if not method:
+            return
+        if WORKER_PREFETCH_COUNT:
+            try:
+                submission_id = parse_submission_message(body).get('submission_id')
+                if getattr(method, 'redelivered', False):
+                    # the previous delivery of a redelivered message cannot be acknowledged anymore
+                    for message in list(PREFETCHED_SUBMISSION_MESSAGES):
+                        if parse_submission_message(message[2]).get('submission_id') == submission_id:
+                            PREFETCHED_SUBMISSION_MESSAGES.remove(message)
+                stage_submission_input(submission_id)
+            except Exception as e:
+                # reported when the message is processed
+                logger.error('Failed to stage submission message {}, error {}'.format(body, e))
+                traceback.print_exc()
+        PREFETCHED_SUBMISSION_MESSAGES.append((method, properties, body))
+
+
+def process_next_submission_message(channel):
+    '''
+        Processes the next submission message, returns `False` if every submission queue is empty
+    '''
+    take_submission_messages(channel)
+    if not PREFETCHED_SUBMISSION_MESSAGES:
+        return False
+    method, properties, body = PREFETCHED_SUBMISSION_MESSAGES.popleft()
+    process_submission_callback(channel, method, properties, body)
+    return True
+
+
+def release_prefetched_submission_messages(channel):
+    '''
+        * Cancels the staging of the submission messages taken ahead, when the worker stops
+        * Requeues the messages if the channel is still open, so that other workers evaluate
+          them without waiting for the connection of this one to close
+    '''
+    for submission_id in list(STAGED_SUBMISSION_INPUTS):
+        cancel_staged_submission_input(submission_id)
+    while PREFETCHED_SUBMISSION_MESSAGES:
+        method, properties, body = PREFETCHED_SUBMISSION_MESSAGES.popleft()
+        if channel.is_open:
+            channel.basic_reject(delivery_tag=method.delivery_tag, requeue=True)
+
+
+def requeue_in_flight_submissions(channel):
+    '''
+        * Puts the submissions whose processing was interrupted by the shutdown of the worker back
+          to `submitted`, along with deleting the leaderboard data they may have created
+        * Requeues their messages if the channel is still open, so that another worker evaluates
+          them from scratch
+    '''
+    for delivery_tag, submission_id in IN_FLIGHT_SUBMISSION_MESSAGES.items():
+        if Submission.objects.filter(id=submission_id, status=Submission.RUNNING).update(
+                status=Submission.SUBMITTED):
+            LeaderboardData.objects.filter(submission_id=submission_id).delete()
+            logger.info('Requeued interrupted submission {}'.format(submission_id))
+        if channel.is_open:
+            channel.basic_reject(delivery_tag=delivery_tag, requeue=True)
+    IN_FLIGHT_SUBMISSION_MESSAGES.clear()
+
+
+def parse_submission_message(body):
+    body = yaml.safe_load(body)
+    return dict((k, int(v)) for k, v in body.iteritems())
+
+
 def process_submission_callback(ch, method, properties, body):
+    worker_metrics.increment('evalai_worker_messages_consumed_total', queue='submission')
     try:
         logger.info("[x] Received submission message %s" % body)
-        body = yaml.safe_load(body)
-        body = dict((k, int(v)) for k, v in body.iteritems())
+        body = parse_submission_message(body)
+        challenge_id = body.get('challenge_id')
+        if challenge_id not in EVALUATION_SCRIPTS:
+            worker_metrics.increment('evalai_worker_cache_misses_total', cache='challenge')
+            # the message came through the shared queue for a challenge which is not loaded yet
+            process_add_challenge_message(body)
+            if is_challenge_served_by_worker(challenge_id):
+                bind_submission_queues(ch, challenge_id)
+        else:
+            worker_metrics.increment('evalai_worker_cache_hits_total', cache='challenge')
+        # left in when the processing is interrupted by the shutdown of the worker
+        IN_FLIGHT_SUBMISSION_MESSAGES[method.delivery_tag] = body.get('submission_id')
         process_submission_message(body)
         ch.basic_ack(delivery_tag=method.delivery_tag)
+        worker_metrics.increment('evalai_worker_messages_acked_total', queue='submission')
     except Exception as e:
         logger.error('Error in receiving message from submission queue with error {}'.format(e))
+        worker_metrics.increment('evalai_worker_failures_total', cause='message_processing')
         traceback.print_exc()
+        # requeued once, in case the failure was transient, and dropped the second time. A submission
+        # left submitted by a dropped message is requeued by `reap_submissions`
+        requeue = not getattr(method, 'redelivered', False)
+        if ch.is_open:
+            ch.basic_reject(delivery_tag=method.delivery_tag, requeue=requeue)
+            worker_metrics.increment('evalai_worker_messages_rejected_total', queue='submission',
+                                     requeued=str(requeue).lower())
+    IN_FLIGHT_SUBMISSION_MESSAGES.pop(method.delivery_tag, None)
 
 
 def add_challenge_callback(ch, method, properties, body):
+    worker_metrics.increment('evalai_worker_messages_consumed_total', queue='add_challenge')
     try:
         logger.info("[x] Received add challenge message %s" % body)
         body = yaml.safe_load(body)
-        process_add_challenge_message(body)
+        challenge_id = int(body.get('challenge_id'))
+        if is_challenge_served_by_worker(challenge_id):
+            process_add_challenge_message(body)
+            bind_submission_queues(ch, challenge_id)
         ch.basic_ack(delivery_tag=method.delivery_tag)
+        worker_metrics.increment('evalai_worker_messages_acked_total', queue='add_challenge')
     except Exception as e:
         logger.error('Error in receiving message from add challenge queue with error {}'.format(e))
+        worker_metrics.increment('evalai_worker_failures_total', cause='message_processing')
         traceback.print_exc()
 
 
 def main():
 
     logger.info('Using {0} as temp directory to store data'.format(BASE_TEMP_DIR))
+    signal.signal(signal.SIGTERM, shutdown_handler)
+    # system calls of the evaluation resume after SIGTERM instead of failing
+    signal.siginterrupt(signal.SIGTERM, False)
     create_dir_as_python_package(COMPUTE_DIRECTORY_PATH)
 
     sys.path.append(COMPUTE_DIRECTORY_PATH)
 
+    if WORKER_EVALUATOR_PROCESSES:
+        # before any thread is started
+        start_evaluator_fork_server()
+    if WORKER_METRICS_PORT:
+        worker_metrics.start_http_server(int(WORKER_METRICS_PORT))
+    if WORKER_STATSD_ADDRESS:
+        worker_metrics.configure_statsd(WORKER_STATSD_ADDRESS)
+    update_slots_in_use(0)
+    if WORKER_PREFETCH_COUNT:
+        start_staging_threads()
     load_active_challenges()
     connection = pika.BlockingConnection(pika.ConnectionParameters(
         host=settings.RABBITMQ_PARAMETERS['HOST'], heartbeat_interval=0))
 
     channel = connection.channel()
-    channel.exchange_declare(
-        exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
-        type=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['TYPE'])
+    declare_submission_exchanges(channel)
 
     # name can be a combination of hostname + process id
     # host name : to easily identify that the worker is running on which instance
@@ -473,10 +1681,6 @@ def main():
     add_challenge_queue_name = '{hostname}_{process_id}'.format(hostname=socket.gethostname(),
                                                                 process_id=str(os.getpid()))
 
-    channel.queue_declare(
-        queue=settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'],
-        durable=True)
-
     # reason for using `exclusive` instead of `autodelete` is that
     # challenge addition queue should have only have one consumer on the connection
     # that creates it.
@@ -486,20 +1690,37 @@ def main():
     # create submission base data directory
     create_dir_as_python_package(SUBMISSION_DATA_BASE_DIR)
 
-    channel.queue_bind(
+    # submissions are routed to the queue of their challenge phase and only fall back to the
+    # shared queue through the alternate exchange, so the old catch-all binding would deliver
+    # every message twice
+    channel.queue_unbind(
         exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
         queue=settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'],
         routing_key='submission.*.*')
-    channel.basic_consume(
-        process_submission_callback,
-        queue=settings.RABBITMQ_PARAMETERS['SUBMISSION_QUEUE'])
+    for challenge_id in PHASE_PRIORITY_MAP.keys():
+        bind_submission_queues(channel, challenge_id)
 
     channel.queue_bind(
         exchange=settings.RABBITMQ_PARAMETERS['EVALAI_EXCHANGE']['NAME'],
         queue=add_challenge_queue_name, routing_key='challenge.*.*')
     channel.basic_consume(add_challenge_callback, queue=add_challenge_queue_name)
 
-    channel.start_consuming()
+    try:
+        while not SHUTDOWN_REQUESTED.is_set():
+            # deliver pending add challenge messages before picking the next submission
+            connection.process_data_events()
+            if not process_next_submission_message(channel):
+                connection.sleep(SUBMISSION_QUEUE_POLL_INTERVAL)
+    except DrainTimeoutExceeded as e:
+        logger.warning(e)
+    finally:
+        terminate_evaluator_processes()
+        requeue_in_flight_submissions(channel)
+        release_prefetched_submission_messages(channel)
+        if connection.is_open:
+            connection.close()
+        shutil.rmtree(BASE_TEMP_DIR, ignore_errors=True)
+        logger.info('Stopped the worker')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,184 @@
+'''
+    Metrics of the submission worker.
+
+    Metrics are kept in process and either served in the Prometheus text format on
+    `http://<host>:<port>/metrics` or pushed to a StatsD server as they are recorded, e.g.
+
+        EVALAI_WORKER_METRICS_PORT=9100 python scripts/workers/submission_worker.py
+        EVALAI_WORKER_STATSD_ADDRESS=localhost:8125 python scripts/workers/submission_worker.py
+
+    StatsD metrics carry their labels as DogStatsD tags.
+'''
+from __future__ import absolute_import
+import BaseHTTPServer
+import contextlib
+import logging
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of histogram buckets (in seconds), evaluations may take minutes
+HISTOGRAM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float('inf'))
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# map of metric name : metric type
+METRIC_TYPES = {}
+
+# map of metric name : labels (as sorted tuple of pairs) : value
+# value of a histogram is a list of bucket counts followed by the sum of observations
+METRIC_VALUES = {}
+
+# metrics are recorded by the worker and read by the http server thread
+METRICS_LOCK = threading.Lock()
+
+# (socket, address) of the StatsD server, metrics are not pushed when `None`
+STATSD_CLIENT = None
+
+
+def _get_label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _send_to_statsd(name, value, statsd_type, labels):
+    if not STATSD_CLIENT:
+        return
+    statsd_socket, address = STATSD_CLIENT
+    packet = '{0}:{1}|{2}'.format(name, value, statsd_type)
+    if labels:
+        packet += '|#' + ','.join('{0}:{1}'.format(label, label_value) for label, label_value in labels)
+    try:
+        statsd_socket.sendto(packet, address)
+    except socket.error as e:
+        # metrics should never break the evaluation of a submission
+        logger.warning('Failed to push metric {} to statsd, error {}'.format(name, e))
+
+
+def increment(name, value=1, **labels):
+    '''
+        Increments a counter
+    '''
+    label_key = _get_label_key(labels)
+    with METRICS_LOCK:
+        METRIC_TYPES[name] = COUNTER
+        values = METRIC_VALUES.setdefault(name, {})
+        values[label_key] = values.get(label_key, 0) + value
+    _send_to_statsd(name, value, 'c', label_key)
+
+
+def set_gauge(name, value, **labels):
+    '''
+        Sets the current value of a gauge
+    '''
+    label_key = _get_label_key(labels)
+    with METRICS_LOCK:
+        METRIC_TYPES[name] = GAUGE
+        METRIC_VALUES.setdefault(name, {})[label_key] = value
+    _send_to_statsd(name, value, 'g', label_key)
+
+
+def observe(name, value, **labels):
+    '''
+        Records an observation, usually a duration in seconds, in a histogram
+    '''
+    label_key = _get_label_key(labels)
+    with METRICS_LOCK:
+        METRIC_TYPES[name] = HISTOGRAM
+        values = METRIC_VALUES.setdefault(name, {})
+        buckets = values.setdefault(label_key, [0] * len(HISTOGRAM_BUCKETS) + [0])
+        for index, upper_bound in enumerate(HISTOGRAM_BUCKETS):
+            if value <= upper_bound:
+                buckets[index] += 1
+                break
+        buckets[-1] += value
+    _send_to_statsd(name, value, 'h', label_key)
+
+
+@contextlib.contextmanager
+def timed(name, **labels):
+    '''
+        Records the time spent inside the block in a histogram
+    '''
+    start_time = time.time()
+    try:
+        yield
+    finally:
+        observe(name, time.time() - start_time, **labels)
+
+
+def _format_labels(label_key, extra_labels=()):
+    labels = list(label_key) + list(extra_labels)
+    if not labels:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(label, value) for label, value in labels) + '}'
+
+
+def _format_bound(upper_bound):
+    return '+Inf' if upper_bound == float('inf') else repr(upper_bound)
+
+
+def render():
+    '''
+        Returns all the metrics in the Prometheus text exposition format
+    '''
+    lines = []
+    with METRICS_LOCK:
+        for name in sorted(METRIC_VALUES):
+            metric_type = METRIC_TYPES[name]
+            lines.append('# TYPE {0} {1}'.format(name, metric_type))
+            for label_key, value in sorted(METRIC_VALUES[name].items()):
+                if metric_type != HISTOGRAM:
+                    lines.append('{0}{1} {2}'.format(name, _format_labels(label_key), value))
+                    continue
+                cumulative_count = 0
+                for upper_bound, count in zip(HISTOGRAM_BUCKETS, value):
+                    cumulative_count += count
+                    lines.append('{0}_bucket{1} {2}'.format(
+                        name, _format_labels(label_key, [('le', _format_bound(upper_bound))]), cumulative_count))
+                lines.append('{0}_sum{1} {2}'.format(name, _format_labels(label_key), value[-1]))
+                lines.append('{0}_count{1} {2}'.format(name, _format_labels(label_key), cumulative_count))
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        content = render()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # scrapes every few seconds would flood the worker logs
+        pass
+
+
+def start_http_server(port, host=''):
+    '''
+        Serves the metrics on `/metrics` from a daemon thread
+    '''
+    server = BaseHTTPServer.HTTPServer((host, port), MetricsRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, name='worker-metrics')
+    thread.daemon = True
+    thread.start()
+    logger.info('Serving worker metrics on port {}'.format(port))
+    return server
+
+
+def configure_statsd(address):
+    '''
+        Pushes every metric recorded from now on to the StatsD server at `host:port`
+    '''
+    global STATSD_CLIENT
+    host, _, port = address.partition(':')
+    STATSD_CLIENT = (socket.socket(socket.AF_INET, socket.SOCK_DGRAM), (host, int(port or 8125)))
+    logger.info('Pushing worker metrics to statsd at {}'.format(address))
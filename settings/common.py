@@ -156,12 +156,13 @@ REST_FRAMEWORK = {
     ],
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'DEFAULT_THROTTLE_CLASSES': (
-        'rest_framework.throttling.AnonRateThrottle',
-        'rest_framework.throttling.UserRateThrottle'
+        'base.throttles.AnonRateThrottle',
+        'base.throttles.UserRateThrottle'
     ),
     'DEFAULT_THROTTLE_RATES': {
         'anon': '100/minute',
-        'user': '100/minute'
+        'user': '100/minute',
+        'submission': '10/minute',
     },
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
@@ -264,11 +265,45 @@ CACHES = {
     }
 }
 
+# cache holding the request counters of the throttles, see `base.throttles`. It needs atomic
+# increments shared by all the processes, like memcached or redis
+THROTTLE_CACHE = 'default'
+
 RABBITMQ_PARAMETERS = {
     'HOST': 'localhost',
     'EVALAI_EXCHANGE': {
         'NAME': 'evalai_submissions',
         'TYPE': 'topic',
     },
+    # alternate exchange of `EVALAI_EXCHANGE`, it receives the submission messages of
+    # challenge phases whose queue is not bound by any worker yet
+    'SHARED_EXCHANGE': {
+        'NAME': 'evalai_submissions_shared',
+        'TYPE': 'topic',
+    },
     'SUBMISSION_QUEUE': 'submission_task_queue',
+    # seconds after which a message left in the queue of a challenge phase is dead-lettered to `SHARED_EXCHANGE`,
+    # `None` keeps it until a worker takes it. Only a safety net for queues which no worker polls anymore, it must
+    # be far longer than the wait of a backlog under normal load. The queues of a challenge whose workers are
+    # gone are handed over to the shared queue with `manage.py release_submission_queues`
+    'PHASE_QUEUE_MESSAGE_TTL': None,
+}
+
+# number of days the submission activity of each resolution is kept, see `analytics.models.SubmissionActivity`.
+# `rollup_submission_activity` downsamples older minutes to hours and hours to days, and deletes older days
+SUBMISSION_ACTIVITY_RETENTION_DAYS = {
+    'minute': 2,
+    'hour': 60,
+    'day': 730,
+}
+
+# `reap_submissions` requeues the running submissions `RUNNING_SLACK` seconds beyond their `execution_time_limit`,
+# whose worker died, and the submitted ones which a worker could not evaluate because of the infrastructure, or
+# which no worker started, `RETRY_BACKOFF` seconds after the failure or since they were submitted or retried,
+# doubled on every retry. A submission still stuck after `MAX_RETRIES` retries is failed, unless no worker
+# started it, then it keeps being requeued with the delay of its last retry
+SUBMISSION_REAPER = {
+    'RUNNING_SLACK': 600,
+    'RETRY_BACKOFF': 1800,
+    'MAX_RETRIES': 3,
 }
@@ -42,3 +42,11 @@ CACHES = {
 }
 
 MEDIA_URL = "/media/"
+
+# Profile the SQL queries of every request, see `middleware.queries`
+MIDDLEWARE += ['middleware.queries.QueryProfilingMiddleware', ]  # noqa: ignore=F405
+
+QUERY_PROFILING = {
+    'SAMPLE_RATE': 1.0,
+    'RESPONSE_HEADERS': True,
+}
@@ -31,11 +31,24 @@ DATABASES = {
 DATADOG_APP_NAME = 'EvalAI'
 DATADOG_APP_KEY = os.environ.get('DATADOG_APP_KEY')
 DATADOG_API_KEY = os.environ.get('DATADOG_API_KEY')
+# seconds between two batches of metrics sent to DataDog
+DATADOG_FLUSH_INTERVAL = 10
+# number of events waiting to be sent to DataDog, after which new events are dropped
+DATADOG_EVENT_QUEUE_SIZE = 100
 
 MIDDLEWARE += ['middleware.metrics.DatadogMiddleware', ]     # noqa
+MIDDLEWARE += ['middleware.queries.QueryProfilingMiddleware', ]     # noqa
+
+# profile the SQL queries of a sample of requests and send them as DataDog metrics
+QUERY_PROFILING = {
+    'SAMPLE_RATE': 0.05,
+    'METRICS': True,
+}
 
 INSTALLED_APPS += ('storages', 'raven.contrib.django.raven_compat')  # noqa
 
+RABBITMQ_PARAMETERS['PHASE_QUEUE_MESSAGE_TTL'] = int(os.environ.get('RABBITMQ_PHASE_QUEUE_MESSAGE_TTL', 0)) or None  # noqa
+
 AWS_STORAGE_BUCKET_NAME = "evalai"
 AWS_ACCESS_KEY_ID = os.environ.get('AWS_ACCESS_KEY_ID', '')
 AWS_SECRET_ACCESS_KEY = os.environ.get('AWS_SECRET_ACCESS_KEY', '')
@@ -0,0 +1,367 @@
+import json
+import os
+import time
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.urlresolvers import reverse_lazy
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from allauth.account.models import EmailAddress
+from analytics.models import (ChallengePhaseStatistics,
+                              DailySubmissionCount,
+                              EvaluationTimeBucket,
+                              SubmissionActivity,)
+from analytics.utils import truncate_datetime
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from challenges.models import (Challenge,
+                               ChallengePhase,
+                               ChallengePhaseSplit,
+                               DatasetSplit,
+                               Leaderboard,
+                               LeaderboardData,)
+from hosts.models import ChallengeHost, ChallengeHostTeam
+from jobs.models import Submission, SubmissionMetrics
+from participants.models import Participant, ParticipantTeam
+
+# number of challenges, phases, teams, members and submissions seeded for each run,
+# kept below `PAGE_SIZE` so that pagination does not hide the growth of a list
+SIZES = (2, 6)
+
+# path of a json file to which the query count and wall time of every endpoint are written
+BENCHMARK_OUTPUT = os.environ.get('EVALAI_BENCHMARK_OUTPUT')
+
+
+def seed(size, prefix):
+    '''
+        * Creates `size` of every object seen by an endpoint, all of them visible to a single user
+        * Returns a dict of the created objects which are used in the urls
+    '''
+    now = timezone.now()
+    user = User.objects.create(username='{}_user'.format(prefix), email='{}_user@test.com'.format(prefix))
+    EmailAddress.objects.create(user=user, email=user.email, primary=True, verified=True)
+    members = User.objects.bulk_create([
+        User(username='{}_member_{}'.format(prefix, i), email='{}_member_{}@test.com'.format(prefix, i))
+        for i in range(size * size)])
+    invitee = User.objects.create(username='{}_invitee'.format(prefix), email='{}_invitee@test.com'.format(prefix))
+
+    host_teams = [ChallengeHostTeam.objects.create(team_name='{} Host Team {}'.format(prefix, i), created_by=user)
+                  for i in range(size)]
+    ChallengeHost.objects.bulk_create(
+        [ChallengeHost(user=user, team_name=host_team, status=ChallengeHost.ACCEPTED,
+                       permissions=ChallengeHost.ADMIN) for host_team in host_teams] +
+        [ChallengeHost(user=member, team_name=host_teams[0], status=ChallengeHost.ACCEPTED,
+                       permissions=ChallengeHost.READ) for member in members[:size]])
+    host = ChallengeHost.objects.get(user=user, team_name=host_teams[0])
+
+    challenges = Challenge.objects.bulk_create([
+        Challenge(title='{} Challenge {}'.format(prefix, i), creator=host_teams[0], published=True,
+                  start_date=now - timedelta(days=2), end_date=now + timedelta(days=1))
+        for i in range(size)])
+    challenge_phases = ChallengePhase.objects.bulk_create([
+        ChallengePhase(name='{} Phase {}'.format(prefix, i), challenge=challenges[0], is_public=True,
+                       codename='{}_phase_{}'.format(prefix, i), test_annotation='test_annotation.txt',
+                       start_date=now - timedelta(days=2), end_date=now + timedelta(days=1))
+        for i in range(size)])
+    dataset_split = DatasetSplit.objects.create(name='{} Split'.format(prefix), codename='{}_split'.format(prefix))
+    leaderboard = Leaderboard.objects.create(schema={'labels': ['score'], 'default_order_by': 'score'})
+    challenge_phase_splits = ChallengePhaseSplit.objects.bulk_create([
+        ChallengePhaseSplit(challenge_phase=challenge_phase, dataset_split=dataset_split, leaderboard=leaderboard)
+        for challenge_phase in challenge_phases])
+
+    participant_teams = ParticipantTeam.objects.bulk_create([
+        ParticipantTeam(team_name='{} Participant Team {}'.format(prefix, i), created_by=user)
+        for i in range(size + 2)])
+    # the last two teams have not participated in any challenge yet, the user is the only member
+    # of the first one and is not a member of the second one
+    new_participant_team = participant_teams.pop()
+    own_participant_team = participant_teams.pop()
+    Participant.objects.bulk_create(
+        [Participant(user=user, team=participant_team, status=Participant.SELF)
+         for participant_team in participant_teams + [own_participant_team]] +
+        [Participant(user=members[i * size + j], team=participant_team, status=Participant.ACCEPTED)
+         for i, participant_team in enumerate(participant_teams) for j in range(size)] +
+        [Participant(user=member, team=new_participant_team, status=Participant.ACCEPTED)
+         for member in members[size * size - size:]])
+    for participant_team in participant_teams:
+        challenges[0].participant_teams.add(participant_team)
+    for challenge in challenges[1:]:
+        challenge.participant_teams.add(participant_teams[0])
+
+    # the first team makes `size` submissions, every other team makes one
+    submissions = Submission.objects.bulk_create([
+        Submission(participant_team=participant_team, challenge_phase=challenge_phases[0], created_by=user,
+                   status=Submission.FINISHED, is_public=True, input_file='input_file.txt',
+                   submission_number=i + 1)
+        for participant_team in participant_teams
+        for i in range(size if participant_team == participant_teams[0] else 1)])
+    LeaderboardData.objects.bulk_create([
+        LeaderboardData(challenge_phase_split=challenge_phase_splits[0], submission=submission,
+                        leaderboard=leaderboard, result={'score': submission.id})
+        for submission in submissions])
+    SubmissionMetrics.objects.create(submission=submissions[0], wall_time=1, cpu_user_time=1, cpu_system_time=0,
+                                     peak_memory=1024, bytes_downloaded=1024, db_queries=1, db_time=0)
+
+    # the statistics are counted by signals which `bulk_create` does not send
+    ChallengePhaseStatistics.objects.bulk_create([
+        ChallengePhaseStatistics(challenge_phase=challenge_phase, submission_count=size)
+        for challenge_phase in challenge_phases])
+    EvaluationTimeBucket.objects.bulk_create([
+        EvaluationTimeBucket(challenge_phase=challenge_phase, bucket=i, count=1)
+        for challenge_phase in challenge_phases for i in range(size)])
+    DailySubmissionCount.objects.bulk_create([
+        DailySubmissionCount(challenge_phase=challenge_phases[0], date=now.date() - timedelta(days=i),
+                             submission_count=1)
+        for i in range(size)])
+    SubmissionActivity.objects.bulk_create([
+        SubmissionActivity(challenge=challenges[0], challenge_phase=challenge_phase,
+                           resolution=SubmissionActivity.MINUTE,
+                           period_start=truncate_datetime(now, SubmissionActivity.MINUTE) - timedelta(minutes=i),
+                           submission_count=1, evaluation_count=1, total_evaluation_time=1,
+                           evaluation_time_sketch={'1': 1})
+        for challenge_phase in challenge_phases for i in range(size)])
+    member = Participant.objects.filter(team=participant_teams[0], status=Participant.ACCEPTED).first()
+
+    return {
+        'user': user,
+        'invitee': invitee,
+        'host_team': host_teams[0],
+        'host': host,
+        'challenge': challenges[0],
+        'last_challenge': challenges[-1],
+        'challenge_phase': challenge_phases[0],
+        'challenge_phase_split': challenge_phase_splits[0],
+        'participant_team': participant_teams[0],
+        'member': member,
+        'new_participant_team': new_participant_team,
+        'own_participant_team': own_participant_team,
+        'submission': submissions[0],
+    }
+
+
+class QueryCountBenchmark(APITestCase):
+    '''
+        Calls every endpoint of `challenges`, `analytics`, `jobs`, `participants` and `hosts` with
+        increasing amounts of data and fails if the number of queries it runs grows with it
+    '''
+
+    results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        super(QueryCountBenchmark, cls).tearDownClass()
+        if BENCHMARK_OUTPUT:
+            with open(BENCHMARK_OUTPUT, 'w') as f:
+                json.dump(cls.results, f, indent=4, sort_keys=True)
+
+    def measure(self, name, get_request, expected_status=status.HTTP_200_OK):
+        '''
+            * Seeds the database for every size and makes the request returned by `get_request(data)`
+            * Asserts that the request runs the same number of queries for every size
+        '''
+        query_counts = []
+        for size in SIZES:
+            data = seed(size, '{}_{}'.format(name, size))
+            client = APIClient()
+            client.force_authenticate(user=data['user'])
+            method, url, body = get_request(data)
+            with CaptureQueriesContext(connection) as queries:
+                start_time = time.time()
+                response = getattr(client, method)(url, body, format='json')
+                if response.streaming:
+                    # the queries of a streaming response run as its content is consumed
+                    b''.join(response.streaming_content)
+                wall_time = time.time() - start_time
+            self.assertEqual(response.status_code, expected_status, getattr(response, 'data', None))
+            query_counts.append(len(queries))
+            self.results.setdefault(name, {})[size] = {'queries': len(queries), 'wall_time': wall_time}
+        self.assertEqual(len(set(query_counts)), 1, '{} runs {} queries for sizes {}'.format(
+            name, query_counts, SIZES))
+
+    def test_get_challenge_list(self):
+        self.measure('get_challenge_list', lambda data: (
+            'get', reverse_lazy('challenges:get_challenge_list',
+                                kwargs={'challenge_host_team_pk': data['host_team'].pk}), {}))
+
+    def test_get_challenge_detail(self):
+        self.measure('get_challenge_detail', lambda data: (
+            'get', reverse_lazy('challenges:get_challenge_detail',
+                                kwargs={'challenge_host_team_pk': data['host_team'].pk,
+                                        'challenge_pk': data['challenge'].pk}), {}))
+
+    def test_add_participant_team_to_challenge(self):
+        self.measure('add_participant_team_to_challenge', lambda data: (
+            'post', reverse_lazy('challenges:add_participant_team_to_challenge',
+                                 kwargs={'challenge_pk': data['last_challenge'].pk,
+                                         'participant_team_pk': data['new_participant_team'].pk}), {}),
+                     expected_status=status.HTTP_201_CREATED)
+
+    def test_disable_challenge(self):
+        self.measure('disable_challenge', lambda data: (
+            'post', reverse_lazy('challenges:disable_challenge',
+                                 kwargs={'challenge_pk': data['challenge'].pk}), {}),
+                     expected_status=status.HTTP_204_NO_CONTENT)
+
+    def test_get_challenge_phase_list(self):
+        self.measure('get_challenge_phase_list', lambda data: (
+            'get', reverse_lazy('challenges:get_challenge_phase_list',
+                                kwargs={'challenge_pk': data['challenge'].pk}), {}))
+
+    def test_get_challenge_phase_detail(self):
+        self.measure('get_challenge_phase_detail', lambda data: (
+            'get', reverse_lazy('challenges:get_challenge_phase_detail',
+                                kwargs={'challenge_pk': data['challenge'].pk,
+                                        'pk': data['challenge_phase'].pk}), {}))
+
+    def test_get_all_challenges(self):
+        self.measure('get_all_challenges', lambda data: (
+            'get', reverse_lazy('challenges:get_all_challenges', kwargs={'challenge_time': 'present'}), {}))
+
+    def test_get_challenge_by_pk(self):
+        self.measure('get_challenge_by_pk', lambda data: (
+            'get', reverse_lazy('challenges:get_challenge_by_pk', kwargs={'pk': data['challenge'].pk}), {}))
+
+    def test_get_challenges_based_on_teams(self):
+        self.measure('get_challenges_based_on_teams', lambda data: (
+            'get', reverse_lazy('challenges:get_challenges_based_on_teams'), {'mode': 'participant'}))
+
+    def test_challenge_phase_split_list(self):
+        self.measure('challenge_phase_split_list', lambda data: (
+            'get', reverse_lazy('challenges:challenge_phase_split_list',
+                                kwargs={'challenge_pk': data['challenge'].pk}), {}))
+
+    def test_get_challenge_statistics(self):
+        self.measure('get_challenge_statistics', lambda data: (
+            'get', reverse_lazy('analytics:get_challenge_statistics',
+                                kwargs={'challenge_pk': data['challenge'].pk}), {}))
+
+    def test_get_challenge_phase_statistics(self):
+        self.measure('get_challenge_phase_statistics', lambda data: (
+            'get', reverse_lazy('analytics:get_challenge_phase_statistics',
+                                kwargs={'challenge_pk': data['challenge'].pk,
+                                        'challenge_phase_pk': data['challenge_phase'].pk}), {}))
+
+    def test_get_daily_submission_counts(self):
+        self.measure('get_daily_submission_counts', lambda data: (
+            'get', reverse_lazy('analytics:get_daily_submission_counts',
+                                kwargs={'challenge_pk': data['challenge'].pk,
+                                        'challenge_phase_pk': data['challenge_phase'].pk}), {}))
+
+    def test_get_submission_activity(self):
+        self.measure('get_submission_activity', lambda data: (
+            'get', reverse_lazy('analytics:get_submission_activity',
+                                kwargs={'challenge_pk': data['challenge'].pk}), {}))
+
+    def test_challenge_submission(self):
+        self.measure('challenge_submission', lambda data: (
+            'get', reverse_lazy('jobs:challenge_submission',
+                                kwargs={'challenge_id': data['challenge'].pk,
+                                        'challenge_phase_id': data['challenge_phase'].pk}), {}))
+
+    def test_change_submission_visibility(self):
+        self.measure('change_submission_visibility', lambda data: (
+            'patch', reverse_lazy('jobs:change_submission_visibility',
+                                  kwargs={'challenge_id': data['challenge'].pk,
+                                          'challenge_phase_id': data['challenge_phase'].pk,
+                                          'submission_id': data['submission'].pk}), {'is_public': False}))
+
+    def test_get_challenge_phase_submissions(self):
+        self.measure('get_challenge_phase_submissions', lambda data: (
+            'get', reverse_lazy('jobs:get_challenge_phase_submissions',
+                                kwargs={'challenge_id': data['challenge'].pk,
+                                        'challenge_phase_id': data['challenge_phase'].pk}), {}))
+
+    def test_stream_challenge_phase_submissions(self):
+        self.measure('stream_challenge_phase_submissions', lambda data: (
+            'get', reverse_lazy('jobs:stream_challenge_phase_submissions',
+                                kwargs={'challenge_id': data['challenge'].pk,
+                                        'challenge_phase_id': data['challenge_phase'].pk}), {}))
+
+    def test_export_leaderboard(self):
+        self.measure('export_leaderboard', lambda data: (
+            'get', reverse_lazy('jobs:export_leaderboard',
+                                kwargs={'challenge_phase_split_id': data['challenge_phase_split'].pk}), {}))
+
+    def test_leaderboard(self):
+        self.measure('leaderboard', lambda data: (
+            'get', reverse_lazy('jobs:leaderboard',
+                                kwargs={'challenge_phase_split_id': data['challenge_phase_split'].pk}), {}))
+
+    def test_get_submission_metrics(self):
+        self.measure('get_submission_metrics', lambda data: (
+            'get', reverse_lazy('jobs:get_submission_metrics',
+                                kwargs={'submission_id': data['submission'].pk}), {}))
+
+    def test_get_participant_team_list(self):
+        self.measure('get_participant_team_list', lambda data: (
+            'get', reverse_lazy('participants:get_participant_team_list'), {}))
+
+    def test_get_participant_team_details(self):
+        self.measure('get_participant_team_details', lambda data: (
+            'get', reverse_lazy('participants:get_participant_team_details',
+                                kwargs={'pk': data['participant_team'].pk}), {}))
+
+    def test_invite_participant_to_team(self):
+        self.measure('invite_participant_to_team', lambda data: (
+            'post', reverse_lazy('participants:invite_participant_to_team',
+                                 kwargs={'pk': data['participant_team'].pk}), {'email': data['invitee'].email}),
+                     expected_status=status.HTTP_202_ACCEPTED)
+
+    def test_remove_self_from_participant_team(self):
+        self.measure('remove_self_from_participant_team', lambda data: (
+            'delete', reverse_lazy('participants:remove_self_from_participant_team',
+                                   kwargs={'participant_team_pk': data['own_participant_team'].pk}), {}),
+                     expected_status=status.HTTP_204_NO_CONTENT)
+
+    def test_delete_participant_from_team(self):
+        self.measure('delete_participant_from_team', lambda data: (
+            'delete', reverse_lazy('participants:delete_participant_from_team',
+                                   kwargs={'participant_team_pk': data['participant_team'].pk,
+                                           'participant_pk': data['member'].pk}), {}),
+                     expected_status=status.HTTP_204_NO_CONTENT)
+
+    def test_get_teams_and_corresponding_challenges_for_a_participant(self):
+        self.measure('get_teams_and_corresponding_challenges_for_a_participant', lambda data: (
+            'get', reverse_lazy('participants:get_teams_and_corresponding_challenges_for_a_participant'), {}))
+
+    def test_get_challenge_host_team_list(self):
+        self.measure('get_challenge_host_team_list', lambda data: (
+            'get', reverse_lazy('hosts:get_challenge_host_team_list'), {}))
+
+    def test_get_challenge_host_team_details(self):
+        self.measure('get_challenge_host_team_details', lambda data: (
+            'get', reverse_lazy('hosts:get_challenge_host_team_details', kwargs={'pk': data['host_team'].pk}), {}))
+
+    def test_create_challenge_host_team(self):
+        self.measure('create_challenge_host_team', lambda data: (
+            'post', reverse_lazy('hosts:create_challenge_host_team'),
+            {'team_name': '{} New Host Team'.format(data['user'].username)}),
+                     expected_status=status.HTTP_201_CREATED)
+
+    def test_remove_self_from_challenge_host_team(self):
+        self.measure('remove_self_from_challenge_host_team', lambda data: (
+            'delete', reverse_lazy('hosts:remove_self_from_challenge_host_team',
+                                   kwargs={'challenge_host_team_pk': data['host_team'].pk}), {}),
+                     expected_status=status.HTTP_204_NO_CONTENT)
+
+    def test_get_challenge_host_list(self):
+        self.measure('get_challenge_host_list', lambda data: (
+            'get', reverse_lazy('hosts:get_challenge_host_list',
+                                kwargs={'challenge_host_team_pk': data['host_team'].pk}), {}))
+
+    def test_get_challenge_host_details(self):
+        self.measure('get_challenge_host_details', lambda data: (
+            'get', reverse_lazy('hosts:get_challenge_host_details',
+                                kwargs={'challenge_host_team_pk': data['host_team'].pk,
+                                        'pk': data['host'].pk}), {}))
+
+    def test_invite_host_to_team(self):
+        self.measure('invite_host_to_team', lambda data: (
+            'post', reverse_lazy('hosts:invite_host_to_team',
+                                 kwargs={'pk': data['host_team'].pk}), {'email': data['invitee'].email}),
+                     expected_status=status.HTTP_202_ACCEPTED)
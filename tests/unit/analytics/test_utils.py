@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from analytics.utils import (estimate_median_evaluation_time,
+                             get_evaluation_time_bucket,
+                             get_evaluation_time_bucket_bounds,)
+
+
+class EvaluationTimeBucketTest(TestCase):
+
+    def test_evaluation_time_is_within_the_bounds_of_its_bucket(self):
+        for evaluation_time in [0, 0.005, 0.3, 1, 59.9, 3600]:
+            lower_bound, upper_bound = get_evaluation_time_bucket_bounds(get_evaluation_time_bucket(evaluation_time))
+            self.assertTrue(lower_bound <= evaluation_time <= upper_bound)
+
+    def test_estimate_median_evaluation_time(self):
+        evaluation_times = [1, 2, 3, 5, 8, 13, 21]
+        bucket_counts = {}
+        for evaluation_time in evaluation_times:
+            bucket = get_evaluation_time_bucket(evaluation_time)
+            bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
+        median = estimate_median_evaluation_time(bucket_counts.items())
+        self.assertTrue(5 / 1.25 <= median <= 5 * 1.25)
+
+    def test_estimate_median_evaluation_time_without_evaluations(self):
+        self.assertIsNone(estimate_median_evaluation_time([]))
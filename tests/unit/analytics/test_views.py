@@ -0,0 +1,347 @@
+import os
+import shutil
+
+from datetime import datetime, timedelta
+
+from django.core.management import call_command
+from django.core.urlresolvers import reverse_lazy
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.timezone import utc
+
+from allauth.account.models import EmailAddress
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from analytics.models import (ChallengePhaseStatistics,
+                              ChallengeStatistics,
+                              DailySubmissionCount,
+                              SubmissionActivity,)
+from challenges.models import Challenge, ChallengePhase
+from hosts.models import ChallengeHost, ChallengeHostTeam
+from jobs.models import Submission, SubmissionMetrics
+from participants.models import ParticipantTeam, Participant
+
+
+class BaseAPITestClass(APITestCase):
+
+    def setUp(self):
+        self.client = APIClient(enforce_csrf_checks=True)
+
+        self.user = User.objects.create(
+            username='someuser',
+            email="user@test.com",
+            password='secret_password')
+
+        EmailAddress.objects.create(
+            user=self.user,
+            email='user@test.com',
+            primary=True,
+            verified=True)
+
+        self.user1 = User.objects.create(
+            username='someuser1',
+            email="user1@test.com",
+            password='secret_password1')
+
+        EmailAddress.objects.create(
+            user=self.user1,
+            email='user1@test.com',
+            primary=True,
+            verified=True)
+
+        self.user2 = User.objects.create(
+            username='someuser2',
+            email="user2@test.com",
+            password='secret_password2')
+
+        self.challenge_host_team = ChallengeHostTeam.objects.create(
+            team_name='Test Challenge Host Team',
+            created_by=self.user)
+
+        self.challenge_host = ChallengeHost.objects.create(
+            user=self.user,
+            team_name=self.challenge_host_team,
+            status=ChallengeHost.ACCEPTED,
+            permissions=ChallengeHost.ADMIN)
+
+        self.participant_team = ParticipantTeam.objects.create(
+            team_name='Participant Team for Challenge',
+            created_by=self.user1)
+
+        self.participant = Participant.objects.create(
+            user=self.user1,
+            status=Participant.SELF,
+            team=self.participant_team)
+
+        self.participant_team2 = ParticipantTeam.objects.create(
+            team_name='Another Participant Team for Challenge',
+            created_by=self.user2)
+
+        self.participant2 = Participant.objects.create(
+            user=self.user2,
+            status=Participant.SELF,
+            team=self.participant_team2)
+
+        self.challenge = Challenge.objects.create(
+            title='Test Challenge',
+            description='Description for test challenge',
+            terms_and_conditions='Terms and conditions for test challenge',
+            submission_guidelines='Submission guidelines for test challenge',
+            creator=self.challenge_host_team,
+            start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() + timedelta(days=1),
+            published=False,
+            enable_forum=True,
+            anonymous_leaderboard=False)
+        self.challenge.participant_teams.add(self.participant_team, self.participant_team2)
+
+        try:
+            os.makedirs('/tmp/evalai')
+        except OSError:
+            pass
+
+        with self.settings(MEDIA_ROOT='/tmp/evalai'):
+            self.challenge_phase = ChallengePhase.objects.create(
+                name='Challenge Phase',
+                description='Description for Challenge Phase',
+                leaderboard_public=False,
+                is_public=True,
+                start_date=timezone.now() - timedelta(days=2),
+                end_date=timezone.now() + timedelta(days=1),
+                challenge=self.challenge,
+                test_annotation=SimpleUploadedFile('test_sample_file.txt',
+                                                   'Dummy file content', content_type='text/plain')
+            )
+
+            self.submissions = []
+            for index, participant_team in enumerate([self.participant_team] * 3 + [self.participant_team2]):
+                self.submissions.append(Submission.objects.create(
+                    participant_team=participant_team,
+                    challenge_phase=self.challenge_phase,
+                    created_by=participant_team.created_by,
+                    status='submitted',
+                    input_file=self.challenge_phase.test_annotation,
+                    method_name='Method {}'.format(index)))
+
+        # evaluated by a worker in 1, 2 and 4 seconds
+        for submission, submission_status, evaluation_time in zip(
+                self.submissions, ['finished', 'finished', 'failed'], [1, 2, 4]):
+            submission.status = submission_status
+            submission.save()
+            SubmissionMetrics.objects.create(
+                submission=submission,
+                wall_time=evaluation_time,
+                cpu_user_time=evaluation_time,
+                cpu_system_time=0,
+                peak_memory=1024)
+            ChallengePhaseStatistics.record_evaluation(submission, evaluation_time)
+
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        shutil.rmtree('/tmp/evalai')
+
+
+class ChallengeStatisticsTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(ChallengeStatisticsTest, self).setUp()
+        self.url = reverse_lazy('analytics:get_challenge_statistics',
+                                kwargs={'challenge_pk': self.challenge.pk})
+
+    def test_get_challenge_statistics(self):
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['participant_team_count'], 2)
+        self.assertEqual(response.data['participant_count'], 2)
+        self.assertEqual(len(response.data['challenge_phases']), 1)
+        phase_statistics = response.data['challenge_phases'][0]
+        self.assertEqual(phase_statistics['challenge_phase'], self.challenge_phase.pk)
+        self.assertEqual(phase_statistics['submission_count'], 4)
+        self.assertEqual(phase_statistics['active_team_count'], 2)
+
+    def test_challenge_statistics_follow_participant_teams_and_participants(self):
+        self.challenge.participant_teams.remove(self.participant_team2)
+        Participant.objects.create(user=self.user, status=Participant.ACCEPTED, team=self.participant_team)
+        self.participant_team2.challenge_set.add(self.challenge)
+        self.participant.delete()
+
+        statistics = ChallengeStatistics.objects.get(challenge=self.challenge)
+        self.assertEqual(statistics.participant_team_count, 2)
+        self.assertEqual(statistics.participant_count, 2)
+
+    def test_get_challenge_statistics_without_participation(self):
+        ChallengeStatistics.objects.all().delete()
+        ChallengePhaseStatistics.objects.all().delete()
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['participant_team_count'], 0)
+        self.assertEqual(response.data['challenge_phases'][0]['submission_count'], 0)
+        self.assertIsNone(response.data['challenge_phases'][0]['success_ratio'])
+
+    def test_get_challenge_statistics_when_user_is_not_a_host(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, {
+            'error': 'Sorry, you are not allowed to view the statistics of this challenge!'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_get_challenge_statistics_when_challenge_does_not_exist(self):
+        self.url = reverse_lazy('analytics:get_challenge_statistics',
+                                kwargs={'challenge_pk': self.challenge.pk + 1})
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, {'error': 'Challenge does not exist'})
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class ChallengePhaseStatisticsTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(ChallengePhaseStatisticsTest, self).setUp()
+        self.url = reverse_lazy('analytics:get_challenge_phase_statistics',
+                                kwargs={'challenge_pk': self.challenge.pk,
+                                        'challenge_phase_pk': self.challenge_phase.pk})
+
+    def test_get_challenge_phase_statistics(self):
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['submission_count'], 4)
+        self.assertEqual(response.data['finished_submission_count'], 2)
+        self.assertEqual(response.data['failed_submission_count'], 1)
+        self.assertEqual(response.data['active_team_count'], 2)
+        self.assertEqual(response.data['evaluation_count'], 3)
+        self.assertAlmostEqual(response.data['success_ratio'], 2 / 3.0)
+        self.assertAlmostEqual(response.data['failure_ratio'], 1 / 3.0)
+        self.assertAlmostEqual(response.data['mean_evaluation_time'], 7 / 3.0)
+        # estimated from the evaluation time buckets, which are 25% wide
+        self.assertTrue(1.6 <= response.data['median_evaluation_time'] <= 2.5)
+
+    def test_challenge_phase_statistics_are_not_counted_at_read_time(self):
+        with self.assertNumQueries(4):
+            # email verification, phase with its statistics, host check and evaluation time buckets
+            response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rebuild_analytics(self):
+        statistics = self.client.get(self.url, {}).data
+        daily_submission_counts = list(DailySubmissionCount.objects.values_list('date', 'submission_count'))
+        call_command('rebuild_analytics', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.client.get(self.url, {}).data, statistics)
+        self.assertEqual(list(DailySubmissionCount.objects.values_list('date', 'submission_count')),
+                         daily_submission_counts)
+        self.assertEqual(ChallengeStatistics.objects.get(challenge=self.challenge).participant_count, 2)
+
+    def test_get_challenge_phase_statistics_when_challenge_phase_does_not_exist(self):
+        self.url = reverse_lazy('analytics:get_challenge_phase_statistics',
+                                kwargs={'challenge_pk': self.challenge.pk,
+                                        'challenge_phase_pk': self.challenge_phase.pk + 1})
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, {'error': 'Challenge Phase does not exist'})
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class DailySubmissionCountsTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(DailySubmissionCountsTest, self).setUp()
+        self.url = reverse_lazy('analytics:get_daily_submission_counts',
+                                kwargs={'challenge_pk': self.challenge.pk,
+                                        'challenge_phase_pk': self.challenge_phase.pk})
+        DailySubmissionCount.objects.create(challenge_phase=self.challenge_phase,
+                                            date=timezone.localtime(timezone.now()).date() - timedelta(days=40),
+                                            submission_count=7)
+
+    def test_get_daily_submission_counts(self):
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([count['submission_count'] for count in response.data], [4])
+
+        response = self.client.get(self.url, {'days': 41})
+        self.assertEqual([count['submission_count'] for count in response.data], [7, 4])
+
+    def test_get_daily_submission_counts_with_invalid_days(self):
+        response = self.client.get(self.url, {'days': 'week'})
+        self.assertEqual(response.data, {'error': 'Invalid value of the query parameter days'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SubmissionActivityTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(SubmissionActivityTest, self).setUp()
+        self.url = reverse_lazy('analytics:get_submission_activity',
+                                kwargs={'challenge_pk': self.challenge.pk})
+
+    def add_minutes(self, period_start, count):
+        for minute in range(count):
+            SubmissionActivity.add(self.challenge.pk, self.challenge_phase.pk, SubmissionActivity.MINUTE,
+                                   period_start + timedelta(minutes=minute),
+                                   {'evaluation_time_sketch': {'10': 1}}, submission_count=2, evaluation_count=1,
+                                   total_evaluation_time=1)
+
+    def test_get_submission_activity(self):
+        for submission in self.submissions[:3]:
+            submission.started_at = submission.submitted_at + timedelta(seconds=30)
+            SubmissionActivity.record_evaluation(submission, 4)
+
+        response = self.client.get(self.url, {'resolution': 'minute'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the submissions may have been made across the end of a minute
+        self.assertEqual(sum(activity['submission_count'] for activity in response.data), 4)
+        self.assertEqual(sum(activity['evaluation_count'] for activity in response.data), 3)
+        self.assertEqual(sum(activity['failed_submission_count'] for activity in response.data), 1)
+
+        response = self.client.get(self.url, {'resolution': 'day', 'challenge_phase': self.challenge_phase.pk})
+        self.assertEqual(len(response.data), 1)
+        activity = response.data[0]
+        self.assertEqual(activity['challenge_phase'], self.challenge_phase.pk)
+        self.assertEqual(activity['submission_count'], 4)
+        self.assertAlmostEqual(activity['mean_queue_wait_time'], 30)
+        self.assertTrue(30 / 1.25 <= activity['p95_queue_wait_time'] <= 30 * 1.25)
+        self.assertAlmostEqual(activity['mean_evaluation_time'], 4)
+        self.assertTrue(4 / 1.25 <= activity['median_evaluation_time'] <= 4 * 1.25)
+
+    def test_get_submission_activity_of_a_time_range(self):
+        period_start = datetime(2026, 3, 1, 11, 58, tzinfo=utc)
+        self.add_minutes(period_start, 4)
+
+        response = self.client.get(self.url, {'resolution': 'hour', 'start': '2026-03-01T11:30:00Z',
+                                              'end': '2026-03-01T13:00:00Z'})
+        self.assertEqual([(activity['period_start'], activity['submission_count']) for activity in response.data],
+                         [('2026-03-01T11:00:00Z', 4), ('2026-03-01T12:00:00Z', 4)])
+
+        response = self.client.get(self.url, {'resolution': 'minute', 'start': '2026-03-01T11:59:00Z',
+                                              'end': '2026-03-01T12:01:00Z'})
+        self.assertEqual([activity['period_start'] for activity in response.data],
+                         ['2026-03-01T11:59:00Z', '2026-03-01T12:00:00Z'])
+
+    def test_rollup_submission_activity(self):
+        now = timezone.now()
+        self.add_minutes(now.replace(minute=58, second=0, microsecond=0) - timedelta(days=3), 4)
+        self.add_minutes(now - timedelta(days=90), 1)
+        self.add_minutes(now - timedelta(days=1000), 1)
+        call_command('rollup_submission_activity', stdout=open(os.devnull, 'w'))
+        call_command('rollup_submission_activity', stdout=open(os.devnull, 'w'))
+
+        # the submissions of the test remain in minutes
+        activities = SubmissionActivity.objects.exclude(period_start__gte=now - timedelta(days=2))
+        self.assertEqual(sorted(activities.values_list('resolution', 'submission_count', 'evaluation_time_sketch')),
+                         [('day', 2, {'10': 1}), ('hour', 4, {'10': 2}), ('hour', 4, {'10': 2})])
+
+    def test_get_submission_activity_with_invalid_parameters(self):
+        for params, parameter in [({'resolution': 'week'}, 'resolution'),
+                                  ({'end': 'tomorrow'}, 'end'),
+                                  ({'start': '2026-03-02T00:00:00Z', 'end': '2026-03-01T00:00:00Z'}, 'start'),
+                                  ({'challenge_phase': 'first'}, 'challenge_phase')]:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.data, {'error': 'Invalid value of the query parameter {}'.format(parameter)})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_submission_activity_of_a_too_long_time_range(self):
+        response = self.client.get(self.url, {'resolution': 'minute', 'start': '2026-03-01T00:00:00Z',
+                                              'end': '2026-03-03T00:00:00Z'})
+        self.assertEqual(response.data, {
+            'error': 'At most 1440 periods of a minute can be requested, use a coarser resolution'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
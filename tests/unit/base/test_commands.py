@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from challenges.models import Challenge, ChallengePhaseSplit, LeaderboardData
+from jobs.models import Submission
+from participants.models import Participant, ParticipantTeam
+
+
+class BulkSeedTest(TestCase):
+
+    def bulk_seed(self, seed):
+        call_command('bulk_seed', challenges=3, teams=20, seed=seed, batch_size=7)
+        return list(LeaderboardData.objects.order_by('id').values_list('result', flat=True))
+
+    def test_bulk_seed(self):
+        self.bulk_seed(seed=1)
+        self.assertEqual(Challenge.objects.count(), 3)
+        self.assertEqual(ChallengePhaseSplit.objects.count(), 3 * 2 * 2)
+        self.assertEqual(ParticipantTeam.objects.count(), 20)
+        self.assertEqual(Participant.objects.values('user').distinct().count(), Participant.objects.count())
+        for submission in Submission.objects.filter(status=Submission.FINISHED):
+            self.assertTrue(submission.participant_team.challenge_set.filter(
+                pk=submission.challenge_phase.challenge_id).exists())
+            self.assertEqual(LeaderboardData.objects.filter(submission=submission).count(), 2)
+        self.assertFalse(LeaderboardData.objects.exclude(submission__status=Submission.FINISHED).exists())
+
+    def test_bulk_seed_is_reproducible(self):
+        results = self.bulk_seed(seed=7)
+        User.objects.all().delete()
+        self.assertEqual(self.bulk_seed(seed=7), results)
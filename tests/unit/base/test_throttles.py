@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from rest_framework.test import APIRequestFactory
+
+from base.throttles import SubmissionRateThrottle, UserRateThrottle
+
+
+class ThreePerMinuteThrottle(UserRateThrottle):
+    rate = '3/minute'
+
+    # the clock of the throttles, in seconds
+    now = 600
+
+    def timer(self):
+        return self.now
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SlidingWindowRateThrottleTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='someuser', email='user@test.com', password='secret_password')
+        self.request = APIRequestFactory().post('/')
+        self.request.user = self.user
+
+    def tearDown(self):
+        ThreePerMinuteThrottle.now = 600
+
+    def allow_requests(self, count, throttle_class=ThreePerMinuteThrottle):
+        return [throttle_class().allow_request(self.request, None) for _ in range(count)]
+
+    def test_requests_are_throttled_above_the_rate(self):
+        self.assertEqual(self.allow_requests(4), [True, True, True, False])
+        throttle = ThreePerMinuteThrottle()
+        self.assertFalse(throttle.allow_request(self.request, None))
+        self.assertEqual(throttle.wait(), 60 + 60 * (1 - 2.0 / 3))
+
+    def test_previous_window_is_weighted_by_its_overlap(self):
+        self.allow_requests(3)
+        # the last third of the previous window is in the sliding window, so one of its requests counts
+        ThreePerMinuteThrottle.now = 700
+        self.assertEqual(self.allow_requests(3), [True, True, False])
+
+    def test_throttled_requests_do_not_use_up_the_rate(self):
+        self.assertEqual(self.allow_requests(10), [True] * 3 + [False] * 7)
+        ThreePerMinuteThrottle.now = 720
+        self.assertEqual(self.allow_requests(4), [True, True, True, False])
+
+    def test_users_are_throttled_separately(self):
+        self.allow_requests(3)
+        self.request.user = User.objects.create(username='otheruser', email='other@platform.com',
+                                                password='other_secret_password')
+        self.assertEqual(self.allow_requests(3), [True, True, True])
+
+    def test_submission_throttle_ignores_other_methods(self):
+        SubmissionRateThrottle.rate = '1/minute'
+        try:
+            self.assertEqual(self.allow_requests(2, SubmissionRateThrottle), [True, False])
+            self.request = APIRequestFactory().get('/')
+            self.request.user = self.user
+            self.assertEqual(self.allow_requests(2, SubmissionRateThrottle), [True, True])
+        finally:
+            del SubmissionRateThrottle.rate
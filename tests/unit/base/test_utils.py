@@ -0,0 +1,51 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from rest_framework import serializers
+
+from base.utils import RandomFileName, iterate_queryset_in_chunks, streaming_json_response
+
+
+class UserSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = User
+        fields = ('id', 'username')
+
+
+class StreamingTest(TestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create(username='user{}'.format(index)) for index in range(5)]
+
+    def test_iterate_queryset_in_chunks(self):
+        chunks = list(iterate_queryset_in_chunks(User.objects.order_by('-username'), chunk_size=2))
+        self.assertEqual(chunks, [self.users[:2], self.users[2:4], self.users[4:]])
+
+    def test_streaming_json_response(self):
+        response = streaming_json_response(User.objects.all(), UserSerializer, chunk_size=2)
+        self.assertEqual(json.loads(''.join(response.streaming_content)), {
+            'results': [{'id': user.pk, 'username': user.username} for user in self.users],
+        })
+
+    def test_streaming_json_response_when_queryset_is_empty(self):
+        response = streaming_json_response(User.objects.none(), UserSerializer)
+        self.assertEqual(json.loads(''.join(response.streaming_content)), {'results': []})
+
+
+class RandomFileNameTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+
+    def test_random_file_name_keeps_extension(self):
+        file_name = RandomFileName('submission_files/submission_{id}')(self.user, 'stdout.txt')
+        self.assertTrue(file_name.startswith('submission_files/submission_{}/'.format(self.user.pk)))
+        self.assertTrue(file_name.endswith('.txt'))
+        self.assertNotIn('stdout', file_name)
+
+    def test_random_file_name_keeps_extension_of_compressed_content(self):
+        file_name = RandomFileName('submission_files/submission_{id}')(self.user, 'stdout.txt.gz')
+        self.assertTrue(file_name.endswith('.txt.gz'))
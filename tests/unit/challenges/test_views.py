@@ -1033,6 +1033,7 @@ class GetChallengePhaseTest(BaseChallengePhaseClass):
                 "codename": "Phase Code Name",
                 "max_submissions_per_day": self.challenge_phase.max_submissions_per_day,
                 "max_submissions": self.challenge_phase.max_submissions,
+                "priority": self.challenge_phase.priority,
             }
         ]
 
@@ -1055,6 +1056,7 @@ class GetChallengePhaseTest(BaseChallengePhaseClass):
                 "codename": "Phase Code Name",
                 "max_submissions_per_day": self.challenge_phase.max_submissions_per_day,
                 "max_submissions": self.challenge_phase.max_submissions,
+                "priority": self.challenge_phase.priority,
             }
         ]
         self.client.force_authenticate(user=None)
@@ -1190,6 +1192,7 @@ class GetParticularChallengePhase(BaseChallengePhaseClass):
             "codename": "Phase Code Name",
             "max_submissions_per_day": self.challenge_phase.max_submissions_per_day,
             "max_submissions": self.challenge_phase.max_submissions,
+            "priority": self.challenge_phase.priority,
         }
         response = self.client.get(self.url, {})
         self.assertEqual(response.data, expected)
@@ -1262,11 +1265,19 @@ class UpdateParticularChallengePhase(BaseChallengePhaseClass):
             "codename": "Phase Code Name",
             "max_submissions_per_day": self.challenge_phase.max_submissions_per_day,
             "max_submissions": self.challenge_phase.max_submissions,
+            "priority": self.challenge_phase.priority,
         }
         response = self.client.patch(self.url, self.partial_update_data)
         self.assertEqual(response.data, expected)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_particular_challenge_phase_partial_update_does_not_change_priority(self):
+        response = self.client.patch(self.url, {'priority': self.challenge_phase.priority + 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['priority'], self.challenge_phase.priority)
+        self.assertEqual(ChallengePhase.objects.get(pk=self.challenge_phase.pk).priority,
+                         self.challenge_phase.priority)
+
     @override_settings(MEDIA_ROOT='/tmp/evalai')
     def test_particular_challenge_phase_update(self):
 
@@ -0,0 +1,238 @@
+import os
+import shutil
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from challenges.models import (Challenge,
+                               ChallengePhase,
+                               ChallengePhaseSplit,
+                               DatasetSplit,
+                               Leaderboard,
+                               LeaderboardData,)
+from hosts.models import ChallengeHostTeam
+from jobs.models import Submission
+from jobs.utils import (get_stuck_submissions,
+                        get_submission_queue_arguments,
+                        release_submission_queue,
+                        retry_submission,)
+from participants.models import ParticipantTeam
+
+
+@override_settings(MEDIA_ROOT='/tmp/evalai', SUBMISSION_REAPER={
+    'RUNNING_SLACK': 60,
+    'RETRY_BACKOFF': 600,
+    'MAX_RETRIES': 2,
+})
+class StuckSubmissionTest(TestCase):
+
+    def setUp(self):
+        try:
+            os.makedirs('/tmp/evalai')
+        except OSError:
+            pass
+
+        self.user = User.objects.create(username='someuser', email='user@test.com', password='secret_password')
+        self.challenge = Challenge.objects.create(
+            title='Test Challenge',
+            creator=ChallengeHostTeam.objects.create(team_name='Test Challenge Host Team', created_by=self.user),
+            start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() + timedelta(days=1))
+        self.challenge_phase = ChallengePhase.objects.create(
+            name='Challenge Phase',
+            start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() + timedelta(days=1),
+            challenge=self.challenge,
+            test_annotation=SimpleUploadedFile('test_sample_file.txt', 'Dummy file content',
+                                               content_type='text/plain'))
+        self.challenge_phase_split = ChallengePhaseSplit.objects.create(
+            challenge_phase=self.challenge_phase,
+            dataset_split=DatasetSplit.objects.create(name='Test Dataset Split', codename='test-split'),
+            leaderboard=Leaderboard.objects.create(schema={'labels': ['score']}),
+            visibility=ChallengePhaseSplit.PUBLIC)
+        self.participant_team = ParticipantTeam.objects.create(team_name='Participant Team', created_by=self.user)
+        self.now = timezone.now()
+
+    def tearDown(self):
+        shutil.rmtree('/tmp/evalai')
+
+    def create_submission(self, status, age, retry_count=0, execution_time_limit=300, infrastructure_failed=False):
+        submission = Submission.objects.create(
+            participant_team=self.participant_team,
+            challenge_phase=self.challenge_phase,
+            created_by=self.user,
+            input_file=SimpleUploadedFile('user_annotation.txt', 'file_content', content_type='text/plain'),
+            execution_time_limit=execution_time_limit)
+        Submission.objects.filter(pk=submission.pk).update(
+            status=status, retry_count=retry_count, submitted_at=self.now - age, started_at=self.now - age,
+            infrastructure_failed_at=self.now - age if infrastructure_failed else None)
+        return Submission.objects.get(pk=submission.pk)
+
+    def test_get_stuck_submissions(self):
+        stuck_submissions = [
+            # running beyond its execution time limit and the slack
+            self.create_submission(Submission.RUNNING, timedelta(seconds=400)),
+            # failed because of the infrastructure before the backoff of its retry
+            self.create_submission(Submission.SUBMITTED, timedelta(seconds=601), infrastructure_failed=True),
+            self.create_submission(Submission.SUBMITTED, timedelta(seconds=1201), retry_count=1,
+                                   infrastructure_failed=True),
+            # never started within the backoff of its retry, e.g. its message was lost
+            self.create_submission(Submission.SUBMITTED, timedelta(seconds=601)),
+            self.create_submission(Submission.SUBMITTED, timedelta(seconds=1201), retry_count=1),
+            # never started within the backoff of the last retry after `MAX_RETRIES` retries
+            self.create_submission(Submission.SUBMITTED, timedelta(seconds=2401), retry_count=2),
+        ]
+        # running within its execution time limit and the slack
+        self.create_submission(Submission.RUNNING, timedelta(seconds=300))
+        self.create_submission(Submission.RUNNING, timedelta(seconds=400), execution_time_limit=1000)
+        # failed because of the infrastructure within the backoff of its retry
+        self.create_submission(Submission.SUBMITTED, timedelta(seconds=599), infrastructure_failed=True)
+        self.create_submission(Submission.SUBMITTED, timedelta(seconds=1199), retry_count=1,
+                               infrastructure_failed=True)
+        # waiting for a worker within the backoff of its retry
+        self.create_submission(Submission.SUBMITTED, timedelta(seconds=599))
+        self.create_submission(Submission.SUBMITTED, timedelta(seconds=1199), retry_count=1)
+        self.create_submission(Submission.SUBMITTED, timedelta(seconds=2399), retry_count=2)
+        self.create_submission(Submission.FINISHED, timedelta(days=1))
+        self.create_submission(Submission.FAILED, timedelta(days=1))
+
+        self.assertEqual(sorted(submission.pk for submission in get_stuck_submissions(self.now)),
+                         sorted(submission.pk for submission in stuck_submissions))
+
+    def test_retry_submission(self):
+        submission = self.create_submission(Submission.RUNNING, timedelta(seconds=400))
+        LeaderboardData.objects.create(challenge_phase_split=self.challenge_phase_split, submission=submission,
+                                       leaderboard=self.challenge_phase_split.leaderboard, result={'score': 1})
+
+        self.assertTrue(retry_submission(submission, self.now))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.SUBMITTED)
+        self.assertEqual(submission.retry_count, 1)
+        self.assertEqual(submission.retried_at, self.now)
+        self.assertFalse(LeaderboardData.objects.filter(submission=submission).exists())
+        # waits twice as long for a worker to start it before it is retried again
+        self.assertNotIn(submission, get_stuck_submissions(self.now + timedelta(seconds=1199)))
+        self.assertIn(submission, get_stuck_submissions(self.now + timedelta(seconds=1201)))
+        # and as long after a failure of the infrastructure
+        Submission.objects.filter(pk=submission.pk).update(infrastructure_failed_at=self.now + timedelta(days=1))
+        self.assertNotIn(submission, get_stuck_submissions(self.now + timedelta(days=1, seconds=1199)))
+        self.assertIn(submission, get_stuck_submissions(self.now + timedelta(days=1, seconds=1201)))
+
+    def test_retry_submission_clears_its_infrastructure_failure(self):
+        submission = self.create_submission(Submission.SUBMITTED, timedelta(seconds=601), infrastructure_failed=True)
+
+        self.assertTrue(retry_submission(submission, self.now))
+        submission.refresh_from_db()
+        self.assertEqual(submission.retry_count, 1)
+        self.assertIsNone(submission.infrastructure_failed_at)
+
+    def test_retry_submission_updated_by_a_worker_meanwhile(self):
+        submission = self.create_submission(Submission.RUNNING, timedelta(seconds=400))
+        Submission.objects.filter(pk=submission.pk).update(status=Submission.FINISHED)
+
+        self.assertFalse(retry_submission(submission, self.now))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.FINISHED)
+        self.assertEqual(submission.retry_count, 0)
+
+    def test_retry_submission_fails_it_after_max_retries(self):
+        submission = self.create_submission(Submission.SUBMITTED, timedelta(days=1), retry_count=2,
+                                            infrastructure_failed=True)
+
+        self.assertFalse(retry_submission(submission, self.now))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.FAILED)
+        self.assertEqual(submission.retry_count, 2)
+
+    def test_retry_submission_never_fails_a_submission_no_worker_started(self):
+        submission = self.create_submission(Submission.SUBMITTED, timedelta(days=1), retry_count=2)
+
+        self.assertTrue(retry_submission(submission, self.now))
+        submission.refresh_from_db()
+        self.assertEqual(submission.status, Submission.SUBMITTED)
+        self.assertEqual(submission.retry_count, 2)
+        self.assertEqual(submission.retried_at, self.now)
+        # requeued again with the backoff of its last retry
+        self.assertNotIn(submission, get_stuck_submissions(self.now + timedelta(seconds=2399)))
+        self.assertIn(submission, get_stuck_submissions(self.now + timedelta(seconds=2401)))
+
+
+class SubmissionQueueArgumentsTest(TestCase):
+
+    @override_settings(RABBITMQ_PARAMETERS={
+        'SHARED_EXCHANGE': {'NAME': 'evalai_submissions_shared', 'TYPE': 'topic'},
+        'PHASE_QUEUE_MESSAGE_TTL': None,
+    })
+    def test_get_submission_queue_arguments(self):
+        self.assertEqual(get_submission_queue_arguments(), {
+            'x-dead-letter-exchange': 'evalai_submissions_shared',
+        })
+
+    @override_settings(RABBITMQ_PARAMETERS={
+        'SHARED_EXCHANGE': {'NAME': 'evalai_submissions_shared', 'TYPE': 'topic'},
+        'PHASE_QUEUE_MESSAGE_TTL': 86400,
+    })
+    def test_get_submission_queue_arguments_with_message_ttl(self):
+        self.assertEqual(get_submission_queue_arguments(), {
+            'x-message-ttl': 86400000,
+            'x-dead-letter-exchange': 'evalai_submissions_shared',
+        })
+
+
+class Method(object):
+
+    def __init__(self, delivery_tag):
+        self.delivery_tag = delivery_tag
+
+
+class QueueChannel(object):
+    '''
+        Stand-in of a pika channel holding the messages of a single queue
+    '''
+
+    def __init__(self, queue, bodies):
+        self.queue = queue
+        self.bodies = list(bodies)
+        self.calls = []
+
+    def queue_unbind(self, queue, exchange, routing_key):
+        self.calls.append(('unbind', queue, exchange, routing_key))
+
+    def basic_get(self, queue):
+        if not self.bodies:
+            return None, None, None
+        return Method(len(self.calls)), 'properties', self.bodies.pop(0)
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.calls.append(('publish', exchange, routing_key, body, properties))
+
+    def basic_ack(self, delivery_tag):
+        self.calls.append(('ack', delivery_tag))
+
+    def queue_delete(self, queue, if_empty):
+        self.calls.append(('delete', queue, if_empty))
+
+
+@override_settings(RABBITMQ_PARAMETERS={
+    'EVALAI_EXCHANGE': {'NAME': 'evalai_submissions', 'TYPE': 'topic'},
+    'SHARED_EXCHANGE': {'NAME': 'evalai_submissions_shared', 'TYPE': 'topic'},
+    'SUBMISSION_QUEUE': 'submission_task_queue',
+})
+class ReleaseSubmissionQueueTest(TestCase):
+
+    def test_release_submission_queue(self):
+        channel = QueueChannel('submission_task_queue.challenge_1.phase_2', ['first', 'second'])
+
+        self.assertEqual(release_submission_queue(channel, 1, 2), 2)
+        self.assertEqual(channel.calls, [
+            ('unbind', 'submission_task_queue.challenge_1.phase_2', 'evalai_submissions', 'submission.1.2'),
+            ('publish', 'evalai_submissions_shared', 'submission.1.2', 'first', 'properties'),
+            ('ack', 1),
+            ('publish', 'evalai_submissions_shared', 'submission.1.2', 'second', 'properties'),
+            ('ack', 3),
+            ('delete', 'submission_task_queue.challenge_1.phase_2', True),
+        ])
@@ -1,8 +1,11 @@
+import json
 import os
 import shutil
 
 from datetime import timedelta
+from StringIO import StringIO
 
+from django.core.management import call_command
 from django.core.urlresolvers import reverse_lazy
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth.models import User
@@ -12,9 +15,14 @@ from allauth.account.models import EmailAddress
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 
-from challenges.models import Challenge, ChallengePhase
-from hosts.models import ChallengeHostTeam
-from jobs.models import Submission
+from challenges.models import (Challenge,
+                               ChallengePhase,
+                               ChallengePhaseSplit,
+                               DatasetSplit,
+                               Leaderboard,
+                               LeaderboardData,)
+from hosts.models import ChallengeHost, ChallengeHostTeam
+from jobs.models import Submission, SubmissionMetrics
 from participants.models import ParticipantTeam, Participant
 
 
@@ -371,3 +379,313 @@ class GetChallengeSubmissionTest(BaseAPITestClass):
         response = self.client.get(self.url, {})
         self.assertEqual(response.data['results'], expected)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class GetSubmissionMetricsTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(GetSubmissionMetricsTest, self).setUp()
+
+        self.challenge_host = ChallengeHost.objects.create(
+            user=self.user,
+            team_name=self.challenge_host_team,
+            status=ChallengeHost.ACCEPTED,
+            permissions=ChallengeHost.ADMIN)
+
+        self.submission = Submission.objects.create(
+            participant_team=self.participant_team,
+            challenge_phase=self.challenge_phase,
+            created_by=self.user1,
+            status='finished',
+            input_file=self.challenge_phase.test_annotation,
+            method_name="Test Method",
+            method_description="Test Description",
+            project_url="http://testserver/",
+            publication_url="http://testserver/",
+            is_public=True,
+        )
+
+        self.submission_metrics = SubmissionMetrics.objects.create(
+            submission=self.submission,
+            queue_wait_time=1.5,
+            wall_time=10.25,
+            cpu_user_time=8.0,
+            cpu_system_time=0.5,
+            peak_memory=204800,
+            bytes_downloaded=2048,
+            db_queries=12,
+            db_time=0.125)
+
+        self.url = reverse_lazy('jobs:get_submission_metrics',
+                                kwargs={'submission_id': self.submission.pk})
+
+    def test_get_submission_metrics(self):
+        self.client.force_authenticate(user=self.user)
+        expected = {
+            'submission': self.submission.pk,
+            'queue_wait_time': 1.5,
+            'wall_time': 10.25,
+            'cpu_user_time': 8.0,
+            'cpu_system_time': 0.5,
+            'peak_memory': 204800,
+            'bytes_downloaded': 2048,
+            'db_queries': 12,
+            'db_time': 0.125,
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_get_submission_metrics_when_user_is_not_a_host(self):
+        expected = {
+            'error': 'Sorry, you are not allowed to view the metrics of this submission!'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_get_submission_metrics_when_submission_does_not_exist(self):
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse_lazy('jobs:get_submission_metrics',
+                                kwargs={'submission_id': self.submission.pk + 1})
+        expected = {
+            'error': 'Submission does not exist'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_submission_metrics_when_submission_is_not_evaluated(self):
+        self.client.force_authenticate(user=self.user)
+        self.submission_metrics.delete()
+        expected = {
+            'error': 'Submission has not been evaluated yet'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_406_NOT_ACCEPTABLE)
+
+
+class ExportLeaderboardTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(ExportLeaderboardTest, self).setUp()
+
+        self.challenge_host = ChallengeHost.objects.create(
+            user=self.user,
+            team_name=self.challenge_host_team,
+            status=ChallengeHost.ACCEPTED,
+            permissions=ChallengeHost.ADMIN)
+
+        self.leaderboard = Leaderboard.objects.create(schema={'labels': ['Score', 'Time'], 'default_order_by': 'score'})
+
+        self.challenge_phase_split = ChallengePhaseSplit.objects.create(
+            challenge_phase=self.challenge_phase,
+            dataset_split=DatasetSplit.objects.create(name='Split 1', codename='split1'),
+            leaderboard=self.leaderboard,
+            visibility=ChallengePhaseSplit.PUBLIC)
+
+        self.submissions = []
+        for index, is_public in enumerate([True, False]):
+            submission = Submission.objects.create(
+                participant_team=self.participant_team,
+                challenge_phase=self.challenge_phase,
+                created_by=self.user1,
+                status='finished',
+                input_file=self.challenge_phase.test_annotation,
+                method_name='Method {}'.format(index))
+            # the status and the visibility of a new submission are set when it is created
+            submission.status = 'finished'
+            submission.is_public = is_public
+            submission.save()
+            LeaderboardData.objects.create(
+                challenge_phase_split=self.challenge_phase_split,
+                submission=submission,
+                leaderboard=self.leaderboard,
+                result={'score': 50 + index, 'time': 1.5})
+            self.submissions.append(submission)
+
+        SubmissionMetrics.objects.create(
+            submission=self.submissions[0],
+            wall_time=10.25,
+            cpu_user_time=8.0,
+            cpu_system_time=0.5,
+            peak_memory=204800)
+
+        self.url = reverse_lazy('jobs:export_leaderboard',
+                                kwargs={'challenge_phase_split_id': self.challenge_phase_split.pk})
+
+    def get_expected_rows(self):
+        rows = [['submission_id', 'participant_team_id', 'participant_team', 'submitted_by', 'status', 'is_public',
+                 'method_name', 'submitted_at', 'completed_at', 'wall_time', 'peak_memory', 'Score', 'Time']]
+        for index, submission in enumerate(self.submissions):
+            rows.append([str(submission.pk), str(self.participant_team.pk), self.participant_team.team_name,
+                         self.user1.username, 'finished', str(submission.is_public), 'Method {}'.format(index),
+                         submission.submitted_at.isoformat(), submission.completed_at.isoformat(),
+                         '10.25' if index == 0 else '', '204800' if index == 0 else '', str(50 + index), '1.5'])
+        return rows
+
+    def test_export_leaderboard(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = [line.split(',') for line in ''.join(response.streaming_content).splitlines()]
+        self.assertEqual(rows, self.get_expected_rows())
+
+    def test_export_leaderboard_when_user_is_not_a_host(self):
+        expected = {
+            'error': 'Sorry, you are not allowed to export this leaderboard!'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_leaderboard_when_challenge_phase_split_does_not_exist(self):
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse_lazy('jobs:export_leaderboard',
+                                kwargs={'challenge_phase_split_id': self.challenge_phase_split.pk + 1})
+        expected = {
+            'error': 'Challenge Phase Split does not exist'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_leaderboard_command(self):
+        output = StringIO()
+        call_command('export_leaderboard', self.challenge_phase_split.pk, stdout=output)
+        self.assertEqual([line.split(',') for line in output.getvalue().splitlines()], self.get_expected_rows())
+
+
+class StreamChallengePhaseSubmissionsTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(StreamChallengePhaseSubmissionsTest, self).setUp()
+
+        self.challenge_host = ChallengeHost.objects.create(
+            user=self.user,
+            team_name=self.challenge_host_team,
+            status=ChallengeHost.ACCEPTED,
+            permissions=ChallengeHost.ADMIN)
+
+        self.submissions = [Submission.objects.create(
+            participant_team=self.participant_team,
+            challenge_phase=self.challenge_phase,
+            created_by=self.user1,
+            status='submitted',
+            input_file=self.challenge_phase.test_annotation,
+            method_name='Method {}'.format(index)) for index in range(3)]
+
+        self.url = reverse_lazy('jobs:stream_challenge_phase_submissions',
+                                kwargs={'challenge_id': self.challenge.pk,
+                                        'challenge_phase_id': self.challenge_phase.pk})
+
+    def test_stream_challenge_phase_submissions(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        results = json.loads(''.join(response.streaming_content))['results']
+        self.assertEqual([(result['id'], result['participant_team_name'], result['method_name'])
+                          for result in results],
+                         [(submission.pk, self.participant_team.team_name, submission.method_name)
+                          for submission in self.submissions])
+
+    def test_stream_challenge_phase_submissions_when_user_is_not_a_host(self):
+        expected = {
+            'error': 'Sorry, you are not allowed to view the submissions of this challenge phase!'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stream_challenge_phase_submissions_when_challenge_phase_does_not_exist(self):
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse_lazy('jobs:stream_challenge_phase_submissions',
+                                kwargs={'challenge_id': self.challenge.pk,
+                                        'challenge_phase_id': self.challenge_phase.pk + 1})
+        expected = {
+            'error': 'Challenge Phase does not exist'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GetChallengePhaseSubmissionsTest(BaseAPITestClass):
+
+    def setUp(self):
+        super(GetChallengePhaseSubmissionsTest, self).setUp()
+
+        self.challenge_host = ChallengeHost.objects.create(
+            user=self.user,
+            team_name=self.challenge_host_team,
+            status=ChallengeHost.ACCEPTED,
+            permissions=ChallengeHost.ADMIN)
+
+        self.submissions = []
+        for index in range(12):
+            submission = Submission.objects.create(
+                participant_team=self.participant_team,
+                challenge_phase=self.challenge_phase,
+                created_by=self.user1,
+                status='submitted',
+                input_file=self.challenge_phase.test_annotation,
+                method_name='Method {}'.format(index))
+            if index % 3 == 0:
+                submission.status = 'failed'
+                submission.save()
+            SubmissionMetrics.objects.create(
+                submission=submission,
+                wall_time=index,
+                cpu_user_time=index,
+                cpu_system_time=0,
+                peak_memory=1024)
+            self.submissions.append(submission)
+
+        self.url = reverse_lazy('jobs:get_challenge_phase_submissions',
+                                kwargs={'challenge_id': self.challenge.pk,
+                                        'challenge_phase_id': self.challenge_phase.pk})
+
+    def get_ids(self, response):
+        return [result['id'] for result in response.data['results']]
+
+    def test_get_challenge_phase_submissions(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_ids(response), [submission.pk for submission in self.submissions[::-1][:10]])
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(self.get_ids(response), [submission.pk for submission in self.submissions[::-1][10:]])
+        self.assertIsNone(response.data['next'])
+
+    def test_get_challenge_phase_submissions_with_filters(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {
+            'status': 'failed,finished',
+            'participant_team': self.participant_team.pk,
+            'submitted_after': self.submissions[1].submitted_at.isoformat(),
+            'min_wall_time': 4,
+            'max_wall_time': 9})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_ids(response), [self.submissions[9].pk, self.submissions[6].pk])
+
+    def test_get_challenge_phase_submissions_with_invalid_filter(self):
+        self.client.force_authenticate(user=self.user)
+        expected = {
+            'error': 'Invalid value of the query parameter submitted_before'
+        }
+        response = self.client.get(self.url, {'submitted_before': 'yesterday'})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_get_challenge_phase_submissions_when_user_is_not_a_host(self):
+        expected = {
+            'error': 'Sorry, you are not allowed to view the submissions of this challenge phase!'
+        }
+        response = self.client.get(self.url, {})
+        self.assertEqual(response.data, expected)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
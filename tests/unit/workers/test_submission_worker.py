@@ -0,0 +1,889 @@
+import BaseHTTPServer
+import StringIO
+import collections
+import contextlib
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+from datetime import timedelta
+from os.path import dirname, join
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from challenges.models import (Challenge,
+                               ChallengePhase,
+                               ChallengePhaseSplit,
+                               DatasetSplit,
+                               Leaderboard,
+                               LeaderboardData,)
+from hosts.models import ChallengeHostTeam
+from jobs.models import Submission, SubmissionMetrics
+from jobs.utils import retry_submission
+from participants.models import ParticipantTeam
+
+# the worker is a script run as `python scripts/workers/submission_worker.py`, not a package
+sys.path.insert(0, join(dirname(dirname(dirname(dirname(os.path.abspath(__file__))))), 'scripts', 'workers'))
+
+import submission_worker as worker  # noqa
+
+
+EVALUATION_SCRIPT = """
+import time
+
+
+def parse_annotation_file(annotation_file_path):
+    return [{parsed}]
+
+
+def evaluate(test_annotation_file, user_annotation_file, phase_codename, annotation=None):
+    # the submission is the number of seconds the evaluation takes
+    time.sleep(float(open(user_annotation_file).read()))
+    return {{'annotation': list(annotation)}}
+"""
+
+
+def create_evaluation_script(challenge_id, version, parsed):
+    '''
+        Extracts an evaluation script the way `load_evaluation_script` does, its `parse_annotation_file`
+        returns `parsed`
+    '''
+    for directory in (worker.COMPUTE_DIRECTORY_PATH, worker.CHALLENGE_DATA_BASE_DIR,
+                      worker.CHALLENGE_DATA_DIR.format(challenge_id=challenge_id)):
+        worker.create_dir_as_python_package(directory)
+    evaluation_script_dir = worker.EVALUATION_SCRIPT_DIR.format(challenge_id=challenge_id, version=version)
+    worker.create_dir(evaluation_script_dir)
+    with open(join(evaluation_script_dir, '__init__.py'), 'w') as f:
+        f.write(EVALUATION_SCRIPT.format(parsed=parsed))
+
+
+class Method(object):
+
+    def __init__(self, delivery_tag, redelivered=False):
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+
+
+class FakeChannel(object):
+    '''
+        Stand-in of a pika channel recording what the worker does with its messages
+    '''
+
+    def __init__(self, queues=None):
+        self.is_open = True
+        self.queues = queues or {}
+        self.polled_queues = []
+        self.acked = []
+        self.rejected = []
+
+    def basic_get(self, queue):
+        self.polled_queues.append(queue)
+        if not self.queues.get(queue):
+            return None, None, None
+        return Method(len(self.polled_queues)), None, self.queues[queue].popleft()
+
+    def basic_ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+    def basic_reject(self, delivery_tag, requeue=True):
+        self.rejected.append((delivery_tag, requeue))
+
+
+class ProcessSubmissionCallbackTest(TestCase):
+
+    def test_failed_message_is_requeued_once(self):
+        channel = FakeChannel()
+
+        worker.process_submission_callback(channel, Method(1), None, 'not a submission message')
+        worker.process_submission_callback(channel, Method(2, redelivered=True), None, 'not a submission message')
+
+        self.assertEqual(channel.acked, [])
+        self.assertEqual(channel.rejected, [(1, True), (2, False)])
+        self.assertEqual(worker.IN_FLIGHT_SUBMISSION_MESSAGES, {})
+
+    def test_failed_message_is_not_rejected_on_a_closed_channel(self):
+        channel = FakeChannel()
+        channel.is_open = False
+
+        worker.process_submission_callback(channel, Method(1), None, 'not a submission message')
+
+        self.assertEqual(channel.rejected, [])
+
+
+class FetchNextSubmissionMessageTest(TestCase):
+
+    def setUp(self):
+        self.phase_priority_map = dict(worker.PHASE_PRIORITY_MAP)
+        worker.PHASE_PRIORITY_MAP.clear()
+        worker.SUBMISSION_QUEUE_PASS.clear()
+        worker.SUBMISSION_QUEUE_VIRTUAL_TIME = 0
+
+    def tearDown(self):
+        worker.PHASE_PRIORITY_MAP.clear()
+        worker.PHASE_PRIORITY_MAP.update(self.phase_priority_map)
+        worker.SUBMISSION_QUEUE_PASS.clear()
+        worker.SUBMISSION_QUEUE_VIRTUAL_TIME = 0
+
+    def fetch_all(self, channel):
+        bodies = []
+        while True:
+            method, properties, body = worker.fetch_next_submission_message(channel)
+            if not method:
+                return bodies
+            bodies.append(body)
+
+    def test_phases_share_the_worker_in_proportion_to_their_priority(self):
+        worker.PHASE_PRIORITY_MAP[1] = {1: 2, 2: 1}
+        channel = FakeChannel({
+            worker.get_submission_queue_name(1, 1): collections.deque('a' * 6),
+            worker.get_submission_queue_name(1, 2): collections.deque('b' * 6),
+        })
+
+        bodies = self.fetch_all(channel)
+
+        # twice as many submissions of the phase with priority 2 while both have some
+        self.assertEqual(''.join(bodies[:6]).count('a'), 4)
+        self.assertEqual(sorted(bodies), sorted('a' * 6 + 'b' * 6))
+
+    def test_idle_phase_does_not_bank_its_share(self):
+        worker.PHASE_PRIORITY_MAP[1] = {1: 1, 2: 1}
+        busy_queue_name = worker.get_submission_queue_name(1, 1)
+        idle_queue_name = worker.get_submission_queue_name(1, 2)
+        channel = FakeChannel({busy_queue_name: collections.deque('a' * 6), idle_queue_name: collections.deque()})
+        for _ in range(4):
+            worker.fetch_next_submission_message(channel)
+
+        channel.queues[idle_queue_name].extend('b' * 4)
+        bodies = self.fetch_all(channel)
+
+        # rejoins at the virtual time of the busy phase instead of getting the 4 submissions it missed in a row
+        self.assertEqual(bodies[0], 'b')
+        self.assertIn('a', bodies[:3])
+
+    def test_phase_with_priority_0_is_served_only_when_the_others_are_empty(self):
+        worker.PHASE_PRIORITY_MAP[1] = {1: 1, 2: 0}
+        channel = FakeChannel({
+            worker.get_submission_queue_name(1, 1): collections.deque('a' * 3),
+            worker.get_submission_queue_name(1, 2): collections.deque('b' * 3),
+        })
+
+        self.assertEqual(self.fetch_all(channel), ['a', 'a', 'a', 'b', 'b', 'b'])
+
+    def test_messages_are_only_taken_when_the_worker_is_ready(self):
+        worker.PHASE_PRIORITY_MAP[1] = {1: 1, 2: 1}
+        channel = FakeChannel({
+            worker.get_submission_queue_name(1, 1): collections.deque('a'),
+            worker.get_submission_queue_name(1, 2): collections.deque('b'),
+        })
+
+        worker.fetch_next_submission_message(channel)
+
+        # the other message stays in its queue for the other workers
+        self.assertEqual(sum(len(queue) for queue in channel.queues.values()), 1)
+
+
+class StreamRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.stream = StringIO.StringIO()
+        self.router = worker.StreamRouter(self.stream)
+
+    def test_every_thread_writes_to_its_own_stream(self):
+        streams = [StringIO.StringIO() for _ in range(3)]
+        redirected = [threading.Event() for _ in streams]
+        written = threading.Event()
+
+        def evaluate(index):
+            with self.router.redirect(streams[index]):
+                redirected[index].set()
+                # every thread writes while all of them are redirected
+                for event in redirected:
+                    event.wait()
+                print >> self.router, 'submission', index
+                written.wait()
+
+        threads = [threading.Thread(target=evaluate, args=(index,)) for index in range(len(streams))]
+        for thread in threads:
+            thread.start()
+        for event in redirected:
+            event.wait()
+        self.router.write('worker\n')
+        written.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([stream.getvalue() for stream in streams],
+                         ['submission {}\n'.format(index) for index in range(len(streams))])
+        self.assertEqual(self.stream.getvalue(), 'worker\n')
+
+    def test_nested_redirect(self):
+        outer_stream, inner_stream = StringIO.StringIO(), StringIO.StringIO()
+        with self.router.redirect(outer_stream):
+            with self.router.redirect(inner_stream):
+                self.router.write('inner')
+            self.router.write('outer')
+        self.router.write('original')
+
+        self.assertEqual((outer_stream.getvalue(), inner_stream.getvalue(), self.stream.getvalue()),
+                         ('outer', 'inner', 'original'))
+
+    def test_stdout_redirect(self):
+        self.addCleanup(setattr, sys, 'stdout', sys.stdout)
+        stream = StringIO.StringIO()
+
+        with worker.stdout_redirect(stream):
+            print 'submission'
+        router = sys.stdout
+
+        self.assertIsInstance(router, worker.StreamRouter)
+        self.assertEqual(stream.getvalue(), 'submission\n')
+        # installed once
+        with worker.stdout_redirect(StringIO.StringIO()):
+            self.assertIs(sys.stdout, router)
+
+
+class ParsedAnnotation(object):
+
+    def __init__(self, parsed):
+        self.parse_annotation_file = lambda annotation_file_path: parsed
+
+
+class AnnotationEvaluationScript(object):
+
+    def evaluate(self, test_annotation_file, user_annotation_file, phase_codename, annotation=None):
+        pass
+
+
+class KeywordArgumentsEvaluationScript(object):
+
+    def evaluate(self, test_annotation_file, user_annotation_file, phase_codename, **kwargs):
+        pass
+
+
+class BuiltinEvaluationScript(object):
+    # the arguments of a builtin cannot be inspected
+    evaluate = staticmethod(max)
+
+
+class MapAnnotationFileTest(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.annotation_cache_dir = worker.ANNOTATION_CACHE_DIR
+        worker.ANNOTATION_CACHE_DIR = join(self.temp_dir, 'cache')
+        self.annotation_file_path = join(self.temp_dir, 'annotation.txt')
+        with open(self.annotation_file_path, 'w') as f:
+            f.write('1 2 3')
+
+    def tearDown(self):
+        worker.ANNOTATION_CACHE_DIR = self.annotation_cache_dir
+        worker.EVALUATION_SCRIPTS.pop(1, None)
+        worker.EVALUATION_SCRIPT_VERSIONS.pop(1, None)
+        worker.MAPPED_ANNOTATIONS.clear()
+        shutil.rmtree(self.temp_dir)
+
+    def test_parsed_annotation_is_cached_per_evaluation_script_version(self):
+        annotation_hash = worker.get_file_hash(self.annotation_file_path)
+        worker.EVALUATION_SCRIPTS[1] = ParsedAnnotation([1, 2, 3])
+        worker.EVALUATION_SCRIPT_VERSIONS[1] = ['v1']
+        self.assertEqual(list(worker.map_annotation_file(1, self.annotation_file_path)), [1, 2, 3])
+
+        # the host updated `parse_annotation_file`
+        worker.EVALUATION_SCRIPTS[1] = ParsedAnnotation([4, 5])
+        worker.EVALUATION_SCRIPT_VERSIONS[1] = ['v1', 'v2']
+        self.assertEqual(list(worker.map_annotation_file(1, self.annotation_file_path)), [4, 5])
+        self.assertEqual(sorted(os.listdir(worker.ANNOTATION_CACHE_DIR)),
+                         ['{}_v1.npy'.format(annotation_hash), '{}_v2.npy'.format(annotation_hash)])
+
+    def test_annotation_bytes_are_mapped_without_parse_annotation_file(self):
+        worker.EVALUATION_SCRIPTS[1] = EvaluationScript()
+
+        annotation = worker.map_annotation_file(1, self.annotation_file_path)
+
+        self.assertEqual(annotation[:], '1 2 3')
+        self.assertEqual(os.listdir(worker.ANNOTATION_CACHE_DIR), [worker.get_file_hash(self.annotation_file_path)])
+
+    def test_empty_annotation_file(self):
+        worker.EVALUATION_SCRIPTS[1] = EvaluationScript()
+        open(self.annotation_file_path, 'w').close()
+
+        self.assertEqual(worker.map_annotation_file(1, self.annotation_file_path), '')
+
+    def test_mapped_annotation_is_kept_until_the_annotation_file_changes(self):
+        worker.EVALUATION_SCRIPTS[1] = EvaluationScript()
+        annotation = worker.map_annotation_file(1, self.annotation_file_path)
+        self.assertIs(worker.map_annotation_file(1, self.annotation_file_path), annotation)
+
+        with open(self.annotation_file_path, 'w') as f:
+            f.write('4 5')
+        modified_at = os.path.getmtime(self.annotation_file_path) + 1
+        os.utime(self.annotation_file_path, (modified_at, modified_at))
+
+        self.assertEqual(worker.map_annotation_file(1, self.annotation_file_path)[:], '4 5')
+
+    def test_accepts_mapped_annotation(self):
+        self.assertTrue(worker.accepts_mapped_annotation(AnnotationEvaluationScript()))
+        self.assertTrue(worker.accepts_mapped_annotation(KeywordArgumentsEvaluationScript()))
+        self.assertFalse(worker.accepts_mapped_annotation(EvaluationScript()))
+        self.assertFalse(worker.accepts_mapped_annotation(BuiltinEvaluationScript()))
+
+
+class EvaluatorProcessTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(EvaluatorProcessTest, cls).setUpClass()
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.annotation_cache_dir = worker.ANNOTATION_CACHE_DIR
+        cls.mmap_annotations = worker.WORKER_MMAP_ANNOTATIONS
+        worker.ANNOTATION_CACHE_DIR = join(cls.temp_dir, 'cache')
+        worker.WORKER_MMAP_ANNOTATIONS = True
+        if worker.COMPUTE_DIRECTORY_PATH not in sys.path:
+            sys.path.append(worker.COMPUTE_DIRECTORY_PATH)
+        # started before the challenges are loaded, as in `main`
+        worker.start_evaluator_fork_server()
+        create_evaluation_script(1, 'v1', '1, 2, 3')
+        worker.EVALUATION_SCRIPT_VERSIONS[1] = ['v1']
+
+    @classmethod
+    def tearDownClass(cls):
+        worker.terminate_evaluator_processes()
+        worker.EVALUATION_SCRIPT_VERSIONS.pop(1, None)
+        worker.ANNOTATION_CACHE_DIR = cls.annotation_cache_dir
+        worker.WORKER_MMAP_ANNOTATIONS = cls.mmap_annotations
+        shutil.rmtree(worker.CHALLENGE_DATA_DIR.format(challenge_id=1))
+        shutil.rmtree(cls.temp_dir)
+        super(EvaluatorProcessTest, cls).tearDownClass()
+
+    def setUp(self):
+        self.evaluator = worker.EvaluatorProcess(1)
+        self.annotation_file_path = join(self.temp_dir, 'annotation.txt')
+        with open(self.annotation_file_path, 'w') as f:
+            f.write('1 2 3')
+
+    def tearDown(self):
+        self.evaluator.terminate()
+
+    def evaluate(self, seconds, time_limit=10):
+        user_annotation_file_path = join(self.temp_dir, 'submission.txt')
+        with open(user_annotation_file_path, 'w') as f:
+            f.write(str(seconds))
+        return self.evaluator.evaluate(time_limit, self.annotation_file_path, user_annotation_file_path, 'dev',
+                                       join(self.temp_dir, 'stdout.txt'), join(self.temp_dir, 'stderr.txt'))
+
+    def test_evaluate(self):
+        self.assertEqual(self.evaluate(0), {'annotation': [1, 2, 3]})
+        self.assertEqual(self.evaluator.evaluations, 1)
+        self.assertTrue(self.evaluator.is_usable())
+        # cached under the version of the evaluation script of the evaluator process
+        self.assertEqual(os.listdir(worker.ANNOTATION_CACHE_DIR),
+                         ['{}_v1.npy'.format(worker.get_file_hash(self.annotation_file_path))])
+
+    def test_evaluate_beyond_time_limit(self):
+        with self.assertRaises(worker.ExecutionTimeLimitExceeded):
+            self.evaluate(10, time_limit=0.5)
+        self.assertFalse(self.evaluator.is_alive())
+
+    def test_evaluate_during_drain(self):
+        self.addCleanup(setattr, worker, 'DRAIN_DEADLINE', None)
+        worker.DRAIN_DEADLINE = time.time() + 10
+
+        self.assertEqual(self.evaluate(0), {'annotation': [1, 2, 3]})
+        self.assertTrue(self.evaluator.is_alive())
+
+    def test_evaluate_beyond_drain_deadline(self):
+        self.addCleanup(setattr, worker, 'DRAIN_DEADLINE', None)
+        worker.DRAIN_DEADLINE = time.time() + 0.5
+
+        with self.assertRaises(worker.DrainTimeoutExceeded):
+            self.evaluate(10)
+        self.assertFalse(self.evaluator.is_alive())
+
+
+class ShutdownHandlerTest(SimpleTestCase):
+
+    def tearDown(self):
+        worker.SHUTDOWN_REQUESTED.clear()
+        worker.DRAIN_DEADLINE = None
+
+    def test_shutdown_handler(self):
+        worker.shutdown_handler(15, None)
+
+        self.assertTrue(worker.SHUTDOWN_REQUESTED.is_set())
+        drain_deadline = worker.DRAIN_DEADLINE
+        self.assertAlmostEqual(drain_deadline, time.time() + worker.WORKER_DRAIN_TIMEOUT, delta=5)
+        # a second signal does not postpone the drain
+        worker.shutdown_handler(15, None)
+        self.assertEqual(worker.DRAIN_DEADLINE, drain_deadline)
+
+
+class ExtractZipFileTest(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.zip_file_path = join(self.temp_dir, 'submission.zip')
+        self.extract_location = join(self.temp_dir, 'submission')
+        os.mkdir(self.extract_location)
+
+    def override(self, name, value):
+        self.addCleanup(setattr, worker, name, getattr(worker, name))
+        setattr(worker, name, value)
+
+    def create_zip_file(self, members, compression=zipfile.ZIP_DEFLATED):
+        with zipfile.ZipFile(self.zip_file_path, 'w', compression) as zip_ref:
+            for name, content in members:
+                zip_ref.writestr(name, content)
+
+    def test_get_zip_member_path(self):
+        self.assertEqual(worker.get_zip_member_path(self.extract_location, 'a/b.txt'),
+                         join(os.path.realpath(self.extract_location), 'a', 'b.txt'))
+        for name in ('../b.txt', 'a/../../b.txt', '/tmp/b.txt', '.'):
+            with self.assertRaises(worker.UnsafeZipFile):
+                worker.get_zip_member_path(self.extract_location, name)
+
+    def test_extract_zip_file(self):
+        self.create_zip_file([
+            ('predictions/', ''),
+            ('predictions/a.txt', 'a'),
+            ('b.txt', 'bb'),
+            ('__MACOSX/._b.txt', 'mac'),
+            ('.DS_Store', 'mac'),
+            ('predictions/.DS_Store', 'mac'),
+            ('evaluate.pyc', 'compiled'),
+            ('predictions/__pycache__/evaluate.pyc', 'compiled'),
+        ])
+
+        manifest = worker.extract_zip_file(self.zip_file_path, self.extract_location)
+
+        self.assertEqual(sorted(os.listdir(self.extract_location)),
+                         [worker.ZIP_MANIFEST_FILE_NAME, 'b.txt', 'predictions'])
+        self.assertEqual(os.listdir(join(self.extract_location, 'predictions')), ['a.txt'])
+        with open(join(self.extract_location, 'b.txt')) as f:
+            self.assertEqual(f.read(), 'bb')
+        self.assertEqual(sorted(manifest['extracted']), ['b.txt', 'predictions/a.txt'])
+        self.assertEqual(manifest['extracted']['b.txt']['size'], 2)
+        self.assertEqual(len(manifest['skipped']), 5)
+        with open(join(self.extract_location, worker.ZIP_MANIFEST_FILE_NAME)) as f:
+            self.assertEqual(json.load(f), manifest)
+        self.assertFalse(os.path.exists(self.zip_file_path))
+
+    def test_zip_file_with_a_member_outside_of_the_extract_location(self):
+        self.create_zip_file([('a.txt', 'a'), ('../b.txt', 'b')])
+
+        with self.assertRaises(worker.UnsafeZipFile):
+            worker.extract_zip_file(self.zip_file_path, self.extract_location)
+        # nothing is extracted
+        self.assertEqual(os.listdir(self.extract_location), [])
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['submission', 'submission.zip'])
+
+    def test_zip_file_beyond_the_extracted_size_limit(self):
+        self.override('ZIP_MAX_EXTRACTED_SIZE', 1)
+        self.create_zip_file([('a.txt', 'a' * 2 * 1024 * 1024)], zipfile.ZIP_STORED)
+
+        with self.assertRaises(worker.UnsafeZipFile):
+            worker.extract_zip_file(self.zip_file_path, self.extract_location)
+        self.assertEqual(os.listdir(self.extract_location), [])
+
+    def test_zip_file_beyond_the_compression_ratio_limit(self):
+        self.create_zip_file([('a.txt', '\0' * 1024 * 1024)])
+
+        with self.assertRaises(worker.UnsafeZipFile):
+            worker.extract_zip_file(self.zip_file_path, self.extract_location)
+        self.assertEqual(os.listdir(self.extract_location), [])
+
+    def test_large_members_are_extracted_in_parallel(self):
+        self.override('ZIP_PARALLEL_MEMBER_SIZE', 10)
+        self.override('ZIP_EXTRACTION_THREADS', 2)
+        members = [('{}.txt'.format(index), str(index) * 100) for index in range(4)] + [('small.txt', 's')]
+        self.create_zip_file(members)
+
+        worker.extract_zip_file(self.zip_file_path, self.extract_location)
+
+        for name, content in members:
+            with open(join(self.extract_location, name)) as f:
+                self.assertEqual(f.read(), content)
+
+
+class FileField(object):
+    '''
+        Stand-in of a file field of a submission recording what is saved to it
+    '''
+
+    def save(self, name, content, save=True):
+        self.name = name
+        self.content = content.read()
+        self.saved_instance = save
+
+
+class SubmissionArtifactTest(SimpleTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.log_file_path = join(self.temp_dir, 'stdout.txt')
+
+    def write_log_file(self, content):
+        with open(self.log_file_path, 'w') as f:
+            f.write(content)
+
+    def test_small_log_file_is_kept_whole(self):
+        self.write_log_file('a' * 100)
+        self.assertEqual(''.join(worker.iterate_log_chunks(self.log_file_path, 100)), 'a' * 100)
+
+    def test_large_log_file_is_truncated_in_the_middle(self):
+        self.write_log_file('a' * 50 + 'b' * 1000 + 'c' * 50)
+        self.assertEqual(''.join(worker.iterate_log_chunks(self.log_file_path, 100)),
+                         'a' * 50 + '\n... 1000 bytes truncated ...\n' + 'c' * 50)
+
+    def test_save_submission_artifact(self):
+        self.addCleanup(setattr, worker, 'WORKER_COMPRESS_ARTIFACTS', worker.WORKER_COMPRESS_ARTIFACTS)
+        worker.WORKER_COMPRESS_ARTIFACTS = False
+        file_field = FileField()
+
+        worker.save_submission_artifact(file_field, 'stdout.txt', ['a', u'b'])
+
+        self.assertEqual((file_field.name, file_field.content, file_field.saved_instance), ('stdout.txt', 'ab', False))
+
+    def test_save_compressed_submission_artifact(self):
+        self.addCleanup(setattr, worker, 'WORKER_COMPRESS_ARTIFACTS', worker.WORKER_COMPRESS_ARTIFACTS)
+        worker.WORKER_COMPRESS_ARTIFACTS = True
+        file_field, other_file_field = FileField(), FileField()
+
+        worker.save_submission_artifact(file_field, 'stdout.txt', ['a', u'b'])
+        worker.save_submission_artifact(other_file_field, 'stdout.txt', ['ab'])
+
+        self.assertEqual(file_field.name, 'stdout.txt.gz')
+        compressed_path = join(self.temp_dir, file_field.name)
+        with open(compressed_path, 'wb') as f:
+            f.write(file_field.content)
+        with contextlib.closing(gzip.open(compressed_path)) as f:
+            self.assertEqual(f.read(), 'ab')
+        # the same content is compressed to the same bytes
+        self.assertEqual(other_file_field.content, file_field.content)
+
+
+class EvaluationScript(object):
+    '''
+        Stand-in of a loaded evaluation script, which calls `during_evaluation` while it evaluates
+    '''
+
+    def __init__(self, during_evaluation=None):
+        self.during_evaluation = during_evaluation
+
+    def evaluate(self, annotation_file_path, user_annotation_file_path, phase_codename):
+        if self.during_evaluation:
+            self.during_evaluation()
+        return {
+            'result': [{'test-split': {'score': 1}}],
+            'submission_result': 'Matched 1 line',
+            'submission_metadata': 'Test submission',
+        }
+
+
+class SubmissionTestCase(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.user = User.objects.create(username='someuser', email='user@test.com', password='secret_password')
+        self.challenge = Challenge.objects.create(
+            title='Test Challenge',
+            creator=ChallengeHostTeam.objects.create(team_name='Test Challenge Host Team', created_by=self.user),
+            start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() + timedelta(days=1))
+        self.challenge_phase = ChallengePhase.objects.create(
+            name='Challenge Phase',
+            codename='test-phase',
+            start_date=timezone.now() - timedelta(days=2),
+            end_date=timezone.now() + timedelta(days=1),
+            challenge=self.challenge,
+            test_annotation=SimpleUploadedFile('test_annotation.txt', 'Dummy file content',
+                                               content_type='text/plain'))
+        ChallengePhaseSplit.objects.create(
+            challenge_phase=self.challenge_phase,
+            dataset_split=DatasetSplit.objects.create(name='Test Dataset Split', codename='test-split'),
+            leaderboard=Leaderboard.objects.create(schema={'labels': ['score']}),
+            visibility=ChallengePhaseSplit.PUBLIC)
+        self.submission = Submission.objects.create(
+            participant_team=ParticipantTeam.objects.create(team_name='Participant Team', created_by=self.user),
+            challenge_phase=self.challenge_phase,
+            created_by=self.user,
+            input_file=SimpleUploadedFile('user_annotation.txt', 'file_content', content_type='text/plain'))
+
+        worker.PHASE_ANNOTATION_FILE_NAME_MAP[self.challenge.pk] = {self.challenge_phase.pk: 'test_annotation.txt'}
+        self.addCleanup(worker.PHASE_ANNOTATION_FILE_NAME_MAP.pop, self.challenge.pk)
+        self.addCleanup(worker.EVALUATION_SCRIPTS.pop, self.challenge.pk, None)
+
+    def get_submission_files(self):
+        return sorted(os.listdir(join(self.media_root, 'submission_files',
+                                      'submission_{}'.format(self.submission.pk))))
+
+
+class ClaimSubmissionTest(SubmissionTestCase):
+
+    def test_claim_submission(self):
+        Submission.objects.filter(pk=self.submission.pk).update(infrastructure_failed_at=timezone.now())
+        self.submission.refresh_from_db()
+
+        self.assertTrue(worker.claim_submission(self.submission))
+        self.assertEqual(self.submission.status, Submission.RUNNING)
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, Submission.RUNNING)
+        self.assertIsNotNone(self.submission.started_at)
+        self.assertIsNone(self.submission.infrastructure_failed_at)
+
+    def test_claim_submission_taken_by_another_worker(self):
+        other_worker_submission = Submission.objects.get(pk=self.submission.pk)
+        self.assertTrue(worker.claim_submission(other_worker_submission))
+
+        self.assertFalse(worker.claim_submission(self.submission))
+        self.assertEqual(self.submission.status, Submission.SUBMITTED)
+
+    def test_claim_submission_retried_meanwhile(self):
+        Submission.objects.filter(pk=self.submission.pk).update(retry_count=1)
+
+        self.assertFalse(worker.claim_submission(self.submission))
+        self.assertEqual(Submission.objects.get(pk=self.submission.pk).status, Submission.SUBMITTED)
+
+    def test_message_of_a_submission_already_taken_is_skipped(self):
+        Submission.objects.filter(pk=self.submission.pk).update(status=Submission.FINISHED)
+
+        worker.process_submission_message({'challenge_id': self.challenge.pk, 'phase_id': self.challenge_phase.pk,
+                                           'submission_id': self.submission.pk})
+
+        self.assertEqual(Submission.objects.get(pk=self.submission.pk).status, Submission.FINISHED)
+        self.assertFalse(SubmissionMetrics.objects.filter(submission=self.submission).exists())
+        # its input file is not downloaded again
+        self.assertFalse(os.path.exists(worker.SUBMISSION_DATA_DIR.format(submission_id=self.submission.pk)))
+
+
+class RunSubmissionTest(SubmissionTestCase):
+
+    def setUp(self):
+        super(RunSubmissionTest, self).setUp()
+        self.assertTrue(worker.claim_submission(self.submission))
+        self.input_files = self.get_submission_files()
+
+    def run_submission(self, during_evaluation=None):
+        worker.EVALUATION_SCRIPTS[self.challenge.pk] = EvaluationScript(during_evaluation)
+        worker.run_submission(self.challenge.pk, self.challenge_phase, self.submission.pk, self.submission,
+                              'user_annotation.txt')
+
+    def requeue_submission(self):
+        retry_submission(Submission.objects.get(pk=self.submission.pk), timezone.now())
+
+    def test_run_submission(self):
+        self.run_submission()
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, Submission.FINISHED)
+        self.assertIsNotNone(self.submission.completed_at)
+        self.assertEqual(LeaderboardData.objects.get(submission=self.submission).result, {'score': 1})
+        self.assertEqual(len(self.get_submission_files()), len(self.input_files) + 4)
+
+    def test_run_submission_requeued_during_evaluation(self):
+        self.run_submission(during_evaluation=self.requeue_submission)
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, Submission.SUBMITTED)
+        self.assertEqual(self.submission.retry_count, 1)
+        self.assertFalse(LeaderboardData.objects.filter(submission=self.submission).exists())
+        self.assertEqual(self.get_submission_files(), self.input_files)
+
+    def test_run_submission_requeued_while_saving_its_files(self):
+        save_submission_artifact = worker.save_submission_artifact
+
+        def requeue_and_save_submission_artifact(*args):
+            if not Submission.objects.filter(pk=self.submission.pk, retry_count=1).exists():
+                self.requeue_submission()
+            save_submission_artifact(*args)
+
+        worker.save_submission_artifact = requeue_and_save_submission_artifact
+        self.addCleanup(setattr, worker, 'save_submission_artifact', save_submission_artifact)
+        self.run_submission()
+
+        self.submission.refresh_from_db()
+        self.assertEqual(self.submission.status, Submission.SUBMITTED)
+        self.assertFalse(LeaderboardData.objects.filter(submission=self.submission).exists())
+        # the files saved by the discarded evaluation are deleted
+        self.assertEqual(self.get_submission_files(), self.input_files)
+
+
+class FileRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''
+        Serves `/file`, a 404 for `/missing` and `/truncated`, whose connection is closed in the middle of its body
+    '''
+
+    def do_GET(self):
+        if self.path == '/missing':
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', '1000')
+        self.end_headers()
+        self.wfile.write('x' * (1000 if self.path == '/file' else 10))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DownloadAndExtractFileTest(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(DownloadAndExtractFileTest, cls).setUpClass()
+        cls.server = BaseHTTPServer.HTTPServer(('localhost', 0), FileRequestHandler)
+        thread = threading.Thread(target=cls.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super(DownloadAndExtractFileTest, cls).tearDownClass()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.download_location = join(self.temp_dir, 'submission.txt')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def download(self, path):
+        worker.download_and_extract_file('http://localhost:{0}{1}'.format(self.server.server_port, path),
+                                         self.download_location)
+
+    def test_download(self):
+        self.download('/file')
+        with open(self.download_location) as f:
+            self.assertEqual(f.read(), 'x' * 1000)
+        self.assertEqual(os.listdir(self.temp_dir), ['submission.txt'])
+
+    def test_download_of_a_missing_file(self):
+        self.download('/missing')
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_failed_download_leaves_nothing_behind(self):
+        self.download('/truncated')
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_cancelled_download_leaves_nothing_behind(self):
+        cancelled = threading.Event()
+        cancelled.set()
+        worker.download_and_extract_file('http://localhost:{}/file'.format(self.server.server_port),
+                                         self.download_location, cancelled)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+
+class StageSubmissionInputTest(SubmissionTestCase):
+
+    def setUp(self):
+        super(StageSubmissionInputTest, self).setUp()
+        self.addCleanup(worker.STAGED_SUBMISSION_INPUTS.clear)
+        self.addCleanup(self.drain_staging_queue)
+
+    def drain_staging_queue(self):
+        staged_inputs = []
+        while not worker.STAGING_QUEUE.empty():
+            staged_inputs.append(worker.STAGING_QUEUE.get_nowait())
+        return staged_inputs
+
+    def test_redelivered_message_is_staged_again(self):
+        worker.stage_submission_input(self.submission.pk)
+        worker.stage_submission_input(self.submission.pk)
+
+        first_input, second_input = self.drain_staging_queue()
+        self.assertTrue(first_input.cancelled.is_set())
+        self.assertFalse(second_input.cancelled.is_set())
+        self.assertIs(worker.STAGED_SUBMISSION_INPUTS[self.submission.pk], second_input)
+
+    def test_cancel_staged_submission_input(self):
+        worker.stage_submission_input(self.submission.pk)
+        worker.cancel_staged_submission_input(self.submission.pk)
+
+        self.assertTrue(self.drain_staging_queue()[0].cancelled.is_set())
+        self.assertEqual(worker.STAGED_SUBMISSION_INPUTS, {})
+
+    def test_extract_submission_data_of_a_staged_submission(self):
+        worker.stage_submission_input(self.submission.pk)
+        staged_input, = self.drain_staging_queue()
+        staged_input.submission = self.submission
+        staged_input.staged.set()
+
+        self.assertIs(worker.extract_submission_data(self.submission.pk), self.submission)
+        self.assertEqual(worker.STAGED_SUBMISSION_INPUTS, {})
+
+    def test_extract_submission_data_of_a_failed_staging(self):
+        worker.stage_submission_input(self.submission.pk)
+        self.drain_staging_queue()[0].staged.set()
+        download_and_extract_file = worker.download_and_extract_file
+        downloads = []
+        worker.download_and_extract_file = lambda url, download_location: downloads.append(download_location)
+        self.addCleanup(setattr, worker, 'download_and_extract_file', download_and_extract_file)
+
+        submission = worker.extract_submission_data(self.submission.pk)
+
+        # fetched and downloaded again
+        self.assertEqual(submission, self.submission)
+        self.assertEqual(len(downloads), 1)
+
+    def test_release_prefetched_submission_messages(self):
+        worker.stage_submission_input(self.submission.pk)
+        worker.PREFETCHED_SUBMISSION_MESSAGES.append((Method(1), None, 'message'))
+        channel = FakeChannel()
+
+        worker.release_prefetched_submission_messages(channel)
+
+        self.assertTrue(self.drain_staging_queue()[0].cancelled.is_set())
+        self.assertEqual(worker.STAGED_SUBMISSION_INPUTS, {})
+        self.assertEqual(channel.rejected, [(1, True)])
+        self.assertEqual(len(worker.PREFETCHED_SUBMISSION_MESSAGES), 0)
+
+
+class RequeueInFlightSubmissionsTest(SubmissionTestCase):
+
+    def setUp(self):
+        super(RequeueInFlightSubmissionsTest, self).setUp()
+        self.addCleanup(worker.IN_FLIGHT_SUBMISSION_MESSAGES.clear)
+
+    def test_interrupted_submission_is_requeued(self):
+        self.assertTrue(worker.claim_submission(self.submission))
+        challenge_phase_split = ChallengePhaseSplit.objects.get(challenge_phase=self.challenge_phase)
+        LeaderboardData.objects.create(challenge_phase_split=challenge_phase_split, submission=self.submission,
+                                       leaderboard=challenge_phase_split.leaderboard, result={'score': 1})
+        worker.IN_FLIGHT_SUBMISSION_MESSAGES[1] = self.submission.pk
+        channel = FakeChannel()
+
+        worker.requeue_in_flight_submissions(channel)
+
+        self.assertEqual(Submission.objects.get(pk=self.submission.pk).status, Submission.SUBMITTED)
+        self.assertFalse(LeaderboardData.objects.filter(submission=self.submission).exists())
+        self.assertEqual(channel.rejected, [(1, True)])
+        self.assertEqual(worker.IN_FLIGHT_SUBMISSION_MESSAGES, {})
+
+    def test_finished_submission_is_kept(self):
+        Submission.objects.filter(pk=self.submission.pk).update(status=Submission.FINISHED)
+        worker.IN_FLIGHT_SUBMISSION_MESSAGES[1] = self.submission.pk
+        channel = FakeChannel()
+        channel.is_open = False
+
+        worker.requeue_in_flight_submissions(channel)
+
+        self.assertEqual(Submission.objects.get(pk=self.submission.pk).status, Submission.FINISHED)
+        self.assertEqual(channel.rejected, [])
+        self.assertEqual(worker.IN_FLIGHT_SUBMISSION_MESSAGES, {})